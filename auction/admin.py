@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Auction, Product, SoldProduct
+from .models import Auction, Product, SoldProduct, Bid
 
 
 class ProductInline(admin.TabularInline):
@@ -9,7 +9,7 @@ class ProductInline(admin.TabularInline):
 @admin.register(Auction)
 class AuctionAdmin(admin.ModelAdmin):
     inlines = [ProductInline]
-    list_display = ['description', 'date', 'time']
+    list_display = ['description', 'date', 'time', 'closed_at', 'settled_at']
     search_fields = ['description']
     list_filter = ['date', 'time']
 
@@ -20,10 +20,28 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ['name',  'start_point', 'amount', 'auction']
     list_filter = ['auction']
     search_fields = ['name']
+    list_select_related = ['auction']
+
+class ProductChoiceMixin:
+    """Product.__str__ auksion sanasini ko'rsatadi: tanlov ro'yxati uchun bitta so'rov."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'product':
+            kwargs['queryset'] = Product.objects.select_related('auction')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 @admin.register(SoldProduct)
-class SoldProductAdmin(admin.ModelAdmin):
+class SoldProductAdmin(ProductChoiceMixin, admin.ModelAdmin):
     list_display = ['product', 'buyer__user__first_name', 'price', 'date']
     list_filter = ['date']
     search_fields = ['product__name', 'buyer__user__username']
+    list_select_related = ['product__auction', 'buyer__user']
+
 
+@admin.register(Bid)
+class BidAdmin(ProductChoiceMixin, admin.ModelAdmin):
+    list_display = ['product', 'student', 'amount', 'created_at']
+    list_filter = ['product__auction']
+    search_fields = ['product__name', 'student__user__username']
+    list_select_related = ['product__auction', 'student__user']
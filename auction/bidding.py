@@ -0,0 +1,381 @@
+"""
+Joriy auksion uchun takliflar (bidding) jarayon xotirasida.
+
+Har bir mahsulot uchun `amount` ta eng yuqori taklif g'olib hisoblanadi
+(min-heap: tepada eng zaif g'olib). Taklif bazaga murojaatsiz tekshiriladi:
+
+- mahsulotning `start_point` idan kam emas, joy band bo'lsa eng zaif
+  g'olibdan kamida BID_INCREMENT ko'p;
+- studentning barcha g'olib takliflari yig'indisi balidan (reyting
+  xotirasidagi `Student.point`) oshmaydi.
+
+Qabul qilingan takliflar Bid sifatida to'planib, BID_BATCH_SIZE ta
+yig'ilganda yoki BID_FLUSH_INTERVAL soniyada bir marta bitta bulk_create
+bilan yoziladi. Yozish umumiy lock'dan tashqarida (alohida `_flush_lock`
+yozuvlarni navbatga qo'yadi), yozib bo'lmagan to'plam navbatga qaytadi va
+keyingi flush'da qayta yoziladi. Auksion tugash vaqtidan (`Auction.ends_at`)
+keyin taklif qabul qilinmaydi; yopilganda g'oliblar `settlement.settle`
+bilan yoziladi.
+
+Bazaga murojaat (reyting qayta qurilishi, yangi auksion yoki mahsulotni
+o'qish) umumiy lock'dan tashqarida bo'ladi, lock ichida faqat xotiradagi
+tekshiruv. Topilmagan mahsulot va yopilgan auksion BID_LOOKUP_TTL soniya
+keshlanadi.
+
+Holat bitta jarayonda saqlanadi: takliflarni bitta worker qabul qilishi
+kerak. Qayta ishga tushganda holat bazadagi Bid yozuvlaridan tiklanadi
+(hali yozilmagan oxirgi takliflar yo'qoladi).
+
+Bal tekshiruvi taxminiy: reyting shu jarayon xotirasida va boshqa
+worker'lardagi xaridlar (SoldProduct) unda LEADERBOARD_TTL soniyagacha
+ko'rinmasligi mumkin. Shuning uchun qabul qilingan taklif hali sotuv
+emas - `settlement.settle` ballarni bazadan qulf ostida qayta tekshiradi,
+yetmaganlari hisobotdagi `rejected` ga tushadi.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from main import events
+from main.events import broadcaster
+from main.leaderboard import leaderboard
+
+from . import settlement
+from .models import Auction, Bid, Product
+
+logger = logging.getLogger(__name__)
+
+TOO_LOW = 'too_low'
+INSUFFICIENT_POINTS = 'insufficient_points'
+SOLD_OUT = 'sold_out'
+NOT_OPEN = 'not_open'
+
+
+class BidRejected(Exception):
+    messages = {
+        TOO_LOW: "Taklif juda past.",
+        INSUFFICIENT_POINTS: "Ball yetarli emas.",
+        SOLD_OUT: "Mahsulot qolmagan.",
+        NOT_OPEN: "Mahsulot joriy auksionda yo'q yoki auksion yopilgan.",
+    }
+
+    def __init__(self, code, minimum=None):
+        super().__init__(self.messages[code])
+        self.code = code
+        self.minimum = minimum
+
+
+class ProductBook:
+    """Bitta mahsulotning g'olib takliflari: [amount, -seq, student_id] min-heap."""
+    __slots__ = ('product_id', 'start_point', 'stock', 'heap', 'leaders')
+
+    def __init__(self, product_id, start_point, stock):
+        self.product_id = product_id
+        self.start_point = start_point
+        self.stock = stock
+        self.heap = []
+        # student_id -> heap elementi; ko'tarilgan/siqib chiqarilgan taklif heap'da
+        # eskirgan bo'lib qoladi va tepaga chiqqanda tashlab yuboriladi
+        self.leaders = {}
+
+    def weakest(self):
+        heap = self.heap
+        while heap and self.leaders.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def minimum(self, student_id=None, increment=1):
+        """`student_id` uchun qabul qilinadigan eng kichik taklif."""
+        own = self.leaders.get(student_id)
+        if own is not None:
+            return own[0] + increment
+        if len(self.leaders) < self.stock:
+            return self.start_point
+        return max(self.weakest()[0] + increment, self.start_point)
+
+    def add(self, student_id, amount, seq):
+        """Taklifni qo'shadi; siqib chiqarilgan g'olib (student_id, amount) yoki None."""
+        entry = [amount, -seq, student_id]
+        evicted = None
+        if student_id not in self.leaders and len(self.leaders) >= self.stock:
+            weakest = self.weakest()
+            evicted = (weakest[2], weakest[0])
+            del self.leaders[weakest[2]]
+            heapq.heapreplace(self.heap, entry)
+        else:
+            heapq.heappush(self.heap, entry)
+        self.leaders[student_id] = entry
+        if len(self.heap) > 2 * self.stock + 64:
+            self.heap = list(self.leaders.values())
+            heapq.heapify(self.heap)
+        return evicted
+
+    def winners(self):
+        """G'oliblar: taklif bo'yicha kamayish tartibida, tengida oldinroq bergani."""
+        return [(student_id, amount) for amount, _, student_id in sorted(self.leaders.values(), reverse=True)]
+
+
+class OrderBook:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Bazaga yozish navbati; olish tartibi: avval _flush_lock, keyin _lock
+        self._flush_lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._auction_id = None
+        self._ends_at = None
+        self._books = {}
+        # student_id -> barcha mahsulotlardagi g'olib takliflari yig'indisi
+        self._committed = defaultdict(int)
+        # product_id -> shu vaqtgacha (monotonic) bazadan qayta qidirilmaydi
+        self._missing = {}
+        self._pending = []
+        self._timer = None
+
+    @property
+    def increment(self):
+        return getattr(settings, 'BID_INCREMENT', 1)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'BID_BATCH_SIZE', 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'BID_FLUSH_INTERVAL', 1.0)
+
+    @property
+    def lookup_ttl(self):
+        return getattr(settings, 'BID_LOOKUP_TTL', 5)
+
+    def _read_books(self, auction, product_ids=None):
+        """Mahsulot kitoblari va g'oliblar yig'indisi bazadan (lock'siz o'qiladi)."""
+        books, committed = {}, defaultdict(int)
+        if auction.closed_at is not None:
+            return books, committed
+        products = Product.objects.filter(auction=auction)
+        bids = Bid.objects.filter(product__auction=auction)
+        if product_ids is not None:
+            products, bids = products.filter(pk__in=product_ids), bids.filter(product_id__in=product_ids)
+        for product_id, start_point, stock in products.values_list('id', 'start_point', 'amount'):
+            books[product_id] = ProductBook(product_id, start_point, stock)
+
+        rows = (bids.values('product_id', 'student_id')
+                .annotate(amount=Max('amount'), first=Min('id')).order_by('-amount', 'first'))
+        for row in rows:
+            book = books.get(row['product_id'])
+            if book is not None and len(book.leaders) < book.stock:
+                book.add(row['student_id'], row['amount'], next(self._seq))
+                committed[row['student_id']] += row['amount']
+        return books, committed
+
+    def _install(self, auction, books, committed):
+        """Yangi holatni o'rnatadi (lock ichida)."""
+        self._auction_id = auction.pk if auction is not None else None
+        self._ends_at = auction.ends_at if auction is not None else None
+        self._books, self._committed = books, committed
+        self._missing = {}
+
+    def _prepare(self, product_id):
+        """
+        Mahsulot kitobi xotirada bo'lmasa bazadan o'qiladi - lock'dan tashqarida,
+        shuning uchun boshqa takliflar kutib qolmaydi. Topilmagan mahsulot
+        (yoki yopilgan auksion) BID_LOOKUP_TTL soniya qayta qidirilmaydi.
+        """
+        if product_id in self._books or self._missing.get(product_id, 0) > time.monotonic():
+            return
+        auction = Auction.current()
+        if auction is not None and auction.pk != self._auction_id:
+            # Yangi auksion: uning takliflari faqat o'rnatilgandan keyin qabul qilinadi
+            books, committed = self._read_books(auction)
+            with self._flush_lock, self._lock:
+                if self._auction_id != auction.pk:
+                    self._flush_locked()
+                    self._install(auction, books, committed)
+        elif auction is not None:
+            # Joriy auksionga yangi qo'shilgan mahsulot: unga hali taklif qabul qilinmagan
+            books, committed = self._read_books(auction, [product_id])
+            with self._lock:
+                if self._auction_id == auction.pk and product_id not in self._books and product_id in books:
+                    self._books[product_id] = books[product_id]
+                    for student_id, amount in committed.items():
+                        self._committed[student_id] += amount
+        if product_id not in self._books:
+            if len(self._missing) > 10000:
+                self._missing = {}
+            self._missing[product_id] = time.monotonic() + self.lookup_ttl
+
+    def _book(self, product_id):
+        book = self._books.get(product_id)
+        if book is None:
+            raise BidRejected(NOT_OPEN)
+        return book
+
+    def place(self, product_id, student_id, amount):
+        """Taklifni qabul qiladi yoki BidRejected; natija - keyingi minimal taklif."""
+        # Bazaga murojaat bo'lishi mumkin bo'lgan qismlar lock'dan oldin
+        balance = leaderboard.balance(student_id)
+        self._prepare(product_id)
+        with self._lock:
+            book = self._book(product_id)
+            if timezone.now() >= self._ends_at:
+                raise BidRejected(NOT_OPEN)
+            if book.stock <= 0:
+                raise BidRejected(SOLD_OUT)
+            minimum = book.minimum(student_id, self.increment)
+            if amount < minimum:
+                raise BidRejected(TOO_LOW, minimum)
+
+            previous = book.leaders.get(student_id)
+            committed = self._committed[student_id] - (previous[0] if previous else 0) + amount
+            if balance is None or committed > balance:
+                raise BidRejected(INSUFFICIENT_POINTS, minimum)
+
+            evicted = book.add(student_id, amount, next(self._seq))
+            self._committed[student_id] = committed
+            if evicted is not None:
+                self._committed[evicted[0]] -= evicted[1]
+            self._pending.append(Bid(product_id=product_id, student_id=student_id, amount=amount,
+                                     created_at=timezone.now()))
+            pending = len(self._pending)
+            next_minimum = book.minimum(None, self.increment)
+
+        broadcaster.publish(events.BID, {'product': product_id, 'student': student_id, 'amount': amount,
+                                         'minimum': next_minimum})
+        if pending >= self.batch_size:
+            self._flush_quietly()
+        elif pending == 1:
+            self._schedule_flush()
+        return next_minimum
+
+    def promised(self, product_id):
+        """
+        Belgilangan narxdagi xarid uchun: auksion ochiq bo'lishi va bo'sh dona
+        qolgan bo'lishi kerak. Natija - g'olib takliflarga va'da qilingan
+        donalar soni; xarid bazada faqat qoldiq undan ko'p bo'lsa o'tadi
+        (`SoldProduct.save(keep_stock=...)`). Dona bu yerda band qilinmaydi:
+        bazada amalga oshmaydigan xarid boshqa xaridorlarni rad ettirmaydi.
+        """
+        self._prepare(product_id)
+        with self._lock:
+            book = self._book(product_id)
+            if timezone.now() >= self._ends_at:
+                raise BidRejected(NOT_OPEN)
+            if book.stock <= len(book.leaders):
+                raise BidRejected(SOLD_OUT)
+            return len(book.leaders)
+
+    def sold(self, product_id):
+        """Belgilangan narxda sotilgan dona (commit'dan keyin): takliflar uchun qoldiq kamayadi."""
+        with self._lock:
+            book = self._books.get(product_id)
+            if book is not None and book.stock > len(book.leaders):
+                book.stock -= 1
+
+    def state(self, product_id, limit=10):
+        """Mahsulot holati: qoldiq, keyingi minimal taklif va eng yuqori takliflar."""
+        self._prepare(product_id)
+        with self._lock:
+            book = self._book(product_id)
+            return {
+                'product': product_id,
+                'stock': book.stock,
+                'start_point': book.start_point,
+                'minimum': book.minimum(None, self.increment),
+                'leaders': [{'student': student_id, 'amount': amount}
+                            for student_id, amount in book.winners()[:limit]],
+            }
+
+    def _schedule_flush(self):
+        interval = self.flush_interval
+        if interval is None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(interval, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_quietly(self):
+        # Taklif allaqachon qabul qilingan: yozish xatosi taklif beruvchiga qaytmaydi,
+        # to'plam navbatda qoladi va keyingi flush qayta urinadi
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Takliflarni bazaga yozib bo'lmadi")
+            self._schedule_flush()
+
+    def _flush_in_background(self):
+        try:
+            self._flush_quietly()
+        finally:
+            connections.close_all()
+
+    def _take_pending(self):
+        batch, self._pending = self._pending, []
+        self._timer = None
+        return batch
+
+    def _flush_locked(self):
+        # Auksion almashganda va yopilganda lock ichida yoziladi: eski auksion
+        # takliflari yangi holat o'rnatilishidan (settlement'dan) oldin bazada bo'lsin
+        batch = self._take_pending()
+        if batch:
+            try:
+                Bid.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                self._pending[:0] = batch
+                raise
+        return len(batch)
+
+    def flush(self):
+        """
+        To'plangan takliflarni bitta bulk_create bilan yozadi. Navbat lock
+        ichida olinadi, yozish esa lock'dan tashqarida - takliflar kutmaydi.
+        Yozib bo'lmasa to'plam navbat boshiga qaytariladi va xato ko'tariladi.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take_pending()
+            if not batch:
+                return 0
+            try:
+                Bid.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+            return len(batch)
+
+    def close(self, auction):
+        """
+        Auksionni yopadi: to'plangan takliflar yoziladi va g'oliblar
+        `settlement.settle` bilan bitta tranzaksiyada SoldProduct bo'ladi.
+        Natija - hisobot.
+        """
+        # Lock'dan tashqarida boshlangan yozish ham settlement'dan oldin tugaydi
+        with self._flush_lock, self._lock:
+            self._flush_locked()
+            closed_at = timezone.now()
+            if not Auction.objects.filter(pk=auction.pk, closed_at=None).update(closed_at=closed_at):
+                raise BidRejected(NOT_OPEN)
+            auction.closed_at = closed_at
+            if self._auction_id == auction.pk:
+                self._install(None, {}, defaultdict(int))
+        return settlement.settle(auction)
+
+    def clear(self):
+        with self._lock:
+            self._install(None, {}, defaultdict(int))
+            self._pending = []
+
+
+order_book = OrderBook()
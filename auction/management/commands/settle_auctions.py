@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from auction.models import Auction
+from auction.settlement import AlreadySettled, due_auctions, settle
+
+
+class Command(BaseCommand):
+    help = (
+        "Tugash vaqti o'tgan auksionlar natijalarini yozadi: g'olib takliflar SoldProduct bo'ladi, "
+        "ball va mahsulot soni kamayadi (cron orqali muntazam ishga tushirish uchun)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auction', type=int, action='append',
+                            help="Faqat shu auksion(lar), tugash vaqtidan qat'i nazar.")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat yakunlanadigan auksionlarni ko'rsatish.")
+
+    def handle(self, *args, **options):
+        if options['auction']:
+            auctions = Auction.objects.filter(pk__in=options['auction']).order_by('date', 'time')
+        else:
+            auctions = due_auctions()
+
+        for auction in auctions:
+            if options['dry_run']:
+                self.stdout.write(f"#{auction.pk} {auction} ({auction.ends_at:%Y-%m-%d %H:%M})")
+                continue
+            try:
+                report = settle(auction)
+            except AlreadySettled as exc:
+                self.stderr.write(f"#{auction.pk}: {exc}")
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"#{auction.pk}: {len(report['sold'])} ta sotuv, {len(report['rejected'])} ta rad etilgan taklif, "
+                f"{report['points']} ball ({report['duration_ms']} ms)"))
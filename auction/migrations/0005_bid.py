@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0004_product_image_variants'),
+        ('main', '0017_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='auction.product')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'student', '-amount'], name='bid_product_student_amount_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auction', '0005_bid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='settlement_report',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
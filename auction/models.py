@@ -1,21 +1,43 @@
+from datetime import datetime
+from functools import partial
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import F
 from django.db import transaction
+from django.utils import timezone
 from main.models import Student
+from main.leaderboard import leaderboard
 
 
 class Auction(models.Model):
     description=models.TextField()
     date=models.DateField()
     time=models.TimeField()
+    # Savdo yopilgan vaqt: shundan keyin taklif qabul qilinmaydi
+    closed_at=models.DateTimeField(null=True, blank=True, editable=False)
+    # G'oliblar yozilgan vaqt va hisobot (auction/settlement.py)
+    settled_at=models.DateTimeField(null=True, blank=True, editable=False)
+    settlement_report=models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.description
 
+    @property
+    def ends_at(self):
+        """Auksion tugash vaqti (`date` va `time`): shundan keyin takliflar qabul qilinmaydi."""
+        return timezone.make_aware(datetime.combine(self.date, self.time))
+
+    @classmethod
+    def current(cls):
+        """Joriy (eng oxirgi) auksion."""
+        return cls.objects.order_by('-date', '-time').first()
+
 class Product(models.Model):
     name=models.CharField(max_length=100)
     start_point=models.PositiveIntegerField()
     image=models.ImageField(upload_to='products/', null=True, blank=True)
+    image_variants=models.JSONField(default=dict, blank=True, editable=False)
     auction=models.ForeignKey(Auction, on_delete=models.CASCADE)
     amount=models.PositiveIntegerField(default=0)
 
@@ -34,25 +56,61 @@ class SoldProduct(models.Model):
         return f"{self.product.name} - {self.buyer.user.first_name} {self.buyer.user.last_name} ({self.price})"
 
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, keep_stock=0, **kwargs):
+        """
+        Sotuv bitta tranzaksiyada: student bali va mahsulot soni shartli
+        UPDATE bilan kamaytiriladi (`point >= price`, `amount > keep_stock`).
+        Yetmasa UPDATE hech qaysi qatorga tegmaydi, ValidationError ko'tariladi
+        va tranzaksiya bekor bo'ladi - manfiy qoldiq yoki ortiqcha sotuv bo'lmaydi.
+        `keep_stock` - g'olib takliflarga va'da qilingan, sotilmaydigan donalar.
+        """
         if self.price < self.product.start_point:
             raise ValueError("Price must be greater than the starting point of the product.")
 
-        if self.pk:
-            prev_instance = SoldProduct.objects.select_related('product', 'buyer').get(pk=self.pk)
-
-
-            Product.objects.filter(id=prev_instance.product.id).update(amount=F('amount') + 1)
-            Student.objects.filter(id=prev_instance.buyer.id).update(point=F('point') + prev_instance.price)
-
+        # Tugagan mahsulot uchun tranzaksiya va qulflarsiz, darhol rad etish
+        if not self.pk and not Product.objects.filter(pk=self.product_id, amount__gt=keep_stock).exists():
+            raise ValidationError("Product is out of stock.", code='out_of_stock')
 
-        Product.objects.filter(id=self.product.id).update(amount=F('amount') - 1)
-        Student.objects.filter(id=self.buyer.id).update(point=F('point') - self.price)
-
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.pk:
+                prev_instance = SoldProduct.objects.select_for_update().get(pk=self.pk)
+                self._release(prev_instance.product_id, prev_instance.buyer_id, prev_instance.price)
+
+            if not Student.objects.filter(pk=self.buyer_id, point__gte=self.price).update(point=F('point') - self.price):
+                raise ValidationError("Student does not have enough points.", code='insufficient_points')
+            super().save(*args, **kwargs)
+            # Ko'p xaridor talashadigan mahsulot qatori oxirida, commit oldidan qulflanadi
+            if not Product.objects.filter(pk=self.product_id, amount__gt=keep_stock).update(amount=F('amount') - 1):
+                raise ValidationError("Product is out of stock.", code='out_of_stock')
+            transaction.on_commit(partial(leaderboard.adjust, self.buyer_id, -self.price))
 
     def delete(self, *args, **kwargs):
         with transaction.atomic():
-            Product.objects.filter(id=self.product.id).update(amount=F('amount') + 1)
-            Student.objects.filter(id=self.buyer.id).update(point=F('point') + self.price)
-            super().delete(*args, **kwargs)
\ No newline at end of file
+            self._release(self.product_id, self.buyer_id, self.price)
+            return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def _release(product_id, buyer_id, price):
+        """Sotuvni qaytarish: mahsulot soni va student bali tiklanadi."""
+        Product.objects.filter(pk=product_id).update(amount=F('amount') + 1)
+        Student.objects.filter(pk=buyer_id).update(point=F('point') + price)
+        transaction.on_commit(partial(leaderboard.adjust, buyer_id, price))
+
+
+class Bid(models.Model):
+    """
+    Auksion taklifi. Takliflar `auction.bidding.order_book` da qabul
+    qilinadi va bazaga to'plab (bulk_create) yoziladi.
+    """
+    product=models.ForeignKey(Product, on_delete=models.CASCADE)
+    student=models.ForeignKey('main.Student', on_delete=models.CASCADE)
+    amount=models.PositiveIntegerField()
+    created_at=models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'student', '-amount'], name='bid_product_student_amount_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.student_id} -> {self.amount}"
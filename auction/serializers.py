@@ -1,19 +1,66 @@
+from functools import partial
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
+from main.fieldsets import DynamicFieldsMixin
+from main.serializers import ImageVariantsField
+
 from .models import *
+from .bidding import BidRejected, order_book
+
+class ProductSerializer(DynamicFieldsMixin, ModelSerializer):
+    image_variants = ImageVariantsField()
 
-class ProductSerializer(ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
 
-class AuctionSerializer(ModelSerializer):
+class AuctionSerializer(DynamicFieldsMixin, ModelSerializer):
     products = ProductSerializer(many=True, read_only=True, source='product_set')
     class Meta:
         model = Auction
         fields = '__all__'
 
 
+class SoldProductSerializer(ModelSerializer):
+    class Meta:
+        model = SoldProduct
+        fields = '__all__'
+
+
+class PurchaseSerializer(serializers.Serializer):
+    """
+    Joriy auksion mahsulotini boshlang'ich narxida sotib olish: auksion
+    tugaguncha va faqat g'olib takliflarga va'da qilinmagan donalar.
+    """
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.only('id', 'start_point', 'auction_id'))
+
+    def validate_product(self, product):
+        auction = self.context['auction']
+        if auction is None or product.auction_id != auction.pk:
+            raise serializers.ValidationError("Mahsulot joriy auksionga tegishli emas.")
+        return product
 
+    def create(self, validated_data):
+        product = validated_data['product']
+        # Auksion ochiq va dona takliflarga va'da qilinmagan bo'lishi kerak
+        try:
+            promised = order_book.promised(product.pk)
+        except BidRejected as exc:
+            raise serializers.ValidationError({'product': [str(exc)]}, code=exc.code)
+        # Qoldiq va balans tekshiruvi SoldProduct.save ichida (shartli UPDATE bilan)
+        sold_product = SoldProduct(product=product, buyer_id=self.context['student_id'], price=product.start_point)
+        try:
+            sold_product.save(keep_stock=promised)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        transaction.on_commit(partial(order_book.sold, product.pk))
+        return sold_product
 
 
+class BidSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    amount = serializers.IntegerField(min_value=1)
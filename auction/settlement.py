@@ -0,0 +1,158 @@
+"""
+Auksion natijalarini bir martada yozish (settlement).
+
+G'oliblar bazadagi Bid yozuvlaridan hisoblanadi: har bir studentning
+mahsulotdagi eng yuqori taklifi olinadi va barcha takliflar kamayish
+tartibida (tengida oldinroq berilgani) ko'rib chiqiladi. Mahsulotda joy
+bo'lsa va studentning qolgan bali yetsa - g'olib; bal yetmasa taklif
+hisobotdagi `rejected` ga tushadi va joy keyingi taklifga o'tadi.
+
+Hammasi bitta tranzaksiyada, so'rovlar soni mahsulot va xaridorlar
+soniga bog'liq emas:
+
+- SoldProduct qatorlari - bitta bulk_create;
+- studentlar bali - bitta guruhlangan UPDATE (CASE ... WHEN);
+- mahsulotlar soni - bitta UPDATE (CASE ... WHEN).
+
+bulk_create va update() signal yubormaydi: versiyalar, reyting va jonli
+hodisalar shu yerda yangilanadi. Hisobot `Auction.settlement_report` da
+saqlanadi.
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Max, Min, PositiveIntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from main import events, versions
+from main.events import broadcaster
+from main.leaderboard import leaderboard
+from main.models import Student
+
+from .models import Auction, Bid, Product, SoldProduct
+
+INSUFFICIENT_POINTS = 'insufficient_points'
+
+
+class AlreadySettled(Exception):
+    def __init__(self):
+        super().__init__("Auksion natijalari allaqachon yozilgan.")
+
+
+def due_auctions(now=None):
+    """
+    Tugash vaqtidan AUCTION_SETTLE_DELAY soniya o'tgan, hali yakunlanmagan
+    auksionlar. Kechikish takliflar jarayoniga oxirgi takliflarni bazaga
+    yozib olishga (BID_FLUSH_INTERVAL) vaqt beradi.
+    """
+    now = now or timezone.now()
+    deadline = now - timedelta(seconds=getattr(settings, 'AUCTION_SETTLE_DELAY', 60))
+    auctions = Auction.objects.filter(settled_at=None, date__lte=timezone.localdate(deadline)).order_by('date', 'time')
+    return [auction for auction in auctions if auction.ends_at <= deadline]
+
+
+def allocate(products, bids, balances):
+    """
+    products: {product_id: (start_point, amount)}; bids: (product_id,
+    student_id, amount) kamayish tartibida; balances: {student_id: point}.
+    Natija: g'oliblar [(product_id, student_id, amount)] va rad etilganlar.
+    """
+    remaining = {product_id: amount for product_id, (_, amount) in products.items()}
+    balances = dict(balances)
+    winners, rejected = [], []
+    for product_id, student_id, amount in bids:
+        if remaining.get(product_id, 0) <= 0 or amount < products[product_id][0]:
+            continue
+        if balances.get(student_id, 0) < amount:
+            rejected.append({'product': product_id, 'student': student_id, 'amount': amount,
+                             'reason': INSUFFICIENT_POINTS})
+            continue
+        balances[student_id] -= amount
+        remaining[product_id] -= 1
+        winners.append((product_id, student_id, amount))
+    return winners, rejected
+
+
+def publish_settlement(report, stock):
+    for sale in report['sold']:
+        broadcaster.publish(events.SALE, {'id': sale['id'], 'product': sale['product'],
+                                          'buyer': sale['student'], 'price': sale['amount']})
+    for product_id, amount in stock.items():
+        broadcaster.publish(events.STOCK, {'product': product_id, 'amount': amount})
+    broadcaster.publish(events.SETTLED, {'auction': report['auction']})
+
+
+def settle(auction):
+    """Auksion g'oliblarini yozadi va hisobotni qaytaradi; qayta chaqirilsa AlreadySettled."""
+    started = time.perf_counter()
+    with transaction.atomic():
+        settled_at = timezone.now()
+        # Shartli UPDATE auksion qatorini qulflaydi: ikki jarayondan faqat bittasi yozadi
+        if not Auction.objects.filter(pk=auction.pk, settled_at=None).update(
+                settled_at=settled_at, closed_at=Coalesce('closed_at', Value(settled_at))):
+            raise AlreadySettled
+
+        products = {
+            product_id: (start_point, amount)
+            for product_id, start_point, amount in
+            Product.objects.filter(auction=auction).values_list('id', 'start_point', 'amount')
+        }
+        auction_bids = Bid.objects.filter(product__auction=auction)
+        bids = [
+            (row['product_id'], row['student_id'], row['amount'])
+            for row in auction_bids.values('product_id', 'student_id')
+            .annotate(amount=Max('amount'), first=Min('id')).order_by('-amount', 'first')
+        ]
+        balances = dict(Student.objects.select_for_update()
+                        .filter(pk__in=auction_bids.values('student_id')).values_list('id', 'point'))
+        winners, rejected = allocate(products, bids, balances)
+
+        sold_products = SoldProduct.objects.bulk_create(
+            [SoldProduct(product_id=product_id, buyer_id=student_id, price=amount)
+             for product_id, student_id, amount in winners],
+            batch_size=getattr(settings, 'BID_BATCH_SIZE', 500),
+        )
+        debits, counts = defaultdict(int), Counter()
+        for product_id, student_id, amount in winners:
+            debits[student_id] += amount
+            counts[product_id] += 1
+        if debits:
+            Student.objects.filter(pk__in=debits).update(point=Case(
+                *(When(pk=student_id, then=F('point') - total) for student_id, total in debits.items()),
+                default=F('point'), output_field=PositiveIntegerField(),
+            ))
+        if counts:
+            Product.objects.filter(pk__in=counts).update(amount=Case(
+                *(When(pk=product_id, then=F('amount') - count) for product_id, count in counts.items()),
+                default=F('amount'), output_field=PositiveIntegerField(),
+            ))
+
+        stock = {product_id: products[product_id][1] - count for product_id, count in counts.items()}
+        report = {
+            'auction': auction.pk,
+            'settled_at': settled_at.isoformat(),
+            'products': len(products),
+            'bids': len(bids),
+            'sold': [{'id': sold_product.pk, 'product': product_id, 'student': student_id, 'amount': amount}
+                     for sold_product, (product_id, student_id, amount) in zip(sold_products, winners)],
+            'unsold': [{'product': product_id, 'remaining': amount - counts[product_id]}
+                       for product_id, (_, amount) in products.items() if amount > counts[product_id]],
+            'rejected': rejected,
+            'points': sum(debits.values()),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        Auction.objects.filter(pk=auction.pk).update(settlement_report=report)
+        versions.bump(versions.AUCTION, versions.AUCTION_STOCK)
+
+        for student_id, total in debits.items():
+            transaction.on_commit(partial(leaderboard.adjust, student_id, -total))
+        transaction.on_commit(partial(publish_settlement, report, stock))
+
+    auction.closed_at = auction.closed_at or settled_at
+    auction.settled_at, auction.settlement_report = settled_at, report
+    return report
@@ -0,0 +1,55 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from main import events, images, versions
+from main.events import broadcaster
+from .models import Auction, Product, SoldProduct
+
+
+@receiver([post_save, post_delete], sender=Auction)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_auction(sender, **kwargs):
+    versions.bump(versions.AUCTION)
+
+
+@receiver([post_save, post_delete], sender=SoldProduct)
+def invalidate_auction_stock(sender, **kwargs):
+    # SoldProduct faqat mahsulot sonini (amount) o'zgartiradi
+    versions.bump(versions.AUCTION_STOCK)
+
+
+def publish_stock(product_id):
+    amount = Product.objects.filter(pk=product_id).values_list('amount', flat=True).first()
+    if amount is not None:
+        broadcaster.publish(events.STOCK, {'product': product_id, 'amount': amount})
+
+
+def publish_sale(sold_product):
+    broadcaster.publish(events.SALE, {'id': sold_product.pk, 'product': sold_product.product_id,
+                                      'buyer': sold_product.buyer_id, 'price': sold_product.price})
+    publish_stock(sold_product.product_id)
+
+
+@receiver(post_save, sender=SoldProduct)
+def sale_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(publish_sale, instance))
+    else:
+        transaction.on_commit(partial(publish_stock, instance.product_id))
+
+
+@receiver(post_delete, sender=SoldProduct)
+def sale_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(publish_stock, instance.product_id))
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    transaction.on_commit(partial(broadcaster.publish, events.STOCK,
+                                  {'product': instance.pk, 'amount': instance.amount}))
+
+
+post_save.connect(images.image_saved, sender=Product, dispatch_uid='product_image_variants')
@@ -0,0 +1,92 @@
+"""
+Joriy auksion va uning mahsulotlari - jarayon xotirasidagi tayyor javob.
+
+`/current-auction/` va `/current-auction/products/` (query parametrsiz)
+har so'rovda faqat versiyalarni o'qiydi (ETag uchun baribir kerak):
+
+- `auction` versiyasi o'zgarsa (Auction, Product yozildi) - snapshot qayta
+  quriladi;
+- faqat `auction-stock` o'zgarsa (sotuv) - serializatsiya qilingan
+  mahsulotlarda `amount` bitta kichik so'rov bilan yangilanadi;
+- aks holda javob to'liq xotiradan.
+
+Rasm URL'lari so'rov manziliga bog'liq, shuning uchun ma'lumot har bir
+`scheme://host/` uchun alohida saqlanadi.
+"""
+import threading
+from collections import namedtuple
+from django.db.models import Prefetch
+
+from main import versions
+
+from .models import Auction, Product
+
+Snapshot = namedtuple('Snapshot', 'stamp auction products')
+
+
+class CurrentAuctionCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._auction_id = None
+        self._rendered = {}
+
+    def snapshot(self, request):
+        """So'rov uchun Snapshot; bitta so'rov davomida bir xil (ETag va javob mos)."""
+        snapshot = getattr(request, '_auction_snapshot', None)
+        if snapshot is None:
+            stamp = versions.get_stamp(versions.AUCTION, versions.AUCTION_STOCK)
+            auction, products = self._get(stamp, request.build_absolute_uri('/'), request)
+            snapshot = request._auction_snapshot = Snapshot(stamp, auction, products)
+        return snapshot
+
+    def _get(self, stamp, base_url, request):
+        with self._lock:
+            current_stamp, auction_id, rendered = self._stamp, self._auction_id, self._rendered
+        if stamp != current_stamp:
+            if current_stamp is not None and stamp[0][0] == current_stamp[0][0]:
+                rendered = self._patch_stock(auction_id, rendered)
+            else:
+                rendered = {}
+            with self._lock:
+                self._stamp, self._rendered = stamp, rendered
+
+        data = rendered.get(base_url)
+        if data is None:
+            auction_id, data = self._build(request)
+            with self._lock:
+                if self._stamp == stamp:
+                    self._auction_id = auction_id
+                    self._rendered = dict(self._rendered, **{base_url: data})
+        return data
+
+    @staticmethod
+    def _build(request):
+        from .serializers import AuctionSerializer
+
+        auction = (Auction.objects.order_by('-date', '-time')
+                   .prefetch_related(Prefetch('product_set', queryset=Product.objects.order_by('id'))).first())
+        auction_data = AuctionSerializer(auction, context={'request': request}).data
+        products = auction_data['products'] if auction is not None else []
+        return (auction.pk if auction is not None else None), (auction_data, products)
+
+    @staticmethod
+    def _patch_stock(auction_id, rendered):
+        """Faqat `amount` o'zgargan: nusxalarda yangilanadi, serializatsiya qaytadan qilinmaydi."""
+        if auction_id is None or not rendered:
+            return rendered
+        amounts = dict(Product.objects.filter(auction_id=auction_id).values_list('id', 'amount'))
+        patched = {}
+        for base_url, (auction_data, products) in rendered.items():
+            products = [dict(product, amount=amounts.get(product['id'], product['amount'])) for product in products]
+            patched[base_url] = (dict(auction_data, products=products), products)
+        return patched
+
+    def clear(self):
+        with self._lock:
+            self._stamp = None
+            self._auction_id = None
+            self._rendered = {}
+
+
+current_auction = CurrentAuctionCache()
@@ -1,3 +1,578 @@
-from django.test import TestCase
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from main import events
+from main.authentication import RedactQueryTokenFilter, StreamToken
+from main.events import Broadcaster, broadcaster
+from main.leaderboard import leaderboard
+from main.models import Course, Mentor, Group, Student
+from .bidding import BidRejected, order_book
+from .settlement import AlreadySettled, settle
+from .snapshot import current_auction
+from .models import Auction, Product, SoldProduct, Bid
+
+
+class AuctionListQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='student'))
+
+    def add_auctions(self, count):
+        for index in range(count):
+            auction = Auction.objects.create(description=f'Auction {index}', date=date(2025, 1, 1), time=time(10))
+            for number in range(3):
+                Product.objects.create(name=f'Product {number}', start_point=10, auction=auction, amount=2)
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_auction_list_prefetches_products(self):
+        self.add_auctions(2)
+        small = self.query_count('/auctions/')
+        self.add_auctions(8)
+        self.assertEqual(self.query_count('/auctions/'), small)
+        # ETag versiyasi + auksionlar + mahsulotlar
+        self.assertEqual(small, 3)
+
+
+class CurrentAuctionConditionalGetTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group, point=100)
+        auction = Auction.objects.create(description='Auction', date=date(2025, 1, 1), time=time(10))
+        self.product = Product.objects.create(name='Kitob', start_point=10, auction=auction, amount=2)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def test_sale_changes_etag(self):
+        for url in ('/current-auction/', '/current-auction/products/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            SoldProduct.objects.create(product=self.product, buyer=self.student, price=20)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+
+class PurchaseTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group, point=50)
+        self.other = Student.objects.create(user=User.objects.create(username='other'), group=group, point=50)
+        old_auction = Auction.objects.create(description='Eski', date=date(2024, 1, 1), time=time(10))
+        self.old_product = Product.objects.create(name='Eski', start_point=10, auction=old_auction, amount=5)
+        # Xarid auksion tugaguncha (date + time) mumkin
+        self.auction = Auction.objects.create(description='Auction', date=timezone.localdate() + timedelta(days=1),
+                                              time=time(10))
+        self.product = Product.objects.create(name='Kitob', start_point=20, auction=self.auction, amount=1)
+        order_book.clear()
+        self.addCleanup(order_book.clear)
+        leaderboard.invalidate()
+        self.addCleanup(leaderboard.invalidate)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def test_purchase(self):
+        response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['buyer'], response.data['price']), (self.student.pk, 20))
+        self.student.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.student.point, self.product.amount), (30, 0))
+
+        # Qoldiq tugagan
+        response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SoldProduct.objects.count(), 1)
+
+    def test_rejections(self):
+        Student.objects.filter(pk=self.student.pk).update(point=19)
+        response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 1)
+
+        response = self.client.post('/current-auction/purchase/', {'product': self.old_product.pk})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.mentor.user)
+        response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SoldProduct.objects.exists())
+
+    @override_settings(BID_FLUSH_INTERVAL=None)
+    def test_purchase_does_not_take_stock_promised_to_bidders(self):
+        self.product.amount = 2
+        self.product.save()
+        order_book.place(self.product.pk, self.other.pk, 25)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 201)
+        # Qolgan bitta dona taklif beruvchiga va'da qilingan
+        response = self.client.post('/current-auction/purchase/', {'product': self.product.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(order_book.state(self.product.pk)['stock'], 1)
+        with self.assertRaises(BidRejected) as rejected:
+            order_book.place(self.product.pk, self.student.pk, 20)
+        self.assertEqual(rejected.exception.minimum, 26)
+
+        report = order_book.close(self.auction)
+        self.assertEqual([(row['student'], row['amount']) for row in report['sold']], [(self.other.pk, 25)])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 0)
+
+    def test_no_purchase_after_end_or_close(self):
+        Auction.objects.filter(pk=self.auction.pk).update(date=date(2025, 1, 1))
+        order_book.clear()
+        self.assertEqual(self.client.post('/current-auction/purchase/', {'product': self.product.pk}).status_code, 400)
+
+        Auction.objects.filter(pk=self.auction.pk).update(date=self.auction.date, closed_at=timezone.now())
+        order_book.clear()
+        self.assertEqual(self.client.post('/current-auction/purchase/', {'product': self.product.pk}).status_code, 400)
+        self.assertFalse(SoldProduct.objects.exists())
+
+
+class PurchaseConcurrencyTests(TransactionTestCase):
+    buyers = 100
+    workers = 16
+
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=mentor)
+        self.students = [
+            Student.objects.create(user=User.objects.create(username=f'student{index}'), group=group, point=100)
+            for index in range(self.buyers)
+        ]
+        auction = Auction.objects.create(description='Auction', date=timezone.localdate() + timedelta(days=1),
+                                         time=time(10))
+        order_book.clear()
+        self.addCleanup(order_book.clear)
+        self.scarce = Product.objects.create(name='Kam', start_point=30, auction=auction, amount=40)
+        self.plenty = Product.objects.create(name="Ko'p", start_point=30, auction=auction, amount=1000)
+
+    def purchase(self, attempt):
+        student, product = attempt
+        try:
+            client = APIClient()
+            client.force_authenticate(student.user)
+            return client.post('/current-auction/purchase/', {'product': product.pk}).status_code
+        finally:
+            connections.close_all()
+
+    def test_hundreds_of_concurrent_buyers(self):
+        # Har bir student: 1 ta kam mahsulot + 3 ta ko'p mahsulot urinishi, ball faqat 3 tasiga yetadi
+        attempts = [(student, product) for product in (self.scarce, self.plenty, self.plenty, self.plenty)
+                    for student in self.students]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            codes = list(executor.map(self.purchase, attempts))
+
+        self.assertEqual(set(codes), {201, 400})
+        self.assertEqual(codes.count(201), self.buyers * 3)
+        self.scarce.refresh_from_db()
+        self.plenty.refresh_from_db()
+        self.assertEqual(self.scarce.amount, 0)
+        self.assertEqual(SoldProduct.objects.filter(product=self.scarce).count(), 40)
+        self.assertEqual(self.plenty.amount, 1000 - (self.buyers * 3 - 40))
+        self.assertEqual(set(Student.objects.values_list('point', flat=True)), {10})
+        self.assertEqual(
+            set(SoldProduct.objects.values('buyer').annotate(count=Count('id')).values_list('count', flat=True)),
+            {3},
+        )
+
+
+@override_settings(BID_FLUSH_INTERVAL=None)
+class BiddingTests(TestCase):
+    def setUp(self):
+        order_book.clear()
+        leaderboard.invalidate()
+        self.addCleanup(order_book.clear)
+        self.addCleanup(leaderboard.invalidate)
+
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.students = {
+            name: Student.objects.create(user=User.objects.create(username=name), group=group, point=point)
+            for name, point in (('a', 50), ('b', 50), ('c', 30))
+        }
+        # Takliflar tugash vaqtigacha (date + time) qabul qilinadi
+        self.auction = Auction.objects.create(description='Auction', date=timezone.localdate() + timedelta(days=1),
+                                              time=time(10))
+        self.product = Product.objects.create(name='Kitob', start_point=10, auction=self.auction, amount=2)
+        self.other = Product.objects.create(name='Daftar', start_point=10, auction=self.auction, amount=5)
+
+    def bid(self, name, amount, product=None):
+        client = APIClient()
+        client.force_authenticate(self.students[name].user)
+        return client.post('/current-auction/bids/', {'product': (product or self.product).pk, 'amount': amount})
+
+    def test_bids_are_validated_in_memory(self):
+        response = self.bid('a', 5)
+        self.assertEqual((response.status_code, response.data['code'], response.data['minimum']), (400, 'too_low', 10))
+        self.assertEqual(self.bid('a', 10).status_code, 201)
+        self.assertEqual(self.bid('b', 15).data['minimum'], 11)
+
+        # Joy band: eng zaif g'olibdan (a, 10) ko'p bo'lishi kerak; tekshiruv bazasiz
+        with self.assertNumQueries(0), self.assertRaises(BidRejected) as rejected:
+            order_book.place(self.product.pk, self.students['c'].pk, 10)
+        self.assertEqual(rejected.exception.minimum, 11)
+        self.assertEqual(self.bid('c', 12).status_code, 201)
+
+        # c ning g'olib takliflari yig'indisi balidan (30) oshmasligi kerak
+        response = self.bid('c', 20, self.other)
+        self.assertEqual((response.status_code, response.data['code']), (400, 'insufficient_points'))
+        # a siqib chiqarilgan, uning bali yana bo'sh
+        self.assertEqual(self.bid('a', 50, self.other).status_code, 201)
+
+        client = APIClient()
+        client.force_authenticate(self.mentor.user)
+        state = client.get(f'/products/{self.product.pk}/bids/').data
+        self.assertEqual(state['minimum'], 13)
+        self.assertEqual(state['leaders'], [{'student': self.students['b'].pk, 'amount': 15},
+                                            {'student': self.students['c'].pk, 'amount': 12}])
+
+    @override_settings(BID_BATCH_SIZE=3)
+    def test_bids_are_persisted_in_batches(self):
+        self.bid('a', 10)
+        self.bid('b', 11)
+        self.assertFalse(Bid.objects.exists())
+        self.bid('a', 12)
+        self.assertEqual(Bid.objects.count(), 3)
+        self.bid('c', 13)
+        self.assertEqual(order_book.flush(), 1)
+
+        # Qayta ishga tushgandan keyin holat bazadan tiklanadi
+        order_book.clear()
+        leaders = order_book.state(self.product.pk)['leaders']
+        self.assertEqual([leader['amount'] for leader in leaders], [13, 12])
+
+    def test_failed_flush_keeps_bids_for_settlement(self):
+        self.bid('a', 20)
+        self.bid('b', 25)
+        bulk_create = Bid.objects.bulk_create
+        with mock.patch.object(Bid.objects, 'bulk_create', side_effect=DatabaseError('disk I/O error')):
+            with self.assertRaises(DatabaseError):
+                order_book.flush()
+            # Fon/partiya yozuvi xatoni log'ga yozadi, takliflar navbatda qoladi
+            with self.assertLogs('auction.bidding', 'ERROR'):
+                order_book._flush_quietly()
+        self.assertFalse(Bid.objects.exists())
+
+        with mock.patch.object(Bid.objects, 'bulk_create', wraps=bulk_create) as writes:
+            self.assertEqual(order_book.flush(), 2)
+        self.assertEqual(writes.call_count, 1)
+        report = settle(self.auction)
+        self.assertEqual(sorted((sale['student'], sale['amount']) for sale in report['sold']),
+                         [(self.students['a'].pk, 20), (self.students['b'].pk, 25)])
+
+    def test_flush_writes_outside_the_order_book_lock(self):
+        self.bid('a', 20)
+
+        def write(batch, **kwargs):
+            # Yozish paytida boshqa takliflar lock'ni kutmaydi
+            self.assertFalse(order_book._lock.locked())
+            return batch
+
+        with mock.patch.object(Bid.objects, 'bulk_create', side_effect=write):
+            self.assertEqual(order_book.flush(), 1)
+
+    def test_close_creates_sold_products(self):
+        self.bid('a', 20)
+        self.bid('b', 25)
+        self.bid('c', 30)
+        self.bid('a', 40, self.other)
+
+        client = APIClient()
+        client.force_authenticate(self.mentor.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/auctions/{self.auction.pk}/close/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['sold']), 3)
+        # a (20) c tomonidan siqib chiqarilgan, a ning bali Daftar (40) ga yetadi
+        self.assertEqual(
+            sorted(SoldProduct.objects.values_list('product__name', 'buyer__user__username', 'price')),
+            [('Daftar', 'a', 40), ('Kitob', 'b', 25), ('Kitob', 'c', 30)],
+        )
+        self.assertEqual(Student.objects.get(pk=self.students['a'].pk).point, 10)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).amount, 0)
+        self.assertIsNotNone(Auction.objects.get(pk=self.auction.pk).closed_at)
+
+        self.assertEqual(self.bid('a', 100).data['code'], 'not_open')
+        self.assertEqual(client.post(f'/auctions/{self.auction.pk}/close/').status_code, 400)
+
+    def test_missing_products_are_not_looked_up_again(self):
+        self.assertEqual(self.bid('a', 10).status_code, 201)
+        with self.assertRaises(BidRejected):
+            order_book.place(999, self.students['a'].pk, 10)
+        # Topilmagan mahsulot keshlangan, reyting yuklangan: bazaga murojaat yo'q
+        with self.assertNumQueries(0), self.assertRaises(BidRejected):
+            order_book.place(999, self.students['a'].pk, 10)
+
+    def test_settlement_rechecks_stale_balances(self):
+        self.assertEqual(self.bid('c', 30).status_code, 201)
+        # Boshqa worker'dagi xarid: bu jarayon reytingida hali ko'rinmaydi
+        Student.objects.filter(pk=self.students['c'].pk).update(point=5)
+        self.assertEqual(leaderboard.balance(self.students['c'].pk), 30)
+
+        report = order_book.close(self.auction)
+        self.assertEqual(report['sold'], [])
+        self.assertEqual([(row['student'], row['reason']) for row in report['rejected']],
+                         [(self.students['c'].pk, 'insufficient_points')])
+
+    def test_bids_after_end_are_rejected(self):
+        Auction.objects.filter(pk=self.auction.pk).update(date=date(2025, 1, 1))
+        order_book.clear()
+        self.assertEqual(self.bid('a', 20).data['code'], 'not_open')
+
+
+class SettlementTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        self.addCleanup(leaderboard.invalidate)
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.auction = Auction.objects.create(description='Auction', date=date(2025, 1, 1), time=time(10))
+
+    def add_students(self, *points):
+        return [Student.objects.create(user=User.objects.create(username=f's{Student.objects.count()}'),
+                                       group=self.group, point=point) for point in points]
+
+    def test_settle_allocates_by_bid_and_balance(self):
+        a, b, c = self.add_students(50, 50, 30)
+        book = Product.objects.create(name='Kitob', start_point=10, auction=self.auction, amount=2)
+        pen = Product.objects.create(name='Daftar', start_point=10, auction=self.auction, amount=5)
+        Bid.objects.bulk_create([Bid(product=product, student=student, amount=amount) for product, student, amount in (
+            (book, a, 15), (book, a, 20), (book, b, 25), (book, c, 30), (pen, c, 20), (pen, a, 40))])
+
+        leaderboard.top()
+        start = broadcaster.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            report = settle(self.auction)
+
+        self.assertEqual(
+            sorted(SoldProduct.objects.values_list('product__name', 'buyer_id', 'price')),
+            [('Daftar', a.pk, 40), ('Kitob', b.pk, 25), ('Kitob', c.pk, 30)],
+        )
+        # c ning bali Kitob (30) dan keyin Daftar (20) ga yetmaydi
+        self.assertEqual(report['rejected'], [{'product': pen.pk, 'student': c.pk, 'amount': 20,
+                                               'reason': 'insufficient_points'}])
+        self.assertEqual(report['unsold'], [{'product': pen.pk, 'remaining': 4}])
+        self.assertEqual(report['points'], 95)
+        self.assertEqual(dict(Student.objects.values_list('id', 'point')), {a.pk: 10, b.pk: 25, c.pk: 0})
+        self.assertEqual(dict(Product.objects.values_list('id', 'amount')), {book.pk: 0, pen.pk: 4})
+        self.assertEqual(leaderboard.balance(a.pk), 10)
+
+        frames = b''.join(frame for _, frame in broadcaster.since(start)).decode()
+        self.assertIn(f'event: stock\ndata: {{"product":{book.pk},"amount":0}}', frames)
+        self.assertIn(f'event: settled\ndata: {{"auction":{self.auction.pk}}}', frames)
+
+        auction = Auction.objects.get(pk=self.auction.pk)
+        self.assertIsNotNone(auction.closed_at)
+        self.assertEqual(auction.settlement_report, report)
+        with self.assertRaises(AlreadySettled):
+            settle(auction)
+
+        client = APIClient()
+        client.force_authenticate(self.mentor.user)
+        self.assertEqual(client.get(f'/auctions/{auction.pk}/settlement/').data, report)
+        self.assertEqual(client.post(f'/auctions/{auction.pk}/settlement/').status_code, 400)
+
+    def settle_queries(self, products):
+        students = self.add_students(*[10000] * 20)
+        auction = Auction.objects.create(description=f'Auction {products}', date=date(2025, 1, 1), time=time(10))
+        items = Product.objects.bulk_create([
+            Product(name=f'Product {index}', start_point=10, auction=auction, amount=3)
+            for index in range(products)])
+        Bid.objects.bulk_create([
+            Bid(product=product, student=student, amount=10 + offset)
+            for product in items for offset, student in enumerate(students[:5])])
+        with CaptureQueriesContext(connection) as ctx:
+            report = settle(auction)
+        self.assertEqual(len(report['sold']), products * 3)
+        # bulk_create qatorlarni backend parametr chegarasi bo'yicha bo'ladi (SQLite - 999)
+        return len([query for query in ctx.captured_queries
+                    if not query['sql'].startswith('INSERT INTO "auction_soldproduct"')]), report
+
+    def test_settlement_is_batched(self):
+        self.settle_queries(1)  # versiya qatorlari birinchi marta yaratiladi
+        small, _ = self.settle_queries(10)
+        large, report = self.settle_queries(200)
+        # So'rovlar soni mahsulot va g'oliblar soniga bog'liq emas
+        self.assertEqual(small, large)
+        self.assertLess(report['duration_ms'], 1000)
+        self.assertEqual(SoldProduct.objects.filter(product__auction=report['auction']).count(), 600)
+        self.assertFalse(Product.objects.filter(auction=report['auction']).exclude(amount=0).exists())
+
+    def test_command_settles_due_auctions(self):
+        student, = self.add_students(100)
+        product = Product.objects.create(name='Kitob', start_point=10, auction=self.auction, amount=1)
+        Bid.objects.create(product=product, student=student, amount=30)
+        upcoming = Auction.objects.create(description='Upcoming', date=timezone.localdate() + timedelta(days=1),
+                                          time=time(10))
+
+        out = StringIO()
+        call_command('settle_auctions', stdout=out)
+        self.assertIn(f'#{self.auction.pk}: 1 ta sotuv', out.getvalue())
+        self.assertIsNotNone(Auction.objects.get(pk=self.auction.pk).settled_at)
+        self.assertIsNone(Auction.objects.get(pk=upcoming.pk).settled_at)
+        self.assertEqual(Student.objects.get(pk=student.pk).point, 70)
+
+
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        self.addCleanup(leaderboard.invalidate)
+        course = Course.objects.create(name='Python')
+        mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group, point=100)
+        auction = Auction.objects.create(description='Auction', date=date(2025, 1, 1), time=time(10))
+        self.product = Product.objects.create(name='Kitob', start_point=10, auction=auction, amount=2)
+        self.token = str(StreamToken.for_user(self.student.user))
+
+    def test_sale_publishes_stock_and_points(self):
+        leaderboard.top()
+        start = broadcaster.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            SoldProduct.objects.create(product=self.product, buyer=self.student, price=30)
+        frames = b''.join(frame for _, frame in broadcaster.since(start)).decode()
+        self.assertIn(f'event: sale\ndata: {{"id":{SoldProduct.objects.get().pk},"product":{self.product.pk},'
+                      f'"buyer":{self.student.pk},"price":30}}', frames)
+        self.assertIn(f'event: stock\ndata: {{"product":{self.product.pk},"amount":1}}', frames)
+        self.assertIn(f'event: points\ndata: {{"student":{self.student.pk},"delta":-30,"point":70}}', frames)
+
+    def test_ring_buffer_overflow_requests_reset(self):
+        with override_settings(EVENT_BUFFER_SIZE=3):
+            local = Broadcaster()
+        for amount in range(5):
+            local.publish(events.STOCK, {'product': 1, 'amount': amount})
+        self.assertEqual([event_id for event_id, _ in local.since(3)], [4, 5])
+        self.assertIsNone(local.since(1))
+        self.assertEqual(local.since(5), [])
+
+    def test_stream_requires_token(self):
+        self.assertEqual(self.client.get('/current-auction/events/').status_code, 401)
+        self.assertEqual(self.client.get('/current-auction/events/?token=yaroqsiz').status_code, 401)
+
+    def test_stream_accepts_only_short_lived_stream_tokens(self):
+        access = str(AccessToken.for_user(self.student.user))
+        self.assertEqual(self.client.get(f'/current-auction/events/?token={access}').status_code, 401)
+
+        self.assertEqual(self.client.post('/current-auction/events/token/').status_code, 401)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.post('/current-auction/events/token/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 60)
+        token = StreamToken(response.data['token'])
+        self.assertEqual(token['user_id'], self.student.user_id)
+        self.assertLessEqual(token['exp'] - token['iat'], 60)
+
+        # Oqim tokeni API uchun access token sifatida yaramaydi
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['token']}")
+        self.assertEqual(client.get('/current-auction/').status_code, 401)
+
+        with override_settings(STREAM_TOKEN_LIFETIME=timedelta(seconds=-1)):
+            expired = str(StreamToken.for_user(self.student.user))
+        self.assertEqual(self.client.get(f'/current-auction/events/?token={expired}').status_code, 401)
+
+    def test_logged_urls_do_not_contain_tokens(self):
+        record = logging.LogRecord('django.server', logging.INFO, __file__, 0, '"%s" %s %s',
+                                   (f'GET /current-auction/events/?token={self.token}&last_event_id=3 HTTP/1.1',
+                                    200, 0), None)
+        self.assertTrue(RedactQueryTokenFilter().filter(record))
+        self.assertEqual(record.getMessage(),
+                         '"GET /current-auction/events/?token=[yashirilgan]&last_event_id=3 HTTP/1.1" 200 0')
+        self.assertTrue(any(isinstance(log_filter, RedactQueryTokenFilter)
+                            for log_filter in logging.getLogger('django.server').filters))
+
+    async def test_stream_fans_out_shared_frames(self):
+        streams = []
+        for _ in range(2):
+            response = await self.async_client.get(f'/current-auction/events/?token={self.token}')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = aiter(response.streaming_content)
+            self.assertTrue((await anext(stream)).startswith(b'retry:'))
+            streams.append(stream)
+
+        event_id = broadcaster.publish(events.STOCK, {'product': self.product.pk, 'amount': 1})
+        frames = [await asyncio.wait_for(anext(stream), 1) for stream in streams]
+        self.assertTrue(frames[0].startswith(f'id: {event_id}\nevent: stock\n'.encode()))
+        # Kadr bir marta kodlanadi, barcha mijozlar bir xil baytlarni oladi
+        self.assertIs(frames[0], frames[1])
+        for stream in streams:
+            await stream.aclose()
+
+
+class CurrentAuctionSnapshotTests(TestCase):
+    def setUp(self):
+        current_auction.clear()
+        self.addCleanup(current_auction.clear)
+        course = Course.objects.create(name='Python')
+        mentor = Mentor.objects.create(user=User.objects.create(username='mentor'), course=course)
+        group = Group.objects.create(name='P-1', mentor=mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group, point=100)
+        Auction.objects.create(description='Eski', date=date(2024, 1, 1), time=time(10))
+        self.auction = Auction.objects.create(description='Auction', date=date(2025, 1, 1), time=time(10))
+        self.product = Product.objects.create(name='Kitob', start_point=10, auction=self.auction, amount=3)
+        Product.objects.create(name='Daftar', start_point=5, auction=self.auction, amount=7)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def test_served_from_memory_after_first_request(self):
+        for url in ('/current-auction/', '/current-auction/products/'):
+            self.client.get(url)
+            # Faqat ETag uchun versiya so'rovi
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/current-auction/')
+        self.assertEqual(response.data['description'], 'Auction')
+        self.assertEqual([product['name'] for product in response.data['products']], ['Kitob', 'Daftar'])
+        # Snapshot odatdagi serializer javobi bilan bir xil
+        self.assertEqual(response.json(), self.client.get('/current-auction/?fields=').json())
+
+    def test_sale_patches_stock_without_rebuilding(self):
+        self.client.get('/current-auction/products/')
+        SoldProduct.objects.create(product=self.product, buyer=self.student, price=10)
+
+        # versiya + mahsulot qoldiqlari
+        with self.assertNumQueries(2):
+            response = self.client.get('/current-auction/products/')
+        self.assertEqual([product['amount'] for product in response.data], [2, 7])
+        self.assertEqual(response.json(), self.client.get('/current-auction/products/?ordering=id').json())
+        self.assertEqual(self.client.get('/current-auction/').data['products'][0]['amount'], 2)
+
+    def test_product_changes_rebuild_snapshot(self):
+        self.client.get('/current-auction/products/')
+        Product.objects.create(name='Ruchka', start_point=1, auction=self.auction, amount=1)
+        response = self.client.get('/current-auction/products/')
+        self.assertEqual([product['name'] for product in response.data], ['Kitob', 'Daftar', 'Ruchka'])
@@ -1,29 +1,70 @@
 from rest_framework.generics import *
 from .serializers import *
 from .models import *
+from .bidding import order_book, BidRejected
+from .settlement import AlreadySettled, settle
+from .snapshot import current_auction
 from rest_framework.permissions import IsAuthenticated
-
-
-
-class AuctionListView(ListAPIView):
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from main import versions
+from main.conditional import ConditionalGetMixin
+from main.authentication import StreamToken, authenticate_query_token
+from main.docs import swagger_auto_schema
+from main.events import broadcaster
+from main.optimizer import OptimizedQuerysetMixin
+from main.permissions import IsStudent, IsMentorOrAdmin
+from main.roles import get_role
+
+
+
+class AuctionListView(ConditionalGetMixin, OptimizedQuerysetMixin, ListAPIView):
     queryset = Auction.objects.all().order_by('date', 'time')
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = (versions.AUCTION, versions.AUCTION_STOCK)
+    stateless_authentication = True
 
 class AuctionCreateView(CreateAPIView):
     queryset = Auction.objects.all()
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
 
-class AuctionDetailView(ListAPIView):
+class AuctionDetailView(ConditionalGetMixin, OptimizedQuerysetMixin, ListAPIView):
     queryset = Auction.objects.all()
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = (versions.AUCTION, versions.AUCTION_STOCK)
+    stateless_authentication = True
+
+
+class CurrentAuctionSnapshotMixin:
+    """
+    Query parametrsiz so'rovlarga javob `current_auction` snapshot'idan
+    (auction/snapshot.py): ETag va javob bir xil versiyadan, bazaga faqat
+    versiya so'rovi. `?fields=`, `?ordering=` va h.k. odatdagi yo'l bilan.
+    """
+
+    def use_snapshot(self, request):
+        return not request.query_params
 
+    def get_stamp(self, request):
+        if self.use_snapshot(request):
+            return current_auction.snapshot(request).stamp
+        return super().get_stamp(request)
 
-class CurrentAuctionDetailView(RetrieveAPIView):
+
+class CurrentAuctionDetailView(CurrentAuctionSnapshotMixin, ConditionalGetMixin, RetrieveAPIView):
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = (versions.AUCTION, versions.AUCTION_STOCK)
+    stateless_authentication = True
 
     def get_queryset(self):
         return Auction.objects.order_by('-date','-time')
@@ -32,22 +73,165 @@ class CurrentAuctionDetailView(RetrieveAPIView):
         queryset = self.get_queryset()
         return queryset.first()
 
-class CurrentAuctionProductsView(ListAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        if self.use_snapshot(request):
+            return Response(current_auction.snapshot(request).auction)
+        return super().retrieve(request, *args, **kwargs)
+
+class CurrentAuctionProductsView(CurrentAuctionSnapshotMixin, ConditionalGetMixin, OptimizedQuerysetMixin,
+                                 ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = (versions.AUCTION, versions.AUCTION_STOCK)
+    stateless_authentication = True
 
     def get_queryset(self):
-        latest_auction = Auction.objects.order_by('-date', '-time').first()
+        latest_auction = Auction.current()
         if latest_auction is None:
             return Product.objects.none()
 
-        return Product.objects.filter(auction=latest_auction)
-
+        return Product.objects.filter(auction=latest_auction).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        if self.use_snapshot(request):
+            return Response(current_auction.snapshot(request).products)
+        return super().list(request, *args, **kwargs)
+
+
+class CurrentAuctionPurchaseView(APIView):
+    """
+    Student joriy auksion mahsulotini sotib oladi. Mahsulot soni va ball
+    bir tranzaksiyada shartli UPDATE bilan kamayadi: qoldiq yoki ball
+    yetmasa 400, ortiqcha sotuv va manfiy ball bo'lmaydi. Auksion tugagan
+    yoki yopilgan bo'lsa, yoki qolgan donalar g'olib takliflarga va'da
+    qilingan bo'lsa ham 400 (`order_book.promised`).
+    """
+    permission_classes = [IsStudent]
+
+    @swagger_auto_schema(request_body=PurchaseSerializer, responses={201: SoldProductSerializer})
+    def post(self, request, *args, **kwargs):
+        context = {'auction': Auction.current(), 'student_id': get_role(request).student_id}
+        serializer = PurchaseSerializer(data=request.data, context=context)
+        serializer.is_valid(raise_exception=True)
+        sold_product = serializer.save()
+        return Response(SoldProductSerializer(sold_product).data, status=status.HTTP_201_CREATED)
+
+
+class CurrentAuctionBidView(APIView):
+    """
+    Joriy auksion mahsulotiga taklif. Taklif xotiradagi `order_book` da
+    bazaga so'rovsiz tekshiriladi; rad etilsa 400 va `minimum` - qabul
+    qilinadigan eng kichik taklif.
+    """
+    permission_classes = [IsStudent]
+
+    @swagger_auto_schema(request_body=BidSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = BidSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_id, amount = serializer.validated_data['product'], serializer.validated_data['amount']
+        try:
+            minimum = order_book.place(product_id, get_role(request).student_id, amount)
+        except BidRejected as exc:
+            return Response({'detail': str(exc), 'code': exc.code, 'minimum': exc.minimum},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'product': product_id, 'amount': amount, 'minimum': minimum},
+                        status=status.HTTP_201_CREATED)
+
+
+class ProductBidsView(APIView):
+    """Mahsulot bo'yicha joriy g'olib takliflar va keyingi minimal taklif."""
+    permission_classes = [IsAuthenticated]
+    stateless_authentication = True
+
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            return Response(order_book.state(pk))
+        except BidRejected as exc:
+            raise NotFound(str(exc))
+
+
+class AuctionCloseView(APIView):
+    """Auksionni yopish: g'olib takliflar SoldProduct bo'ladi."""
+    permission_classes = [IsMentorOrAdmin]
+
+    def post(self, request, pk, *args, **kwargs):
+        auction = get_object_or_404(Auction, pk=pk)
+        try:
+            report = order_book.close(auction)
+        except BidRejected as exc:
+            return Response({'detail': str(exc), 'code': exc.code}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+class AuctionSettlementView(APIView):
+    """
+    GET - auksion natijalari hisoboti, POST - natijalarni yozish (yopilmagan
+    auksion avval yopiladi). Tugash vaqti o'tgan auksionlar uchun
+    `manage.py settle_auctions` ham shuni qiladi.
+    """
+    permission_classes = [IsMentorOrAdmin]
+
+    def get(self, request, pk, *args, **kwargs):
+        auction = get_object_or_404(Auction, pk=pk)
+        if auction.settled_at is None:
+            raise NotFound("Auksion natijalari hali yozilmagan.")
+        return Response(auction.settlement_report)
+
+    def post(self, request, pk, *args, **kwargs):
+        auction = get_object_or_404(Auction, pk=pk)
+        try:
+            report = order_book.close(auction) if auction.closed_at is None else settle(auction)
+        except (BidRejected, AlreadySettled) as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+class CurrentAuctionEventsTokenView(APIView):
+    """
+    Jonli hodisalar oqimi uchun qisqa muddatli token. Access token URL ga
+    (va u orqali loglarga) tushmasligi uchun EventSource shu tokenni oladi.
+    """
+    permission_classes = [IsAuthenticated]
 
-class ProductListView(ListAPIView):
+    def post(self, request, *args, **kwargs):
+        token = StreamToken.for_user(request.user)
+        return Response({'token': str(token), 'expires_in': int(token.lifetime.total_seconds())})
+
+
+@require_GET
+async def current_auction_events(request):
+    """
+    Jonli hodisalar (Server-Sent Events): stock, sale, bid, points. Har
+    soniyada /current-auction/ ni so'rash o'rniga. EventSource sarlavha
+    yubora olmagani uchun /current-auction/events/token/ dan olingan
+    qisqa muddatli token `?token=` da beriladi (access token qabul
+    qilinmaydi); token tekshirilgach oqim bazaga murojaat qilmaydi.
+    ASGI (core/asgi.py) ostida ishlaydi.
+    """
+    token = await sync_to_async(authenticate_query_token)(request.GET.get('token', ''))
+    if token is None:
+        return JsonResponse({'detail': "Token yaroqsiz yoki berilmagan."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_event_id = broadcaster.last_id
+
+    response = StreamingHttpResponse(broadcaster.stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx javobni buferlamasin
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class ProductListView(ConditionalGetMixin, OptimizedQuerysetMixin, ListAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = (versions.AUCTION, versions.AUCTION_STOCK)
+    stateless_authentication = True
 
     def get_queryset(self):
         auction_id = self.kwargs.get('pk')
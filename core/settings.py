@@ -63,12 +63,21 @@ CORS_ORIGIN_ALLOW_ALL = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'main.authentication.RevocableJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'main.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'main.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',
@@ -86,9 +95,15 @@ SWAGGER_SETTINGS = {
     }
 }
 
+# `manage.py generate_schema` shu faylga yozadi; bo'lmasa sxema birinchi
+# /docs/ so'rovida yaratilib keshda saqlanadi
+SWAGGER_SCHEMA_FILE = BASE_DIR / 'openapi.json'
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=180),
+    "TOKEN_OBTAIN_SERIALIZER": "main.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "main.serializers.RevocableTokenRefreshSerializer",
 }
 
 ROOT_URLCONF = 'core.urls'
@@ -119,6 +134,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Yozuvchi tranzaksiyalar darhol qulf oladi va navbat kutadi,
+        # parallel ball berishda "database is locked" xatosi chiqmaydi
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Parallel yozuv testlari xotiradagi (shared cache) bazada ishlamaydi
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -163,6 +188,17 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    # Yangi fayllar mazmun-xeshli nom bilan saqlanadi (main/storage.py)
+    'default': {'BACKEND': 'main.storage.HashedMediaStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Media fayllarni proksi orqali berish: None (Django o'zi beradi),
+# 'X-Accel-Redirect' (nginx) yoki 'X-Sendfile' (Apache/lighttpd)
+MEDIA_OFFLOAD_HEADER = None
+MEDIA_OFFLOAD_PREFIX = '/protected-media/'
+
 JAZZMIN_SETTINGS = {
     'site_title': 'Codial Gamification',
     'site_header': 'Codial Gamification',
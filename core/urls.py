@@ -3,36 +3,25 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 
 from django.conf import settings
-from django.conf.urls.static import static
-
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
 from auction.views import *
 from main.views import *
+from main.media import serve_media
+from main.docs import SchemaView
 # from main.schema import *
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Codial Gamification App's API",
-        default_version='v1',
-        description="Codial Gamification App's API",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="otabekpm@gmail.com"),
-    ),
-    public=True,
-    permission_classes=(permissions.IsAuthenticated,),
-)
-
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('docs/', SchemaView.as_view(), name='schema-swagger-ui'),
     # path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-swagger-ui'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name='media'),
+]
 
 urlpatterns += [
     path('users/get-me/', UserDetailView.as_view(), name='user-details'),
@@ -50,6 +39,7 @@ urlpatterns += [
     path('point-types/<int:pk>/', PointTypeRetrieveUpdateDestroyView.as_view()),
     path('give-points/', GivePointListCreateView.as_view(), name='give_points'),
     path('give-points/<int:pk>/', GivePointRetrieveUpdateDestroyView.as_view()),
+    path('give-points/bulk/', BulkGivePointCreateView.as_view(), name='give_points_bulk'),
     path('given-points/', GivenPointListView.as_view(), name='given_points'),
     path('student-points/', StudentPointsListView.as_view(), name='student_points'),
     path('auctions/',AuctionListView.as_view(),name='auction-list'),
@@ -57,15 +47,27 @@ urlpatterns += [
     path('auctions/<int:pk>/',AuctionDetailView.as_view(),name='auction-detail'),
     path('current-auction/',CurrentAuctionDetailView.as_view(),name='current-auction-detail'),
     path('current-auction/products/',CurrentAuctionProductsView.as_view(),name='current-auction-products'),
+    path('current-auction/purchase/',CurrentAuctionPurchaseView.as_view(),name='current-auction-purchase'),
+    path('current-auction/bids/',CurrentAuctionBidView.as_view(),name='current-auction-bids'),
+    path('current-auction/events/',current_auction_events,name='current-auction-events'),
+    path('current-auction/events/token/',CurrentAuctionEventsTokenView.as_view(),name='current-auction-events-token'),
+    path('products/<int:pk>/bids/',ProductBidsView.as_view(),name='product-bids'),
+    path('auctions/<int:pk>/close/',AuctionCloseView.as_view(),name='auction-close'),
+    path('auctions/<int:pk>/settlement/',AuctionSettlementView.as_view(),name='auction-settlement'),
     path('create-product/',CreateProductView.as_view(),name='create-product'),
     path('auctions/<int:pk>/products/',ProductListView.as_view(),name='product-list'),
     path('news/',NewsListView.as_view(),name='news-list'),
     path('news/<int:pk>/',NewDetailView.as_view(),name='news-detail'),
     path('news/<int:pk>/mark-as-read/', MarkAsReadAPIView.as_view(), name='mark_as_read'),
+    path('news/mark-as-read/', MarkManyAsReadAPIView.as_view(), name='mark_many_as_read'),
+    path('news/mark-all-read/', MarkAllAsReadAPIView.as_view(), name='mark_all_read'),
     # path('news/mark-as-read/', GetReadStatusAPIView.as_view(), name='mark_as_read_get'),
     path('news/get-read-status/', AllReadStatusAPIView.as_view(), name='get-read-status'),
     path('reset-points/',ResetAllStudentsPointsView.as_view(), name='reset-points'),
     path('average-points/',CourseAveragePointsListAPIView.as_view(), name='average-points'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/me/', LeaderboardMyRankView.as_view(), name='leaderboard-me'),
+    path('leaderboard/me/neighbours/', LeaderboardNeighboursView.as_view(), name='leaderboard-neighbours'),
     # path('average-points-02/',CourseAveragePointsAPIView.as_view(), name='average-points'),
     # path('task/',include('second.urls'))
 ]
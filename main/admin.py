@@ -14,6 +14,7 @@ class MentorAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'course', 'point_limit')
     list_display_links = ('id', 'user')
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    list_select_related = ('user', 'course')
 
 
 @admin.register(Group)
@@ -22,6 +23,7 @@ class GroupAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'name')
     list_filter = ('mentor', 'active')
     search_fields = ('name',)
+    list_select_related = ('mentor__user',)
 
 
 @admin.register(Student)
@@ -32,6 +34,7 @@ class StudentAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
     ordering = ('-point',)
     list_editable = ('point',)
+    list_select_related = ('user', 'group')
 
 
 @admin.register(PointType)
@@ -50,6 +53,7 @@ class GivePointAdmin(admin.ModelAdmin):
         'student__user__username', 'student__user__first_name', 'student__user__last_name',
         'mentor__user__username', 'mentor__user__first_name', 'mentor__user__last_name'
     )
+    list_select_related = ('mentor__user', 'student__user', 'point_type')
 
 
 @admin.register(New)
@@ -60,3 +64,9 @@ class NewsAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'deleted_user_id', 'jti', 'claims_only', 'revoked_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('jti', 'user__username')
+    raw_id_fields = ('user',)
@@ -1,6 +1,17 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .authentication import RedactQueryTokenFilter
+
+        # So'rov qatorini yozadigan loggerlar: ?token= loglarda qolmasin
+        for name in getattr(settings, 'REDACT_TOKEN_LOGGERS', ('django.server', 'django.request', 'uvicorn.access')):
+            logging.getLogger(name).addFilter(RedactQueryTokenFilter())
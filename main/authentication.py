@@ -0,0 +1,191 @@
+"""
+JWT autentifikatsiyasi: bekor qilingan tokenlar ro'yxati va o'qish
+so'rovlari uchun bazasiz yo'l.
+
+`stateless_authentication = True` bo'lgan view'larda GET/HEAD/OPTIONS
+so'rovlari uchun User bazadan o'qilmaydi - token claim'laridan TokenUser
+yaratiladi. Yozish so'rovlari va boshqa view'lar odatdagidek User ni
+bazadan oladi. Har ikki holatda token bekor qilinganlar ro'yxatida
+tekshiriladi.
+
+Foydalanuvchining roli yoki is_staff/is_superuser o'zgarsa (signals.py),
+shu paytgacha berilgan tokenlarning claim'lari eskirgan deb belgilanadi:
+bunday tokenlar uchun User va rol bazadan olinadi.
+
+EventSource sarlavha yubora olmaydi, shuning uchun jonli hodisalar oqimi
+token'ni URL da oladi. URL proksi va server loglariga tushadi: u yerda
+30 kunlik access token emas, faqat oqimni ochishga yaraydigan qisqa
+muddatli StreamToken ishlatiladi, loglarda esa `token=` qiymati
+yashiriladi (RedactQueryTokenFilter).
+"""
+import logging
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class RevocationList:
+    """
+    Bekor qilingan tokenlar jarayon xotirasida: jti lar to'plami,
+    foydalanuvchi bo'yicha "shu vaqtgacha berilganlari bekor" va "shu
+    vaqtgacha berilganlarining claim'lari eskirgan" chegaralari, o'chirilgan
+    foydalanuvchilar (ularning barcha tokenlari bekor).
+    Token `iat` i butun soniya, shuning uchun chegaralar ham soniyaga
+    qirqiladi: bekor qilingan soniyada berilgan tokenlar o'tadi, aks holda
+    qayta kirgandan keyin olingan yangi token ham rad etilardi.
+    `revoked-tokens` versiyasi TOKEN_REVOCATION_CHECK_INTERVAL soniyada bir
+    marta tekshiriladi, shu jarayondagi bekor qilishlar darhol ko'rinadi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = None
+        self._jtis = frozenset()
+        self._deleted_users = frozenset()
+        self._cutoffs = {}
+        self._claim_cutoffs = {}
+
+    @property
+    def interval(self):
+        return getattr(settings, 'TOKEN_REVOCATION_CHECK_INTERVAL', 5)
+
+    def _ensure_fresh(self):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at <= self.interval:
+            return
+
+        from . import versions
+
+        stamp = versions.get_stamp(versions.REVOKED_TOKENS)
+        if stamp != self._stamp:
+            self.reload(stamp)
+        self._checked_at = time.monotonic()
+
+    def reload(self, stamp):
+        from .models import RevokedToken
+
+        jtis, deleted_users, cutoffs, claim_cutoffs = set(), set(), {}, {}
+        rows = (RevokedToken.objects.filter(expires_at__gt=timezone.now())
+                .values_list('jti', 'user_id', 'deleted_user_id', 'claims_only', 'revoked_at'))
+        for jti, user_id, deleted_user_id, claims_only, revoked_at in rows:
+            if jti:
+                jtis.add(jti)
+            elif user_id is None:
+                if deleted_user_id is not None:
+                    deleted_users.add(deleted_user_id)
+            else:
+                target = claim_cutoffs if claims_only else cutoffs
+                target[user_id] = max(target.get(user_id, 0), int(revoked_at.timestamp()))
+        with self._lock:
+            self._jtis = frozenset(jtis)
+            self._deleted_users = frozenset(deleted_users)
+            self._cutoffs = cutoffs
+            self._claim_cutoffs = claim_cutoffs
+            self._stamp = stamp
+
+    def expire(self):
+        self._checked_at = None
+
+    def clear(self):
+        with self._lock:
+            self._jtis = frozenset()
+            self._deleted_users = frozenset()
+            self._cutoffs = {}
+            self._claim_cutoffs = {}
+            self._stamp = None
+            self._checked_at = None
+
+    def is_revoked(self, token):
+        self._ensure_fresh()
+        if token.get(api_settings.JTI_CLAIM) in self._jtis:
+            return True
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        if user_id in self._deleted_users:
+            return True
+        cutoff = self._cutoffs.get(user_id)
+        return cutoff is not None and token.get('iat', 0) < cutoff
+
+    def claims_stale(self, token):
+        """
+        Tokendagi rol va is_staff/is_superuser claim'lari rol o'zgarishidan
+        oldin (yoki o'sha soniyada) berilgan - ularga ishonib bo'lmaydi.
+        Bu yerda o'sha soniya ham hisoblanadi: ortiqcha tekshiruv faqat
+        User ni bazadan o'qishga olib keladi.
+        """
+        self._ensure_fresh()
+        cutoff = self._claim_cutoffs.get(token.get(api_settings.USER_ID_CLAIM))
+        return cutoff is not None and token.get('iat', 0) <= cutoff
+
+
+revoked_tokens = RevocationList()
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if revoked_tokens.is_revoked(validated_token):
+            raise AuthenticationFailed(_("Token has been revoked"), code='token_revoked')
+
+        view = (request.parser_context or {}).get('view')
+        if (request.method in SAFE_METHODS and getattr(view, 'stateless_authentication', False)
+                and not revoked_tokens.claims_stale(validated_token)):
+            return TokenUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+
+class StreamToken(AccessToken):
+    """
+    Faqat jonli hodisalar oqimini ochish uchun: token_type boshqa bo'lgani
+    uchun API ga access token sifatida o'tmaydi. Muddati
+    STREAM_TOKEN_LIFETIME (standart 1 daqiqa) - oqim ulanganda bir marta
+    tekshiriladi, qayta ulanish uchun yangisi olinadi.
+    """
+    token_type = 'stream'
+
+    @property
+    def lifetime(self):
+        return getattr(settings, 'STREAM_TOKEN_LIFETIME', timedelta(minutes=1))
+
+
+def authenticate_query_token(raw_token):
+    """
+    Sarlavha yubora olmaydigan ulanishlar (EventSource) uchun `?token=`
+    dagi StreamToken: yaroqli va bekor qilinmagan bo'lsa token, aks holda None.
+    """
+    try:
+        token = StreamToken(raw_token)
+    except TokenError:
+        return None
+    return None if revoked_tokens.is_revoked(token) else token
+
+
+class RedactQueryTokenFilter(logging.Filter):
+    """Log yozuvidagi URL lardan `token=` qiymatini olib tashlaydi."""
+    pattern = re.compile(r'([?&]token=)[^&\s"]*')
+
+    def filter(self, record):
+        message = record.getMessage()
+        redacted = self.pattern.sub(r'\1[yashirilgan]', message)
+        if redacted != message:
+            record.msg, record.args = redacted, ()
+        return True
@@ -0,0 +1,61 @@
+"""
+Kam o'zgaradigan ro'yxatlar uchun shartli GET (ETag / Last-Modified).
+
+Validator - ResourceVersion versiyalari (signal'lar oshiradi), so'rov
+parametrlari va javob formati. Mijoz `If-None-Match` (yoki
+`If-Modified-Since`) yuborsa va resurs o'zgarmagan bo'lsa, serializer va
+asosiy querysetga tegmasdan 304 qaytariladi: autentifikatsiyadan tashqari
+bitta kichik so'rov.
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import versions
+
+
+class ConditionalGetMixin:
+    """`etag_resources` - javob bog'liq bo'lgan ResourceVersion nomlari."""
+    etag_resources = ()
+
+    def get_stamp(self, request):
+        return versions.get_stamp(*self.etag_resources)
+
+    def get_validators(self, request):
+        resource_versions, last_modified = self.get_stamp(request)
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            ','.join(map(str, resource_versions)),
+        ]
+        digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+        return f'W/{quote_etag(digest)}', last_modified
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in etags)
+
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return (if_modified_since is not None and last_modified is not None
+                and int(last_modified.timestamp()) <= if_modified_since)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # Har safar tekshirish (no-cache), lekin 304 bilan - deyarli bepul
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
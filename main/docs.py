@@ -0,0 +1,213 @@
+"""
+/docs/ (Swagger UI) va OpenAPI sxemasi.
+
+drf_yasg faqat sxema kerak bo'lganda import qilinadi. views.py dagi
+`swagger_auto_schema` va `openapi.Parameter` shu moduldan olinadi: ular
+drf_yasg obyektlarini yaratmaydi, faqat argumentlarni eslab qoladi va sxema
+yaratilayotganda haqiqiy drf_yasg dekoratoriga uzatadi.
+
+Sxema bir marta yaratiladi: `manage.py generate_schema` (build paytida)
+SWAGGER_SCHEMA_FILE ga yozadi, fayl bo'lmasa birinchi so'rovda yaratilib
+Django keshida saqlanadi. Javob ETag bilan beriladi (o'zgarmagan bo'lsa 304).
+"""
+import hashlib
+import threading
+from functools import partial
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+CACHE_KEY = 'openapi-schema'
+
+INFO = {
+    'title': "Codial Gamification App's API",
+    'default_version': 'v1',
+    'description': "Codial Gamification App's API",
+    'terms_of_service': "https://www.google.com/policies/terms/",
+    'contact': {'email': "otabekpm@gmail.com"},
+}
+
+
+class Deferred:
+    """`drf_yasg.openapi` dagi `name` ni sxema yaratilayotganda chaqirish."""
+
+    def __init__(self, name, *args, **kwargs):
+        self.name, self.args, self.kwargs = name, args, kwargs
+
+    def resolve(self):
+        return getattr(import_module('drf_yasg.openapi'), self.name)(*resolve(self.args), **resolve(self.kwargs))
+
+
+class Many:
+    """`Serializer(many=True)` - import paytida serializer yaratmaslik uchun."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    def resolve(self):
+        return self.serializer_class(many=True)
+
+
+def resolve(value):
+    if isinstance(value, (Deferred, Many)):
+        return value.resolve()
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item) for item in value)
+    return value
+
+
+class openapi:  # noqa: N801 - drf_yasg.openapi bilan bir xil yozilishi uchun
+    IN_QUERY = 'query'
+    IN_PATH = 'path'
+    IN_HEADER = 'header'
+    TYPE_STRING = 'string'
+    TYPE_INTEGER = 'integer'
+    TYPE_NUMBER = 'number'
+    TYPE_BOOLEAN = 'boolean'
+    TYPE_ARRAY = 'array'
+    TYPE_OBJECT = 'object'
+
+    Parameter = partial(Deferred, 'Parameter')
+    Schema = partial(Deferred, 'Schema')
+    Response = partial(Deferred, 'Response')
+
+
+_pending = []
+_pending_lock = threading.Lock()
+
+
+def swagger_auto_schema(**overrides):
+    """drf_yasg.utils.swagger_auto_schema, lekin sxema yaratilguncha kechiktirilgan."""
+    def decorator(view_method):
+        with _pending_lock:
+            _pending.append((view_method, overrides))
+        return view_method
+    return decorator
+
+
+def apply_pending():
+    from drf_yasg.utils import swagger_auto_schema as decorate
+
+    with _pending_lock:
+        pending = _pending[:]
+        del _pending[:]
+    for view_method, overrides in pending:
+        decorate(**resolve(overrides))(view_method)
+
+
+def get_info():
+    from drf_yasg import openapi as yasg_openapi
+
+    return yasg_openapi.Info(**dict(INFO, contact=yasg_openapi.Contact(**INFO['contact'])))
+
+
+def generate_schema():
+    """Barcha endpoint'lar sxemasi, JSON baytlar ko'rinishida."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from rest_framework.test import APIRequestFactory
+
+    apply_pending()
+    # View'lar self.request.method ga qaraydi, shuning uchun so'rovsiz emas,
+    # anonim foydalanuvchili soxta so'rov bilan (drf_yasg generate_swagger kabi)
+    request = APIView().initialize_request(APIRequestFactory().get('/docs/?format=openapi'))
+    schema = OpenAPISchemaGenerator(get_info()).get_schema(request=request, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def get_schema_file():
+    return getattr(settings, 'SWAGGER_SCHEMA_FILE', None)
+
+
+def write_schema_file(path=None):
+    path = path or get_schema_file()
+    content = generate_schema()
+    with open(path, 'wb') as file:
+        file.write(content)
+    return path, content
+
+
+class SchemaStore:
+    """Jarayon xotirasi -> SWAGGER_SCHEMA_FILE -> Django keshi -> yaratish."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schema = None
+
+    def get(self):
+        schema = self._schema
+        if schema is None:
+            with self._lock:
+                if self._schema is None:
+                    content = self.load()
+                    self._schema = (content, quote_etag(hashlib.sha256(content).hexdigest()[:32]))
+                schema = self._schema
+        return schema
+
+    def load(self):
+        path = get_schema_file()
+        if path:
+            try:
+                with open(path, 'rb') as file:
+                    return file.read()
+            except FileNotFoundError:
+                pass
+        content = cache.get(CACHE_KEY)
+        if content is None:
+            content = generate_schema()
+            cache.set(CACHE_KEY, content, None)
+        return content
+
+    def clear(self):
+        with self._lock:
+            self._schema = None
+        cache.delete(CACHE_KEY)
+
+
+schema_store = SchemaStore()
+
+
+class SchemaView(APIView):
+    """
+    `?format=openapi` - sxema (Swagger UI shu manzildan oladi), aks holda
+    Swagger UI sahifasi.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    swagger_schema = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # `format=openapi` DRF renderer'lari orasida yo'q, javobni o'zimiz beramiz
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get('format') == 'openapi':
+            return self.get_schema(request)
+        return self.get_ui(request)
+
+    def get_schema(self, request):
+        content, etag = schema_store.get()
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in (tag.removeprefix('W/') for tag in parse_etags(if_none_match)):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/openapi+json; charset=utf-8')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_ui(self, request):
+        from drf_yasg import openapi as yasg_openapi
+        from drf_yasg.renderers import SwaggerUIRenderer
+
+        # UI shablonga faqat sarlavha va versiya kerak, sxemani brauzer alohida oladi
+        swagger = yasg_openapi.Swagger(info=get_info(), _prefix='/', paths=yasg_openapi.Paths(paths={}))
+        html = SwaggerUIRenderer().render(swagger, renderer_context={'request': request, 'view': self})
+        return HttpResponse(html, content_type='text/html; charset=utf-8')
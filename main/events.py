@@ -0,0 +1,121 @@
+"""
+Jonli hodisalar (Server-Sent Events) uchun jarayon ichidagi tarqatuvchi.
+
+Hodisa bir marta SSE kadriga (`id/event/data` baytlari) aylantiriladi va
+halqa buferga (EVENT_BUFFER_SIZE) qo'shiladi. Har bir event loop uchun
+bitta umumiy Future bor: `publish` uni bajarilgan deb belgilaydi va
+kutayotgan barcha obunachilar uyg'onib, buferdagi o'sha baytlarni o'zi
+o'qiydi. Shuning uchun nashr narxi mijozlar soniga bog'liq emas va
+obunachi bazaga ulanish ushlab turmaydi.
+
+`publish` istalgan oqimdan (masalan transaction.on_commit ichidan)
+chaqirilishi mumkin. Mijoz buferdan tushib qolgan joydan ulansa
+`reset` hodisasini oladi va holatni REST orqali qayta o'qiydi.
+
+Hodisalar faqat shu jarayondagi mijozlarga yetadi: SSE endpointi
+takliflar va sotuvlarni qabul qiladigan bitta ASGI jarayonida (core/asgi.py)
+ishlashi kerak.
+"""
+import asyncio
+import json
+import threading
+import weakref
+from collections import deque
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+SALE = 'sale'
+STOCK = 'stock'
+BID = 'bid'
+POINTS = 'points'
+POINTS_RESET = 'points-reset'
+SETTLED = 'settled'
+RESET = 'reset'
+
+KEEPALIVE = b': keepalive\n\n'
+
+
+def encode(event_id, event, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'.encode()
+
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._buffer = deque(maxlen=getattr(settings, 'EVENT_BUFFER_SIZE', 1000))
+        # event loop -> shu loop'dagi obunachilar kutayotgan umumiy Future
+        self._waiters = weakref.WeakKeyDictionary()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event, data):
+        with self._lock:
+            self._last_id += 1
+            self._buffer.append((self._last_id, encode(self._last_id, event, data)))
+            loops = list(self._waiters)
+        for loop in loops:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._wake, loop)
+        return self._last_id
+
+    def _wake(self, loop):
+        future = self._waiters.pop(loop, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def since(self, event_id):
+        """
+        `event_id` dan keyingi kadrlar. Buferdan tushib qolgan bo'lsa None
+        (mijoz holatni qayta o'qishi kerak).
+        """
+        with self._lock:
+            if event_id == self._last_id:
+                return []
+            # Qayta ishga tushgan jarayon yoki buferdan tushib qolgan mijoz
+            if event_id > self._last_id or not self._buffer or event_id < self._buffer[0][0] - 1:
+                return None
+            # id lar ketma-ket, shuning uchun kerakli qism - buferning oxiri
+            frames = list(islice(reversed(self._buffer), self._last_id - event_id))
+        frames.reverse()
+        return frames
+
+    def _future(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._waiters.get(loop)
+            if future is None:
+                future = self._waiters[loop] = loop.create_future()
+            return future
+
+    async def stream(self, event_id, keepalive=None):
+        """`event_id` dan keyingi hodisalar, SSE baytlari ko'rinishida."""
+        keepalive = keepalive or getattr(settings, 'EVENT_KEEPALIVE', 15)
+        yield f'retry: {getattr(settings, "EVENT_RETRY", 3000)}\n\n'.encode()
+        while True:
+            future = self._future()
+            frames = self.since(event_id)
+            if frames is None:
+                event_id = self._last_id
+                yield f'id: {event_id}\nevent: {RESET}\ndata: {{}}\n\n'.encode()
+                continue
+            if frames:
+                for event_id, frame in frames:
+                    yield frame
+                continue
+            try:
+                await asyncio.wait_for(asyncio.shield(future), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+
+
+broadcaster = Broadcaster()
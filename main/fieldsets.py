@@ -0,0 +1,65 @@
+"""
+`?fields=` va `?expand=` parametrlari bilan serializer maydonlarini tanlash.
+
+    ?fields=id,point,user.first_name   - faqat shu maydonlar (nuqta bilan ichki maydonlar)
+    ?expand=group                      - Meta.expandable_fields dagi id o'rniga to'liq obyekt
+
+Maydonlar serializer yaratilayotganda olib tashlanadi, shuning uchun
+OptimizedQuerysetMixin ham faqat kerakli ustunlarni SELECT qiladi.
+"""
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def parse_fields(value):
+    """'id,user.first_name' -> {'id': {}, 'user': {'first_name': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def restrict_fields(serializer, tree):
+    """Serializer (va ichki serializerlar) maydonlarini `tree` bo'yicha qisqartiradi."""
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    fields = serializer.fields
+    for name in list(fields):
+        if name not in tree:
+            fields.pop(name)
+    for name, subtree in tree.items():
+        nested = fields.get(name)
+        if subtree and isinstance(nested, BaseSerializer):
+            restrict_fields(nested, subtree)
+
+
+class DynamicFieldsMixin:
+    """
+    GET so'rovlarida `?fields=` va `?expand=` ni qo'llaydi. Faqat view
+    yaratgan (context'da request bor) serializerga ta'sir qiladi.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expand = request.query_params.get(self.expand_query_param)
+        if expand:
+            self.expand_fields([name.strip() for name in expand.split(',')])
+
+        fields = request.query_params.get(self.fields_query_param)
+        if fields:
+            restrict_fields(self, parse_fields(fields))
+
+    def expand_fields(self, names):
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in names:
+            if name in expandable and name in self.fields:
+                serializer_class = expandable[name]
+                self.fields[name] = serializer_class(read_only=True)
@@ -0,0 +1,192 @@
+"""
+Rasmlarning kichraytirilgan variantlari (WebP va JPEG, bir nechta kenglikda).
+
+Rasm yuklanganda (Student, New, Product) tranzaksiya tugagach variantlar
+fon oqimida yaratiladi va modelning `image_variants` maydoniga yoziladi:
+
+    {'source': 'news/a.jpg', 'width': 4000, 'height': 3000,
+     'webp': {'160': 'news/variants/a_jpg_160w.webp', ...},
+     'jpeg': {'160': 'news/variants/a_jpg_160w.jpg', ...}}
+
+Mavjud rasmlar uchun: `manage.py generate_image_variants`.
+
+`image_variants` queryset update() bilan yoziladi va signal yubormaydi,
+shuning uchun egasining versiyasi (New - `news`, Product - `auction`) shu
+yerda oshiriladi. Aks holda ETag va joriy auksion snapshot'i eskicha
+`image_variants` ni berishda davom etadi.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 480, 960)
+FORMATS = {
+    # format: (PIL formati, kengaytma, saqlash parametrlari)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Variantlari keshlangan javoblarda ko'rinadigan modellar
+OWNER_VERSIONS = {
+    'main.New': versions.NEWS,
+    'auction.Product': versions.AUCTION,
+}
+
+
+def bump_owner_version(model):
+    name = OWNER_VERSIONS.get(model._meta.label)
+    if name is not None:
+        versions.bump(name)
+
+
+def get_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def variant_name(source, width, extension):
+    # a.png va a.jpg variantlari to'qnashmasligi uchun kengaytma ham nomda qoladi
+    directory, filename = os.path.split(source)
+    return f"{directory}/variants/{filename.replace('.', '_')}_{width}w.{extension}"
+
+
+def is_stale(instance):
+    """Rasm bor, lekin variantlari yo'q yoki boshqa rasm uchun yaratilgan."""
+    variants = instance.image_variants or {}
+    return bool(instance.image) and variants.get('source') != instance.image.name
+
+
+def render(image, width, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    resized = image.copy()
+    resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+    if pil_format == 'JPEG' and resized.mode != 'RGB':
+        if resized.mode in ('RGBA', 'LA', 'P'):
+            resized = resized.convert('RGBA')
+            background = Image.new('RGB', resized.size, (255, 255, 255))
+            background.paste(resized, mask=resized.getchannel('A'))
+            resized = background
+        else:
+            resized = resized.convert('RGB')
+    buffer = BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(instance):
+    """
+    `instance.image` uchun variantlarni yaratadi va `image_variants` ni
+    saqlaydi. Rasm shu orada almashtirilgan bo'lsa, natija yozilmaydi.
+    """
+    field = instance.image
+    source = field.name
+    storage = field.storage
+    old_variants = instance.image_variants or {}
+
+    with storage.open(source, 'rb') as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    original_width, original_height = image.size
+
+    # Asl rasmdan katta variant yaratilmaydi (eng kichigi har doim bor)
+    widths = [width for width in get_widths() if width < original_width] or [min(original_width, get_widths()[0])]
+    variants = {'source': source, 'width': original_width, 'height': original_height}
+    for fmt, (_, extension, _) in FORMATS.items():
+        variants[fmt] = {}
+        for width in widths:
+            name = variant_name(source, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[fmt][str(width)] = storage.save(name, ContentFile(render(image, width, fmt)))
+
+    updated = type(instance).objects.filter(pk=instance.pk, image=source).update(image_variants=variants)
+    if not updated:
+        release_variant_files(type(instance), storage, variants)
+        return None
+    bump_owner_version(type(instance))
+
+    if old_variants.get('source') not in (None, source):
+        release_variant_files(type(instance), storage, old_variants)
+    instance.image_variants = variants
+    return variants
+
+
+def delete_variant_files(storage, variants):
+    for fmt in FORMATS:
+        for name in (variants.get(fmt) or {}).values():
+            storage.delete(name)
+
+
+def release_variant_files(model, storage, variants):
+    """
+    Xeshli nomlarda bir xil rasm bitta fayl bo'ladi: boshqa yozuv hali shu
+    rasmni ishlatayotgan bo'lsa, variantlar o'chirilmaydi.
+    """
+    if not model.objects.filter(image=variants.get('source')).exists():
+        delete_variant_files(storage, variants)
+
+
+def process(model_label, pk):
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.filter(pk=pk).only('pk', 'image', 'image_variants').first()
+        if instance is not None and is_stale(instance):
+            generate_variants(instance)
+    except Exception:
+        logger.exception("Rasm variantlarini yaratib bo'lmadi: %s #%s", model_label, pk)
+    finally:
+        # Fon oqimining o'z ulanishi
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                                           thread_name_prefix='image-variants')
+        return _executor
+
+
+def schedule(instance):
+    """Variantlarni fon oqimida yaratish (IMAGE_VARIANTS_ASYNC=False bo'lsa shu yerning o'zida)."""
+    model_label = instance._meta.label
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        get_executor().submit(process, model_label, instance.pk)
+    else:
+        instance = type(instance).objects.filter(pk=instance.pk).first()
+        if instance is not None and is_stale(instance):
+            generate_variants(instance)
+
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    """post_save: rasm o'zgargan bo'lsa variantlarni yangilash, o'chirilgan bo'lsa tozalash."""
+    if {'image', 'image_variants'} & instance.get_deferred_fields():
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if is_stale(instance):
+        transaction.on_commit(partial(schedule, instance))
+    elif not instance.image and instance.image_variants:
+        variants, storage = instance.image_variants, instance.image.storage
+        type(instance).objects.filter(pk=instance.pk).update(image_variants={})
+        bump_owner_version(type(instance))
+        instance.image_variants = {}
+        transaction.on_commit(partial(release_variant_files, type(instance), storage, variants))
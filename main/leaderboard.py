@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import events
+from .events import broadcaster
+
+GLOBAL = ('global', None)
+
+
+def course_scope(course_id):
+    return ('course', course_id)
+
+
+def group_scope(group_id):
+    return ('group', group_id)
+
+
+class Leaderboard:
+    """
+    Student.point bo'yicha tartiblangan reyting: umumiy, kurs va guruh
+    kesimida. Har bir reyting (-point, student_id) kalitlaridan iborat
+    saralangan ro'yxat, shuning uchun o'rin (rank) bisect bilan O(log n)
+    da topiladi, to'liq saralash kerak emas.
+
+    Reyting jarayon (worker) ichida saqlanadi, birinchi murojaatda bazadan
+    quriladi va GivePoint, SoldProduct, reset orqali bo'lgan o'zgarishlar
+    bilan bosqichma-bosqich yangilanadi. Boshqa worker'lardagi o'zgarishlar
+    LEADERBOARD_TTL soniyadan keyin qayta qurishda ko'rinadi.
+
+    Bal o'zgarishlari (adjust, set_student, reset) jonli hodisa sifatida
+    ham yuboriladi (main/events.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._students = {}
+        self._group_course = {}
+        self._boards = defaultdict(list)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LEADERBOARD_TTL', 60)
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.rebuild()
+
+    def _scopes(self, group_id):
+        scopes = [GLOBAL]
+        if group_id is not None:
+            scopes.append(group_scope(group_id))
+            course_id = self._group_course.get(group_id)
+            if course_id is not None:
+                scopes.append(course_scope(course_id))
+        return scopes
+
+    def rebuild(self):
+        from .models import Group, Student
+
+        group_course = dict(Group.objects.values_list('id', 'mentor__course_id'))
+        students = {
+            student_id: (point, group_id)
+            for student_id, point, group_id in Student.objects.values_list('id', 'point', 'group_id')
+        }
+
+        with self._lock:
+            self._group_course = group_course
+            self._students = students
+            self._boards = defaultdict(list)
+            for student_id, (point, group_id) in students.items():
+                for scope in self._scopes(group_id):
+                    self._boards[scope].append((-point, student_id))
+            for board in self._boards.values():
+                board.sort()
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Keyingi murojaatda reytingni bazadan qayta quradi."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _remove(self, student_id):
+        point, group_id = self._students.pop(student_id)
+        key = (-point, student_id)
+        for scope in self._scopes(group_id):
+            board = self._boards[scope]
+            index = bisect_left(board, key)
+            if index < len(board) and board[index] == key:
+                del board[index]
+
+    def _insert(self, student_id, point, group_id):
+        if group_id is not None and group_id not in self._group_course:
+            # Yangi guruh: kursini bilmaymiz, keyingi murojaatda qayta quriladi
+            self._loaded_at = None
+        self._students[student_id] = (point, group_id)
+        for scope in self._scopes(group_id):
+            insort(self._boards[scope], (-point, student_id))
+
+    def set_student(self, student_id, point, group_id):
+        with self._lock:
+            if self._loaded_at is not None:
+                if student_id in self._students:
+                    self._remove(student_id)
+                self._insert(student_id, point, group_id)
+        broadcaster.publish(events.POINTS, {'student': student_id, 'point': point})
+
+    def adjust(self, student_id, delta):
+        point = None
+        with self._lock:
+            if self._loaded_at is not None:
+                if student_id in self._students:
+                    point, group_id = self._students[student_id]
+                    point = max(point + delta, 0)
+                    self._remove(student_id)
+                    self._insert(student_id, point, group_id)
+                else:
+                    self._loaded_at = None
+        # Reyting hali qurilmagan bo'lsa yangi bal noma'lum, faqat farq yuboriladi
+        broadcaster.publish(events.POINTS, {'student': student_id, 'delta': delta, 'point': point})
+
+    def remove(self, student_id):
+        with self._lock:
+            if self._loaded_at is not None and student_id in self._students:
+                self._remove(student_id)
+
+    def reset(self):
+        """Barcha studentlar bali 0 ga tushirilganda chaqiriladi."""
+        with self._lock:
+            if self._loaded_at is not None:
+                for board in self._boards.values():
+                    board[:] = sorted((0, student_id) for _, student_id in board)
+                self._students = {
+                    student_id: (0, group_id) for student_id, (_, group_id) in self._students.items()
+                }
+        broadcaster.publish(events.POINTS_RESET, {})
+
+    def _entries(self, board, start, stop):
+        entries = []
+        for index in range(max(start, 0), min(stop, len(board))):
+            negative_point, student_id = board[index]
+            entries.append({
+                'rank': bisect_left(board, (negative_point,)) + 1,
+                'student': student_id,
+                'point': -negative_point,
+            })
+        return entries
+
+    def top(self, scope=GLOBAL, limit=10):
+        self._ensure_loaded()
+        with self._lock:
+            return self._entries(self._boards.get(scope, []), 0, limit)
+
+    def rank(self, student_id, scope=GLOBAL):
+        """Studentning o'rni, bali va reytingdagi jami studentlar soni."""
+        self._ensure_loaded()
+        with self._lock:
+            if student_id not in self._students:
+                return None
+            point, _ = self._students[student_id]
+            board = self._boards.get(scope, [])
+            key = (-point, student_id)
+            index = bisect_left(board, key)
+            if index >= len(board) or board[index] != key:
+                return None
+            return {
+                'rank': bisect_left(board, (-point,)) + 1,
+                'student': student_id,
+                'point': point,
+                'total': len(board),
+            }
+
+    def neighbours(self, student_id, scope=GLOBAL, radius=3):
+        """Studentdan oldingi va keyingi `radius` tadan studentlar."""
+        self._ensure_loaded()
+        with self._lock:
+            if student_id not in self._students:
+                return None
+            point, _ = self._students[student_id]
+            board = self._boards.get(scope, [])
+            key = (-point, student_id)
+            index = bisect_left(board, key)
+            if index >= len(board) or board[index] != key:
+                return None
+            return self._entries(board, index - radius, index + radius + 1)
+
+    def balance(self, student_id):
+        """Studentning joriy bali (bazaga so'rovsiz), noma'lum bo'lsa None."""
+        self._ensure_loaded()
+        with self._lock:
+            student = self._students.get(student_id)
+        return student[0] if student else None
+
+    def scopes_for(self, student_id):
+        """Student kiradigan reytinglar: {'global': ..., 'course': ..., 'group': ...}."""
+        self._ensure_loaded()
+        with self._lock:
+            if student_id not in self._students:
+                return {}
+            _, group_id = self._students[student_id]
+            return {name: (name, value) for name, value in self._scopes(group_id)}
+
+
+leaderboard = Leaderboard()
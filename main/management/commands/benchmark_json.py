@@ -0,0 +1,79 @@
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from main import renderers
+from main.models import Course, Mentor, Group, Student, PointType, GivePoint
+from main.renderers import FastJSONRenderer, FastJSONParser
+from main.serializers import GivePointSerializer, GetPointSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Katta GivePoint sahifalarini DRF JSONRenderer/JSONParser va FastJSONRenderer/FastJSONParser "
+        "bilan render/parse qilish vaqtini solishtiradi. Ma'lumotlar xotirada yaratiladi, bazaga yozilmaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size, repeat = options['page_size'], options['repeat']
+        rows = self.build_rows(page_size)
+        self.stdout.write(f"Backend: {'orjson' if renderers.orjson is not None else 'json (stdlib)'}, "
+                          f"sahifa: {page_size} qator, takror: {repeat}")
+
+        for name, serializer_class in (('give-points', GivePointSerializer), ('get-points', GetPointSerializer)):
+            data = {'count': page_size, 'next': None, 'previous': None,
+                    'results': serializer_class(rows, many=True).data}
+            self.compare(name, data, repeat)
+
+    def build_rows(self, count):
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        course = Course(id=1, name='Benchmark')
+        mentor = Mentor(id=1, user=User(id=1, username='mentor'), course=course, point_limit=10 ** 9)
+        group = Group(id=1, name='Bench', mentor=mentor)
+        point_types = [PointType(id=index, name=f'Type {index}', max_point=100) for index in range(1, 5)]
+        students = [
+            Student(id=index, user=User(id=index + 1, username=f'student{index}', first_name='Ism',
+                                        last_name='Familiya', date_joined=created_at),
+                    group=group, point=index * 7, bio="O'quvchi haqida qisqacha ma'lumot",
+                    phone_number='+998901234567', birth_date=date(2005, 1, 1), created_at=created_at)
+            for index in range(1, 51)
+        ]
+        return [
+            GivePoint(id=index, mentor=mentor, student=students[index % len(students)],
+                      point_type=point_types[index % len(point_types)], amount=index % 10 + 1,
+                      date=date(2025, 1, 1) + timedelta(days=index % 120), description='Uy vazifasi',
+                      created_at=created_at + timedelta(seconds=index))
+            for index in range(1, count + 1)
+        ]
+
+    def timeit(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) / repeat * 1000, result
+
+    def compare(self, name, data, repeat):
+        drf_ms, drf_content = self.timeit(lambda: JSONRenderer().render(data), repeat)
+        fast_ms, fast_content = self.timeit(lambda: FastJSONRenderer().render(data), repeat)
+        if json.loads(drf_content) != json.loads(fast_content):
+            raise CommandError(f"{name}: FastJSONRenderer natijasi JSONRenderer dan farq qiladi.")
+
+        parse_drf_ms, _ = self.timeit(lambda: JSONParser().parse(BytesIO(drf_content)), repeat)
+        parse_fast_ms, _ = self.timeit(lambda: FastJSONParser().parse(BytesIO(drf_content)), repeat)
+
+        self.stdout.write(
+            f"{name:<12} {len(drf_content) / 1024:8.1f} KB  "
+            f"render: {drf_ms:7.2f} ms -> {fast_ms:7.2f} ms (x{drf_ms / fast_ms:.1f})  "
+            f"parse: {parse_drf_ms:7.2f} ms -> {parse_fast_ms:7.2f} ms (x{parse_drf_ms / parse_fast_ms:.1f})"
+        )
+
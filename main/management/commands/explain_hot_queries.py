@@ -0,0 +1,170 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from main.models import Course, Mentor, Group, Student, PointType, GivePoint, DailyPointStat, New, NewsReadState
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Asosiy endpoint so'rovlari uchun EXPLAIN QUERY PLAN ni ishga tushiradi. "
+        "Ma'lumotlar tranzaksiya ichida yaratiladi va oxirida bekor qilinadi. "
+        "Birorta so'rov to'liq jadval skaneriga tushsa, xato bilan tugaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--points-per-student', type=int, default=40)
+        parser.add_argument('--no-seed', action='store_true',
+                            help="Ma'lumot yaratmasdan, mavjud baza ustida tekshirish.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"{connection.vendor} uchun so'rov rejasi tahlili qo'llab-quvvatlanmaydi.")
+
+        failures = []
+        try:
+            with transaction.atomic():
+                if not options['no_seed']:
+                    self.seed(options['students'], options['points_per_student'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                for name, queryset in self.hot_queries():
+                    if not self.check_plan(name, queryset):
+                        failures.append(name)
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"To'liq skanerga tushgan so'rovlar: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Barcha so'rovlar indeks ishlatadi."))
+
+    def seed(self, student_count, points_per_student):
+        started = time.monotonic()
+        course = Course.objects.create(name=f'Benchmark {time.time()}')
+        mentors = [
+            Mentor.objects.create(user=User.objects.create(username=f'bench-mentor-{course.id}-{index}'),
+                                  course=course, point_limit=10 ** 9)
+            for index in range(5)
+        ]
+        groups = Group.objects.bulk_create([
+            Group(name=f'Bench {index}', mentor=mentors[index % len(mentors)]) for index in range(student_count // 20 + 1)
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'bench-student-{course.id}-{index}') for index in range(student_count)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, group=groups[index % len(groups)], point=index)
+            for index, user in enumerate(users)
+        ])
+        point_types = [
+            PointType.objects.get_or_create(name=f'Bench type {index}', defaults={'max_point': 100})[0]
+            for index in range(4)
+        ]
+
+        first_day = date(2025, 1, 1)
+        give_points = GivePoint.objects.bulk_create(
+            [
+                GivePoint(mentor=mentors[index % len(mentors)], student=student, amount=index % 10 + 1,
+                          point_type=point_types[index % len(point_types)],
+                          date=first_day + timedelta(days=index % 120))
+                for student in students
+                for index in range(points_per_student)
+            ],
+            batch_size=2000,
+        )
+        DailyPointStat.objects.bulk_create(
+            [
+                DailyPointStat(**row)
+                for row in GivePoint.objects.filter(mentor__course=course)
+                .values('date', 'student_id', 'point_type_id')
+                .annotate(total=Sum('amount'), count=Count('id')).order_by()
+            ],
+            batch_size=2000,
+        )
+        news = New.objects.bulk_create([New(title=f'Bench {index}', description='-') for index in range(200)])
+        NewsReadState.objects.bulk_create([
+            NewsReadState(user=user, read_up_to=news[index % len(news)].id) for index, user in enumerate(users[:50])
+        ])
+        self.sample = {
+            'student': students[0], 'mentor': mentors[0], 'group': groups[0], 'point_type': point_types[0],
+            'user': users[0], 'date': first_day,
+        }
+        self.stdout.write(f"Seed: {len(students)} student, {len(give_points)} GivePoint "
+                          f"({time.monotonic() - started:.1f}s)")
+
+    def get_sample(self):
+        if hasattr(self, 'sample'):
+            return self.sample
+        student = Student.objects.exclude(group__mentor=None).select_related('group__mentor', 'user').first()
+        if student is None:
+            raise CommandError("Bazada tekshirish uchun ma'lumot yo'q, --no-seed siz ishga tushiring.")
+        return {
+            'student': student, 'mentor': student.group.mentor, 'group': student.group,
+            'point_type': PointType.objects.first(), 'user': student.user,
+            'date': GivePoint.objects.values_list('date', flat=True).first(),
+        }
+
+    def hot_queries(self):
+        sample = self.get_sample()
+        day = sample['date']
+        return [
+            # /give-points/ filterset_fields va ordering
+            ('give-points?student&date',
+             GivePoint.objects.filter(student=sample['student'], date=day).order_by('-created_at')),
+            ('give-points?mentor',
+             GivePoint.objects.filter(mentor=sample['mentor']).order_by('-created_at')[:5]),
+            ('give-points?point_type&date',
+             GivePoint.objects.filter(point_type=sample['point_type'], date=day).order_by('-created_at')),
+            ('give-points?student__group',
+             GivePoint.objects.filter(student__group=sample['group']).order_by('-created_at')[:5]),
+            ('give-points?cursor',
+             GivePoint.objects.order_by('-created_at', '-id')[:6]),
+            # /students/ va /student-points/
+            ('students?group__mentor&ordering=-point',
+             Student.objects.filter(group__mentor=sample['mentor']).order_by('-point')),
+            ('students?ordering=-point',
+             Student.objects.order_by('-point')[:5]),
+            ('student-points stats',
+             DailyPointStat.objects.filter(student_id__in=[sample['student'].id], date__gte=day)
+             .values('student_id', 'point_type_id').annotate(sum=Sum('total'))),
+            ('given-points stats',
+             DailyPointStat.objects.filter(date__range=[day, day + timedelta(days=7)])
+             .values('point_type_id').annotate(sum=Sum('total'))),
+            # /news/<pk>/mark-as-read/ va /news/get-read-status/
+            ('news read-state',
+             NewsReadState.objects.filter(user=sample['user'])),
+        ]
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def is_full_scan(line):
+        if connection.vendor == 'sqlite':
+            return line.startswith('SCAN ') and 'USING' not in line
+        return 'Seq Scan' in line
+
+    def check_plan(self, name, queryset):
+        plan = self.explain(queryset)
+        ok = not any(self.is_full_scan(line) for line in plan)
+        style = self.style.SUCCESS if ok else self.style.ERROR
+        self.stdout.write(style(f"{'OK  ' if ok else 'SCAN'} {name}"))
+        for line in plan:
+            self.stdout.write(f"       {line}")
+        return ok
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from auction.models import Product
+from main import images
+from main.models import Student, New
+
+MODELS = {'student': Student, 'new': New, 'product': Product}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mavjud rasmlar (media/students, media/news, media/products) uchun WebP/JPEG "
+        "variantlarini yaratadi. Faqat varianti yo'q yoki eskirganlari qayta ishlanadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help="Faqat shu model(lar) uchun (bir necha marta berish mumkin).")
+        parser.add_argument('--force', action='store_true', help="Variantlari borlarini ham qayta yaratish.")
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS):
+            model = MODELS[name]
+            done = failed = 0
+            queryset = model.objects.exclude(image='').exclude(image=None).only('pk', 'image', 'image_variants')
+            for instance in queryset.order_by('pk').iterator(chunk_size=200):
+                if not options['force'] and not images.is_stale(instance):
+                    continue
+                try:
+                    images.generate_variants(instance)
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name} #{instance.pk} ({instance.image.name}): {exc}")
+            self.stdout.write(f"{name}: {done} ta rasm qayta ishlandi, {failed} ta xato")
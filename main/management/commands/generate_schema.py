@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main import docs
+
+
+class Command(BaseCommand):
+    help = "OpenAPI sxemasini yaratib SWAGGER_SCHEMA_FILE ga yozadi (deploy/build paytida ishga tushiriladi)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="SWAGGER_SCHEMA_FILE o'rniga shu faylga yozish.")
+
+    def handle(self, *args, **options):
+        path, content = docs.write_schema_file(options['output'])
+        docs.schema_store.clear()
+        self.stdout.write(f"Sxema yozildi: {path} ({len(content)} bayt)")
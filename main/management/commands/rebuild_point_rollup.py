@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+
+from main.models import GivePoint, DailyPointStat
+
+
+class Command(BaseCommand):
+    help = (
+        "DailyPointStat jadvalini GivePoint jadvalidan qaytadan hisoblaydi. O'qish va yozish bitta "
+        "tranzaksiyada, GivePoint yozuvlari qulf ostida: parallel ball berish buyruq tugashini kutadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Bir so'rovda o'qiladigan GivePoint qatorlari soni (id oralig'i).")
+
+    def lock_ledger(self):
+        """
+        Tranzaksiya tugaguncha GivePoint ga yozishni to'xtatadi (o'qish ochiq).
+        SQLite da IMMEDIATE tranzaksiya yozish qulfini allaqachon olgan.
+        Ball berish GivePoint ga DailyPointStat dan oldin tegadi, shuning
+        uchun qulf kutish tartibi o'zaro bloklanishga olib kelmaydi.
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(GivePoint._meta.db_table)} IN EXCLUSIVE MODE')
+        elif connection.vendor != 'sqlite':
+            # InnoDB: to'liq FOR UPDATE skaneri yozuvlar orasidagi bo'shliqlarni ham qulflaydi
+            for _ in GivePoint.objects.select_for_update().values_list('pk', flat=True).iterator():
+                pass
+
+    def collect_totals(self, chunk_size):
+        last_id = GivePoint.objects.aggregate(last=Max('id'))['last'] or 0
+
+        totals = defaultdict(lambda: [0, 0])
+        for start in range(0, last_id, chunk_size):
+            rows = (
+                GivePoint.objects
+                .filter(id__gt=start, id__lte=start + chunk_size)
+                .values('date', 'student_id', 'point_type_id')
+                .annotate(total=Sum('amount'), count=Count('id'))
+                .order_by()
+            )
+            for row in rows:
+                key = (row['date'], row['student_id'], row['point_type_id'])
+                totals[key][0] += row['total']
+                totals[key][1] += row['count']
+        return totals
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        # Yig'indi o'chirish va yozish bilan bir tranzaksiyada va qulf ostida: orada berilgan ball yo'qolmaydi
+        with transaction.atomic():
+            self.lock_ledger()
+            totals = self.collect_totals(chunk_size)
+            DailyPointStat.objects.all().delete()
+            DailyPointStat.objects.bulk_create(
+                [
+                    DailyPointStat(date=day, student_id=student_id, point_type_id=point_type_id,
+                                   total=total, count=count)
+                    for (day, student_id, point_type_id), (total, count) in totals.items()
+                ],
+                batch_size=chunk_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(totals)} ta kunlik yozuv qayta hisoblandi."))
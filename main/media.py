@@ -0,0 +1,181 @@
+"""
+MEDIA_ROOT fayllarini berish (django.conf.urls.static o'rniga).
+
+- Mazmun-xeshli nomlar (`storage.HashedMediaStorage`) bir yilga
+  `immutable` sifatida keshlanadi, qolganlari har safar ETag bilan
+  tekshiriladi (o'zgarmagan bo'lsa 304).
+- `Range: bytes=...` so'rovlariga 206 (bitta oraliq).
+- MEDIA_OFFLOAD_HEADER berilgan bo'lsa (`X-Accel-Redirect` - nginx,
+  `X-Sendfile` - Apache/lighttpd), faylni worker o'qimaydi: javobda faqat
+  sarlavhalar, baytlarni proksi o'zi yuboradi. X-Accel-Redirect uchun
+  MEDIA_OFFLOAD_PREFIX - nginx dagi `internal` location, masalan:
+
+      location /protected-media/ { internal; alias /app/media/; }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import get_content_hash
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Bitta oraliqli `Range` sarlavhasi -> (start, end), ikkalasi ham ichida.
+    Tushunarsiz yoki bir nechta oraliq bo'lsa None (butun fayl beriladi).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500: oxirgi 500 bayt
+        if not last:
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class FileRange:
+    """Fayl ichidagi [start, start + length) oraliqni o'qiydigan obyekt."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def get_etag(path, stat):
+    content_hash = get_content_hash(path)
+    if content_hash:
+        return quote_etag(content_hash)
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def range_applies(request, etag, mtime):
+    """`If-Range` mos kelmasa Range e'tiborga olinmaydi (fayl o'zgargan)."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def set_validators(response, path, etag, mtime):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if get_content_hash(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def offload(response, path, full_path):
+    header = getattr(settings, 'MEDIA_OFFLOAD_HEADER', None)
+    if not header:
+        return None
+    if header.lower() == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_OFFLOAD_PREFIX', '/protected-media/')
+        response[header] = prefix.rstrip('/') + '/' + quote(path)
+    else:
+        response[header] = full_path
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag, mtime, size = get_etag(path, stat), stat.st_mtime, stat.st_size
+    if not_modified(request, etag, mtime):
+        return set_validators(HttpResponseNotModified(), path, etag, mtime)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    # Proksi faylni o'zi yuboradi (Range va HEAD ni ham o'zi bajaradi)
+    response = offload(HttpResponse(content_type=content_type), path, full_path)
+    if response is not None:
+        return set_validators(response, path, etag, mtime)
+
+    byte_range = None
+    if request.headers.get('Range') and range_applies(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return set_validators(response, path, etag, mtime)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    elif byte_range:
+        response = FileResponse(FileRange(open(full_path, 'rb'), start, length), content_type=content_type)
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return set_validators(response, path, etag, mtime)
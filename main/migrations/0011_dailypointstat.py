@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_daily_point_stats(apps, schema_editor):
+    GivePoint = apps.get_model('main', 'GivePoint')
+    DailyPointStat = apps.get_model('main', 'DailyPointStat')
+
+    rows = (
+        GivePoint.objects
+        .values('date', 'student_id', 'point_type_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailyPointStat.objects.bulk_create(
+        [DailyPointStat(**row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_student_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPointStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('point_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main.pointtype')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'student', 'point_type'), name='unique_daily_point_stat')],
+            },
+        ),
+        migrations.RunPython(fill_daily_point_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_read_statuses(apps, schema_editor):
+    # Unique constraint qo'shishdan oldin (user, news) bo'yicha takrorlarni
+    # olib tashlaymiz: o'qilgan bo'lsa, o'qilgan holat saqlanadi
+    NewsReadStatus = apps.get_model('main', 'NewsReadStatus')
+    duplicates = (
+        NewsReadStatus.objects.values('user_id', 'news_id')
+        .annotate(keep=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        statuses = NewsReadStatus.objects.filter(user_id=row['user_id'], news_id=row['news_id'])
+        is_read = statuses.filter(is_read=True).exists()
+        statuses.exclude(id=row['keep']).delete()
+        if is_read:
+            statuses.update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_resourceversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_read_statuses, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dailypointstat',
+            index=models.Index(fields=['student', 'date'], name='dailystat_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='givepoint',
+            index=models.Index(fields=['student', 'date'], name='givepoint_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='givepoint',
+            index=models.Index(fields=['mentor', '-created_at'], name='givepoint_mentor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='givepoint',
+            index=models.Index(fields=['point_type', 'date'], name='givepoint_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='givepoint',
+            index=models.Index(fields=['-created_at', '-id'], name='givepoint_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-point'], name='student_point_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['group', '-point'], name='student_group_point_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='newsreadstatus',
+            constraint=models.UniqueConstraint(fields=('user', 'news'), name='unique_news_read_status'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from main import readstate
+
+
+def copy_read_statuses(apps, schema_editor):
+    New = apps.get_model('main', 'New')
+    NewsReadStatus = apps.get_model('main', 'NewsReadStatus')
+    NewsReadState = apps.get_model('main', 'NewsReadState')
+
+    news_ids = list(New.objects.order_by('id').values_list('id', flat=True))
+    read_by_user = {}
+    for user_id, news_id in NewsReadStatus.objects.filter(is_read=True).values_list('user_id', 'news_id'):
+        read_by_user.setdefault(user_id, []).append(news_id)
+
+    states = []
+    for user_id, read_ids in read_by_user.items():
+        bits = readstate.mark(0, 0, read_ids)
+        read_up_to, bits = readstate.compact(0, bits, news_ids)
+        states.append(NewsReadState(user_id=user_id, read_up_to=read_up_to, read_after=readstate.encode(bits)))
+    NewsReadState.objects.bulk_create(states, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_up_to', models.PositiveBigIntegerField(default=0)),
+                ('read_after', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='news_read_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_read_statuses, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='NewsReadStatus',
+        ),
+    ]
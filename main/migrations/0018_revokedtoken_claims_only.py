@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='claims_only',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_revokedtoken_claims_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='deleted_user_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Coalesce
+
+
+def merge_null_key_duplicates(apps, schema_editor):
+    # Eski cheklov NULL kalitli takroriy qatorlarga yo'l qo'ygan: birinchisiga qo'shiladi
+    DailyPointStat = apps.get_model('main', 'DailyPointStat')
+
+    duplicates = (
+        DailyPointStat.objects
+        .filter(models.Q(student=None) | models.Q(point_type=None))
+        .values('date', 'student_id', 'point_type_id')
+        .annotate(keep=Min('id'), total_sum=Sum('total'), count_sum=Sum('count'), rows=Count('id'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        DailyPointStat.objects.filter(pk=row['keep']).update(total=row['total_sum'], count=row['count_sum'])
+        DailyPointStat.objects.filter(
+            date=row['date'], student_id=row['student_id'], point_type_id=row['point_type_id'],
+        ).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_revokedtoken_deleted_user_id'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailypointstat',
+            name='unique_daily_point_stat',
+        ),
+        migrations.RunPython(merge_null_key_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailypointstat',
+            constraint=models.UniqueConstraint(models.F('date'), Coalesce('student', models.Value(0)), Coalesce('point_type', models.Value(0)), name='unique_daily_point_stat'),
+        ),
+    ]
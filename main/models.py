@@ -1,8 +1,17 @@
-from django.db import models
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now
 
+from . import readstate
+from .leaderboard import leaderboard
+from .reference import reference_cache
+
 
 
 class Course(models.Model):
@@ -12,7 +21,30 @@ class Course(models.Model):
         return self.name
 
 
-class Mentor(models.Model):
+class LoadedValuesMixin:
+    """Bazadan o'qilgan maydon qiymatlari (`_loaded_values`): signal'lar nima o'zgarganini biladi."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, field):
+        """Yangi yozuv yoki oldingi qiymati noma'lum bo'lsa ham True."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or field not in loaded:
+            return True
+        return loaded[field] != getattr(self, field)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save signal'lari oldingi qiymatlarni ko'rib bo'ldi
+        self._loaded_values = {field.attname: self.__dict__[field.attname]
+                               for field in self._meta.concrete_fields if field.attname in self.__dict__}
+
+
+class Mentor(LoadedValuesMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True)
     point_limit = models.PositiveIntegerField(default=0)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -35,10 +67,11 @@ class Group(models.Model):
         return f"{self.name}"
 
 
-class Student(models.Model):
+class Student(LoadedValuesMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True)
     birth_date = models.DateField(blank=True, null=True)
     image = models.ImageField(upload_to='students/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(null=True, blank=True)
     point = models.PositiveIntegerField(default=0)
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True)
@@ -46,13 +79,18 @@ class Student(models.Model):
     phone_number = models.CharField(max_length=20, null=True, blank=True)
 
     def __str__(self):
+        group = reference_cache.related(self, 'group')
         if self.user:
-            return f"{self.user.first_name} {self.user.last_name} ({self.group})"
-        return f"Unknown User ({self.group})"
+            return f"{self.user.first_name} {self.user.last_name} ({group})"
+        return f"Unknown User ({group})"
 
     class Meta:
         verbose_name = 'Student'
         verbose_name_plural = 'Students'
+        indexes = [
+            models.Index(fields=['-point'], name='student_point_idx'),
+            models.Index(fields=['group', '-point'], name='student_group_point_idx'),
+        ]
 
 
 class PointType(models.Model):
@@ -63,6 +101,45 @@ class PointType(models.Model):
         return self.name
 
 
+class GivePointManager(models.Manager):
+    def bulk_award(self, mentor, point_type, amount, date, student_ids, description=None):
+        """
+        Bir nechta studentga bir xil ball berish. Barcha GivePoint yozuvlari
+        bulk_create bilan yaratiladi, mentor limiti va student ballari
+        bittadan UPDATE bilan o'zgartiriladi; max_point va point_limit
+        butun partiya uchun bir marta tekshiriladi.
+        """
+        from . import versions
+
+        student_ids = list(dict.fromkeys(student_ids))
+        if point_type is not None and amount > point_type.max_point:
+            raise ValidationError(
+                f"Amount cannot exceed the max point of {point_type.max_point} for {point_type.name}.")
+        if not student_ids:
+            return []
+
+        total = amount * len(student_ids)
+        with transaction.atomic():
+            if not Mentor.objects.filter(pk=mentor.pk, point_limit__gte=total).update(
+                    point_limit=F('point_limit') - total):
+                raise ValidationError(
+                    f"Mentor does not have enough point_limit for {len(student_ids)} students (required: {total}).")
+
+            give_points = self.bulk_create([
+                GivePoint(mentor=mentor, student_id=student_id, amount=amount, point_type=point_type,
+                          description=description, date=date)
+                for student_id in student_ids
+            ])
+            Student.objects.filter(pk__in=student_ids).update(point=F('point') + amount)
+            DailyPointStat.apply_bulk(date, point_type.pk if point_type else None, student_ids, amount)
+            versions.bump_on_commit(versions.POINT_STATS)
+
+            for student_id in student_ids:
+                transaction.on_commit(partial(leaderboard.adjust, student_id, amount))
+
+        return give_points
+
+
 class GivePoint(models.Model):
     mentor = models.ForeignKey(Mentor, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True)
@@ -72,22 +149,30 @@ class GivePoint(models.Model):
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = GivePointManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'date'], name='givepoint_student_date_idx'),
+            models.Index(fields=['mentor', '-created_at'], name='givepoint_mentor_created_idx'),
+            models.Index(fields=['point_type', 'date'], name='givepoint_type_date_idx'),
+            models.Index(fields=['-created_at', '-id'], name='givepoint_created_id_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.student} {self.amount} {self.point_type}"
+        return f"{self.student} {self.amount} {reference_cache.related(self, 'point_type')}"
 
     def clean(self):
         """
-        Custom validation:
-        1. `amount` should not exceed `PointType.max_point`.
-        2. Mentor must have enough point_limit to give.
+        Custom validation: `amount` should not exceed `PointType.max_point`.
+        PointType ma'lumotnoma keshidan olinadi (bazaga so'rovsiz). Mentor
+        limiti bu yerda tekshirilmaydi: keshdagi qiymat eskirgan bo'lishi
+        mumkin, yagona tekshiruv - save dagi shartli UPDATE.
         """
-        if self.point_type and self.amount > self.point_type.max_point:
-            raise ValidationError(
-                f"Amount cannot exceed the max point of {self.point_type.max_point} for {self.point_type.name}.")
-
-        if self.mentor and self.mentor.point_limit < self.amount:
+        point_type = reference_cache.related(self, 'point_type')
+        if point_type and self.amount > point_type.max_point:
             raise ValidationError(
-                f"Mentor {self.mentor.user.username} does not have enough point_limit (available: {self.mentor.point_limit}).")
+                f"Amount cannot exceed the max point of {point_type.max_point} for {point_type.name}.")
 
     # def save(self, *args, **kwargs):
     #     self.clean()
@@ -122,38 +207,143 @@ class GivePoint(models.Model):
     #         self.mentor.save()
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            prev_instance = GivePoint.objects.select_related('student', 'mentor').get(pk=self.pk)
-
-
-            if prev_instance.student:
-                self.student.point -= prev_instance.amount
-                self.student.save()
-
-            if prev_instance.mentor:
-                self.mentor.point_limit += prev_instance.amount
-                self.mentor.save()
-
-        super().save(*args, **kwargs)
-
-        if self.student:
-            self.student.point += self.amount
-            self.student.save()
-
-        if self.mentor:
-            self.mentor.point_limit -= self.amount
-            self.mentor.save()
-
-    def delete(self,*args,**kwargs):
+        """
+        Ball berish bitta tranzaksiyada bajariladi: mentor limiti va student
+        bali F() orqali o'zgartiriladi, limit tekshiruvi UPDATE ichida.
+        Tahrirlashda eski yozuv qulflanadi va faqat farq qo'llaniladi.
+        """
+        with transaction.atomic():
+            mentor_deltas = {self.mentor_id: -self.amount}
+            student_deltas = {self.student_id: self.amount}
+
+            if self.pk:
+                prev_instance = GivePoint.objects.select_for_update().get(pk=self.pk)
+                mentor_deltas[prev_instance.mentor_id] = mentor_deltas.get(prev_instance.mentor_id, 0) + prev_instance.amount
+                student_deltas[prev_instance.student_id] = student_deltas.get(prev_instance.student_id, 0) - prev_instance.amount
+                DailyPointStat.apply(prev_instance.date, prev_instance.student_id, prev_instance.point_type_id,
+                                     -prev_instance.amount, -1)
+
+            self._post_deltas(mentor_deltas, student_deltas)
+            super().save(*args, **kwargs)
+            DailyPointStat.apply(self.date, self.student_id, self.point_type_id, self.amount, 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            prev_instance = GivePoint.objects.select_for_update().filter(pk=self.pk).first()
+            if prev_instance is None:
+                return super().delete(*args, **kwargs)
+
+            self._post_deltas({prev_instance.mentor_id: prev_instance.amount},
+                              {prev_instance.student_id: -prev_instance.amount})
+            DailyPointStat.apply(prev_instance.date, prev_instance.student_id, prev_instance.point_type_id,
+                                 -prev_instance.amount, -1)
+            return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def _post_deltas(mentor_deltas, student_deltas):
+        """
+        Mentor limiti va student ballariga farqlarni qo'llaydi. Limit yoki
+        student bali yetmasa (ball qaytarib olinganda, student uni sarflab
+        bo'lgan bo'lsa) UPDATE hech qaysi qatorga tegmaydi va ValidationError
+        ko'tariladi (tranzaksiya bekor bo'ladi). Ball nolga qirqilmaydi:
+        aks holda Student.point, GivePoint yig'indisi va reyting farq qiladi.
+        """
+        for mentor_id, delta in mentor_deltas.items():
+            if not delta:
+                continue
+            mentors = Mentor.objects.filter(pk=mentor_id)
+            if delta < 0:
+                mentors = mentors.filter(point_limit__gte=-delta)
+            if not mentors.update(point_limit=F('point_limit') + delta):
+                raise ValidationError("Mentor does not have enough point_limit.")
+
+        for student_id, delta in student_deltas.items():
+            if student_id is None or not delta:
+                continue
+            students = Student.objects.filter(pk=student_id)
+            if delta < 0:
+                students = students.filter(point__gte=-delta)
+            if not students.update(point=F('point') + delta):
+                if delta < 0 and Student.objects.filter(pk=student_id).exists():
+                    raise ValidationError("Student does not have enough points to take back.")
+                continue
+            transaction.on_commit(partial(leaderboard.adjust, student_id, delta))
+
+
+class DailyPointStat(models.Model):
+    """
+    GivePoint uchun kunlik yig'indi: kun + student + point_type bo'yicha
+    ballar yig'indisi va soni. GivePoint.save/delete tomonidan yangilanadi,
+    `rebuild_point_rollup` buyrug'i bilan qaytadan hisoblanadi.
+
+    Kalit NULL bo'lishi mumkin (student yoki point_type o'chirilgan), UNIQUE
+    esa NULL larni har xil deb hisoblaydi - shuning uchun cheklov
+    COALESCE(..., 0) ustida. O'chirishdan oldin qatorlar NULL kalitli
+    qatorga qo'shiladi (`detach`), aks holda SET_NULL cheklovga uriladi.
+    """
+    date = models.DateField()
+    student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True)
+    point_type = models.ForeignKey(PointType, on_delete=models.SET_NULL, null=True, blank=True)
+    total = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
 
-        if self.student:
-            self.student.point-=self.amount
-            self.student.save()
-        if self.mentor:
-            self.mentor.point_limit+=self.amount
-            self.mentor.save()
+    def __str__(self):
+        return f"{self.date} {self.student_id} {self.point_type_id}: {self.total} ({self.count})"
 
-        super().delete(*args,**kwargs)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                'date',
+                Coalesce('student', Value(0)),
+                Coalesce('point_type', Value(0)),
+                name='unique_daily_point_stat',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'date'], name='dailystat_student_date_idx'),
+        ]
+
+    @classmethod
+    def apply(cls, date, student_id, point_type_id, amount, count):
+        """Kunlik yig'indiga `amount` va `count` ni qo'shadi (manfiy bo'lishi mumkin)."""
+        lookup = {'date': date, 'student_id': student_id, 'point_type_id': point_type_id}
+        pk = cls.objects.filter(**lookup).values_list('pk', flat=True).first()
+        if pk is None:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(total=amount, count=count, **lookup)
+                return
+            except IntegrityError:
+                pk = cls.objects.filter(**lookup).values_list('pk', flat=True).first()
+
+        cls.objects.filter(pk=pk).update(total=F('total') + amount, count=F('count') + count)
+
+    @classmethod
+    def detach(cls, field, pk):
+        """
+        `field` ('student' yoki 'point_type') = `pk` qatorlarini shu kalit
+        NULL bo'lgan qatorlarga qo'shadi va o'chiradi (o'chirishdan oldin).
+        """
+        rows = cls.objects.filter(**{f'{field}_id': pk})
+        for row in rows.values('date', 'student_id', 'point_type_id', 'total', 'count'):
+            row[f'{field}_id'] = None
+            cls.apply(row['date'], row['student_id'], row['point_type_id'], row['total'], row['count'])
+        rows.delete()
+
+    @classmethod
+    def apply_bulk(cls, date, point_type_id, student_ids, amount):
+        """Bir kun va point_type uchun har bir studentga `amount` va bitta yozuv qo'shadi."""
+        existing = dict(
+            cls.objects.filter(date=date, point_type_id=point_type_id, student_id__in=student_ids)
+            .values_list('student_id', 'pk')
+        )
+        if existing:
+            cls.objects.filter(pk__in=existing.values()).update(total=F('total') + amount, count=F('count') + 1)
+        cls.objects.bulk_create([
+            cls(date=date, student_id=student_id, point_type_id=point_type_id, total=amount, count=1)
+            for student_id in student_ids
+            if student_id not in existing
+        ])
 
 
 class New(models.Model):
@@ -161,18 +351,134 @@ class New(models.Model):
     description = models.TextField()
     created_at = models.DateTimeField(default=now)
     image = models.ImageField(upload_to='news/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     seminary = models.BooleanField(default=False)
     point=models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
 
-class NewsReadStatus(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    news = models.ForeignKey(New, on_delete=models.CASCADE)
-    is_read = models.BooleanField(default=False)
+class NewsReadState(models.Model):
+    """
+    Foydalanuvchining yangiliklarni o'qish holati bitta qatorda:
+    `read_up_to` gacha bo'lgan barcha yangiliklar o'qilgan, undan keyingi
+    o'qilganlari `read_after` bitset'ida (qarang: main.readstate).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='news_read_state')
+    read_up_to = models.PositiveBigIntegerField(default=0)
+    read_after = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.user.username} - {self.news.title} - {'Read' if self.is_read else 'Unread'}"
+        return f"{self.user.username} - {self.read_up_to}"
+
+    @classmethod
+    def for_user(cls, user, lock=False):
+        """Foydalanuvchi holati; hali yo'q bo'lsa saqlanmagan yangi obyekt qaytadi."""
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        return queryset.filter(user=user).first() or cls(user=user)
+
+    def mark_read(self, ids, news_ids):
+        """`ids` ni o'qilgan deb belgilaydi va chegarani suradi (saqlamaydi)."""
+        bits = readstate.mark(self.read_up_to, readstate.decode(self.read_after), ids)
+        self.read_up_to, bits = readstate.compact(
+            self.read_up_to, bits, readstate.ids_after(news_ids, self.read_up_to))
+        self.read_after = readstate.encode(bits)
+
+    def mark_all_read(self, news_ids):
+        """
+        Hozirgi barcha yangiliklarni o'qilgan deb belgilaydi (saqlamaydi).
+        Holat o'zgargan bo'lsa True.
+        """
+        if not news_ids or news_ids[-1] <= self.read_up_to:
+            return False
+        self.read_up_to = news_ids[-1]
+        self.read_after = b''
+        return True
+
+    def is_read(self, news_id):
+        if news_id <= self.read_up_to:
+            return True
+        return bool(readstate.decode(self.read_after) >> (news_id - self.read_up_to - 1) & 1)
+
+    def unread_ids(self, news_ids):
+        return readstate.unread(self.read_up_to, readstate.decode(self.read_after),
+                                readstate.ids_after(news_ids, self.read_up_to))
+
+    def read_ids(self, news_ids):
+        unread = set(self.unread_ids(news_ids))
+        return [news_id for news_id in news_ids if news_id not in unread]
+
+
+class ResourceVersion(models.Model):
+    """
+    Keshlangan ma'lumotlar uchun umumiy versiya hisoblagichi. Signal'lar
+    versiyani oshiradi, keshlar kalitiga versiya qo'shiladi - shu tufayli
+    bir nechta worker bir xil holatni ko'radi.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+
+class RevokedToken(models.Model):
+    """
+    Bekor qilingan JWT tokenlar. `jti` berilgan bo'lsa - bitta token,
+    aks holda foydalanuvchining `revoked_at` gacha berilgan barcha tokenlari.
+    `claims_only` - tokenlar bekor emas, faqat ulardagi rol va is_staff/
+    is_superuser claim'lari eskirgan (ular bazadan olinadi).
+    O'chirilgan foydalanuvchi uchun `user` emas, `deleted_user_id` yoziladi:
+    FK bilan bog'langan yozuvlar user bilan birga o'chib ketadi.
+    Muddati (`expires_at`) o'tgan yozuvlar tekshirilmaydi.
+    """
+    jti = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    deleted_user_id = models.BigIntegerField(null=True, blank=True, editable=False)
+    claims_only = models.BooleanField(default=False)
+    revoked_at = models.DateTimeField(default=now)
+    expires_at = models.DateTimeField(db_index=True)
 
+    def __str__(self):
+        return self.jti or f"{self.user_id or self.deleted_user_id}: {self.revoked_at}"
+
+    @classmethod
+    def revoke_token(cls, token):
+        """Bitta tokenni (access yoki refresh) bekor qiladi."""
+        expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        return cls.objects.get_or_create(jti=token['jti'], defaults={
+            'user_id': token.get('user_id'), 'expires_at': expires_at,
+        })[0]
+
+    @classmethod
+    def revoke_user(cls, user):
+        """Foydalanuvchining hozirgacha berilgan barcha tokenlarini bekor qiladi."""
+        from rest_framework_simplejwt.settings import api_settings
+
+        revoked_at = now()
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        return cls.objects.update_or_create(user=user, jti=None, claims_only=False, defaults={
+            'revoked_at': revoked_at, 'expires_at': revoked_at + lifetime,
+        })[0]
+
+    @classmethod
+    def revoke_deleted_user(cls, user_id):
+        """O'chirilgan foydalanuvchining barcha tokenlari (FK'siz yozuv)."""
+        from rest_framework_simplejwt.settings import api_settings
+
+        revoked_at = now()
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        return cls.objects.create(deleted_user_id=user_id, revoked_at=revoked_at, expires_at=revoked_at + lifetime)
+
+    @classmethod
+    def expire_claims(cls, user_id):
+        """Rol o'zgardi: hozirgacha berilgan tokenlardagi claim'larga ishonilmaydi."""
+        from rest_framework_simplejwt.settings import api_settings
+
+        revoked_at = now()
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        return cls.objects.update_or_create(user_id=user_id, jti=None, claims_only=True, defaults={
+            'revoked_at': revoked_at, 'expires_at': revoked_at + lifetime,
+        })[0]
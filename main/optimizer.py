@@ -0,0 +1,115 @@
+"""
+Serializer maydonlari daraxtidan kelib chiqib querysetga select_related,
+prefetch_related va only() qo'shish. Ichma-ich serializerlar bo'lgan
+ro'yxatlarda N+1 so'rovlarning oldini oladi.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def _get_field(opts, name):
+    try:
+        return opts.get_field(name)
+    except FieldDoesNotExist:
+        for related in opts.related_objects:
+            if related.get_accessor_name() == name:
+                return related
+    return None
+
+
+def _collect(serializer, model, prefix, select, prefetch, required=()):
+    """
+    Bitta daraja (model) uchun maydonlarni yig'adi. select_related yo'llari
+    va Prefetch obyektlari `select`/`prefetch` ga qo'shiladi. Qaytadigan
+    qiymat - only() uchun yo'llar ro'yxati yoki None (agar bu darajada
+    ustunlarni cheklab bo'lmasa, masalan SerializerMethodField bo'lsa).
+    """
+    opts = model._meta
+    only = {prefix + opts.pk.attname, *(prefix + name for name in required)}
+    restrict = True
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            restrict = False
+            continue
+
+        attrs = field.source_attrs
+        model_field = _get_field(opts, attrs[0])
+        if model_field is None:
+            restrict = False
+            continue
+        path = prefix + attrs[0]
+
+        if model_field.one_to_many or model_field.many_to_many:
+            if isinstance(field, (ListSerializer, ManyRelatedField)) and len(attrs) == 1:
+                related_queryset = model_field.related_model._default_manager.all()
+                if isinstance(field, ListSerializer):
+                    back_reference = [model_field.field.name] if model_field.one_to_many else []
+                    related_queryset = optimize_queryset(related_queryset, field.child, required=back_reference)
+                prefetch.append(Prefetch(path, queryset=related_queryset))
+            else:
+                restrict = False
+            continue
+
+        if model_field.many_to_one or model_field.one_to_one:
+            if model_field.concrete:
+                only.add(path)
+            elif not isinstance(field, BaseSerializer):
+                restrict = False
+
+            if isinstance(field, PrimaryKeyRelatedField) and len(attrs) == 1:
+                continue
+
+            select.add(path)
+            if isinstance(field, BaseSerializer) and len(attrs) == 1:
+                nested_only = _collect(field, model_field.related_model, path + '__', select, prefetch)
+                if nested_only is not None and model_field.concrete:
+                    only.update(nested_only)
+            continue
+
+        if len(attrs) > 1 or not model_field.concrete:
+            restrict = False
+            continue
+        only.add(path)
+
+    return sorted(only) if restrict else None
+
+
+def optimize_queryset(queryset, serializer, required=()):
+    """
+    `serializer` (instansiya) chiqaradigan maydonlarga mos ravishda
+    querysetni optimallashtiradi. `required` - har doim yuklanishi kerak
+    bo'lgan qo'shimcha maydonlar (masalan, prefetch uchun teskari FK).
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+
+    select, prefetch = set(), []
+    only = _collect(serializer, queryset.model, '', select, prefetch, required)
+
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
+
+
+class OptimizedQuerysetMixin:
+    """
+    GET so'rovlarida querysetni view serializeriga qarab optimallashtiradi.
+    ListAPIView va ListCreateAPIView lar uchun. `optimizer_required_fields` -
+    serializerda bo'lmasa ham view o'zi ishlatadigan maydonlar.
+    """
+    optimizer_required_fields = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method == 'GET':
+            queryset = optimize_queryset(queryset, self.get_serializer(), required=self.optimizer_required_fields)
+        return queryset
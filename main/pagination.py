@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Ledger ro'yxatlari uchun (created_at, id) bo'yicha kursorli sahifalash.
+
+    Standart rejim - kursorli: birinchi sahifa `?cursor=` siz (yoki bo'sh
+    qiymat bilan), keyingilari `next`/`previous` havolalari orqali. Kursor
+    oxirgi ko'rilgan yozuvning (created_at, id) juftligi, shuning uchun
+    N-sahifa ham 1-sahifa kabi indeks bo'yicha bitta so'rov bilan olinadi.
+    Jami son faqat `?count=true` bo'lganda hisoblanadi.
+
+    Eski mijozlar uchun `?offset=` berilganda (yoki boshqa `ordering`
+    tanlanganda) oddiy limit/offset sahifalash ishlaydi - OFFSET va
+    COUNT(*) bilan.
+    """
+    default_limit = 5
+    limit_query_param = 'limit'
+    offset_query_param = 'offset'
+    max_limit = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering_fields = ('created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def use_keyset(self, request, view):
+        if self.offset_query_param in request.query_params and self.cursor_query_param not in request.query_params:
+            return False
+        ordering = request.query_params.get('ordering')
+        return not ordering or ordering == '-created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request, view)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = queryset.count()
+
+        position, reverse = self.decode_cursor(request)
+        created_field, id_field = self.ordering_fields
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(**{f'{created_field}__gt': created_at}) | Q(**{created_field: created_at, f'{id_field}__gt': pk})
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{created_field}__lt': created_at}) | Q(**{created_field: created_at, f'{id_field}__lt': pk})
+                )
+
+        if reverse:
+            queryset = queryset.order_by(created_field, id_field)
+        else:
+            queryset = queryset.order_by(f'-{created_field}', f'-{id_field}')
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or reverse:
+                self.next_position = self.get_position(results[-1])
+            if (has_more and reverse) or (not reverse and position is not None):
+                self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_position(self, instance):
+        created_field, id_field = self.ordering_fields
+        return getattr(instance, created_field), getattr(instance, id_field)
+
+    def encode_cursor(self, position, reverse):
+        created_at, pk = position
+        payload = json.dumps({'c': created_at.isoformat(), 'i': pk, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            created_at = parse_datetime(payload['c'])
+            if created_at is None:
+                raise ValueError
+            return (created_at, int(payload['i'])), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = {
+            'next': self.get_cursor_link(self.next_position, False),
+            'previous': self.get_cursor_link(self.previous_position, True),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
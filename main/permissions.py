@@ -1,14 +1,16 @@
 from rest_framework.permissions import BasePermission
 
+from .roles import get_role
+
 
 class IsMentor(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'mentor')
+        return request.user.is_authenticated and get_role(request).is_mentor
 
 
 class IsStudent(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'student')
+        return request.user.is_authenticated and get_role(request).is_student
 
 
 class IsAdmin(BasePermission):
@@ -18,4 +20,4 @@ class IsAdmin(BasePermission):
 
 class IsMentorOrAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (hasattr(request.user, 'mentor') or request.user.is_superuser)
+        return request.user.is_authenticated and (get_role(request).is_mentor or request.user.is_superuser)
@@ -0,0 +1,84 @@
+"""
+Yangiliklarni o'qilganlik holati: "shu id gacha hammasi o'qilgan"
+chegarasi (watermark) va undan keyingi o'qilgan yangiliklar bitset'i.
+
+Bit `i` yangilik id si `watermark + 1 + i` ga mos keladi. Bitset zlib
+bilan siqilgan baytlar ko'rinishida saqlanadi.
+"""
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+
+_news_ids_lock = threading.Lock()
+_news_ids = (None, [])
+
+
+def decode(data):
+    if not data:
+        return 0
+    return int.from_bytes(zlib.decompress(bytes(data)), 'little')
+
+
+def encode(bits):
+    if not bits:
+        return b''
+    return zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+
+
+def mark(watermark, bits, ids):
+    """`ids` ni o'qilgan deb belgilaydi (watermark gacha bo'lganlari allaqachon o'qilgan)."""
+    for news_id in ids:
+        if news_id > watermark:
+            bits |= 1 << (news_id - watermark - 1)
+    return bits
+
+
+def compact(watermark, bits, ids_after):
+    """
+    Watermark'ni ketma-ket o'qilgan yangiliklar ustidan suradi.
+    `ids_after` - watermark dan katta mavjud yangilik id lari (o'sish tartibida);
+    ular orasidagi mavjud bo'lmagan id lar o'tkazib yuboriladi.
+    """
+    new_watermark = watermark
+    for news_id in ids_after:
+        if not bits >> (news_id - watermark - 1) & 1:
+            break
+        new_watermark = news_id
+    return new_watermark, bits >> (new_watermark - watermark)
+
+
+def unread(watermark, bits, ids_after):
+    return [news_id for news_id in ids_after if not bits >> (news_id - watermark - 1) & 1]
+
+
+def exists(news_ids, news_id):
+    index = bisect_left(news_ids, news_id)
+    return index < len(news_ids) and news_ids[index] == news_id
+
+
+def ids_after(news_ids, watermark):
+    return news_ids[bisect_right(news_ids, watermark):]
+
+
+def news_ids():
+    """
+    Barcha yangilik id lari (o'sish tartibida), jarayon ichida keshlanadi.
+    `news` versiyasi o'zgarganda (New saqlanganda yoki o'chirilganda)
+    qaytadan o'qiladi.
+    """
+    global _news_ids
+    from . import versions
+    from .models import New
+
+    version = versions.get_version(versions.NEWS)
+    cached_version, ids = _news_ids
+    if cached_version != version:
+        with _news_ids_lock:
+            ids = list(New.objects.order_by('id').values_list('id', flat=True))
+            _news_ids = (version, ids)
+    return ids
+
+
+def clear_cache():
+    global _news_ids
+    _news_ids = (None, [])
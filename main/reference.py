@@ -0,0 +1,108 @@
+"""
+Kichik ma'lumotnoma jadvallari (Course, PointType, Group, Mentor) uchun
+jarayon ichidagi kesh.
+
+Kesh `reference` resurs versiyasi bilan belgilanadi (signal'lar oshiradi),
+shuning uchun bir nechta worker bir xil holatni ko'radi. Versiya har bir
+so'rovda ko'pi bilan bir marta tekshiriladi (`request_started` signali),
+so'rovdan tashqarida esa REFERENCE_CACHE_TTL soniyada bir marta.
+
+Mentor.point_limit ball berish va qaytarishda (GivePoint.save/delete) F()
+UPDATE bilan o'zgaradi va versiyani oshirmaydi, ya'ni keshdagi qiymat
+ikkala tomonga ham eskirgan bo'lishi mumkin. Shuning uchun undan hech qanday
+tekshiruvda foydalanilmaydi: limitni faqat GivePoint.save dagi shartli
+UPDATE tekshiradi.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+
+
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stamp = None
+        self._tables = {}
+        self._generation = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'REFERENCE_CACHE_TTL', 5)
+
+    @staticmethod
+    def querysets():
+        from .models import Course, Group, Mentor, PointType
+
+        return {
+            Course: Course.objects.all(),
+            PointType: PointType.objects.all(),
+            Group: Group.objects.all(),
+            Mentor: Mentor.objects.select_related('user'),
+        }
+
+    @property
+    def models(self):
+        return tuple(self.querysets())
+
+    def _ensure_fresh(self):
+        checked = getattr(self._local, 'checked', None)
+        if (checked is not None and checked[1] == self._generation
+                and time.monotonic() - checked[0] <= self.ttl and self._stamp is not None):
+            return
+
+        from . import versions
+
+        generation = self._generation
+        stamp = versions.get_stamp(versions.REFERENCE)
+        if stamp != self._stamp:
+            self.reload(stamp)
+        self._local.checked = (time.monotonic(), generation)
+
+    def reload(self, stamp):
+        tables = {model: {obj.pk: obj for obj in queryset} for model, queryset in self.querysets().items()}
+        with self._lock:
+            self._tables = tables
+            self._stamp = stamp
+
+    def start_request(self, **kwargs):
+        """`request_started` signali: joriy oqim versiyani qayta tekshiradi."""
+        self._local.checked = None
+
+    def expire(self):
+        """Shu jarayondagi o'zgarishdan keyin: barcha oqimlar versiyani qayta tekshiradi."""
+        self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._tables = {}
+            self._stamp = None
+        self._local.checked = None
+
+    def get(self, model, pk):
+        """
+        `pk` li obyektning nusxasi. Keshda bo'lmasa (masalan, shu
+        tranzaksiyada yaratilgan) bazadan o'qiladi; topilmasa None.
+        """
+        if pk is None:
+            return None
+        self._ensure_fresh()
+        obj = self._tables.get(model, {}).get(pk)
+        if obj is None:
+            return self.querysets()[model].filter(pk=pk).first()
+        return copy.copy(obj)
+
+    def related(self, instance, field_name):
+        """
+        `instance.<field_name>` - agar obyekt select_related bilan allaqachon
+        yuklangan bo'lsa o'sha, aks holda keshdan (bazaga so'rovsiz).
+        """
+        descriptor = getattr(type(instance), field_name)
+        if descriptor.is_cached(instance):
+            return getattr(instance, field_name)
+        return self.get(descriptor.field.related_model, getattr(instance, descriptor.field.attname))
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,115 @@
+"""
+DRF uchun tez JSON renderer va parser.
+
+orjson o'rnatilgan bo'lsa u ishlatiladi (dict/list subclasslari, ReturnDict,
+datetime va UUID ni o'zi to'g'ridan-to'g'ri yozadi). Aks holda standart
+`json` modulining C kodlovchisi ishlatiladi. Ikkala holatda ham Decimal,
+date va lazy stringlar uchun `default` funksiyasidagi tez yo'llar ishlaydi,
+natija esa DRF ning JSONRenderer natijasi bilan bir xil.
+"""
+import datetime
+import decimal
+import json
+import uuid
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ixtiyoriy
+    orjson = None
+
+UTF8 = ('utf-8', 'utf8')
+
+
+def default(obj):
+    """JSON ga to'g'ridan-to'g'ri yozilmaydigan obyektlar (DRF JSONEncoder bilan bir xil natija)."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        if isinstance(obj, datetime.time) and obj.utcoffset() is not None:
+            raise ValueError("JSON can't represent timezone-aware times.")
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, 'items'):
+        return dict(obj)
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def escape_line_separators(content):
+    # DRF kabi \u2028 va \u2029 ni escape qilamiz (JavaScript bilan mos bo'lishi uchun)
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer bilan bir xil natija beradi. `indent` so'ralganda (masalan
+    browsable API) yoki orjson bajara olmaydigan sozlamalarda
+    (UNICODE_JSON=False, COMPACT_JSON=False) oddiy yo'lga qaytadi.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and not self.ensure_ascii:
+            if orjson is not None:
+                try:
+                    content = orjson.dumps(data, default=default,
+                                           option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+                except orjson.JSONEncodeError:
+                    # Masalan 64 bitdan katta butun sonlar
+                    pass
+                else:
+                    return escape_line_separators(content)
+
+            content = json.dumps(data, default=default, ensure_ascii=False,
+                                 allow_nan=not self.strict, separators=(',', ':'))
+            return escape_line_separators(content.encode())
+
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            content = stream.read()
+            if encoding.lower() not in UTF8:
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
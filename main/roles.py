@@ -0,0 +1,73 @@
+"""
+Foydalanuvchi roli (mentor/student) va unga tegishli id lar.
+
+Rol JWT access tokenida imzolangan claim sifatida keladi (`/token/` va
+`/token/refresh/` tokenlari). Claim bo'lmasa (eski token, session) rol
+bitta so'rov bilan aniqlanadi va so'rov davomida saqlanadi, shuning uchun
+`hasattr(user, 'mentor')` kabi takroriy so'rovlar bo'lmaydi.
+
+Claim'lar token berilgan paytdagi holat. Mentor/Student yaratilsa,
+o'chirilsa, boshqa userga yoki student boshqa guruhga o'tsa (signals.py)
+eski tokenlarning claim'lari eskirgan deb belgilanadi va rol bazadan
+olinadi; `/token/refresh/` claim'larni bazadan qaytadan yozadi.
+"""
+from collections import namedtuple
+
+MENTOR = 'mentor'
+STUDENT = 'student'
+UNKNOWN = 'unknown'
+
+CLAIMS = ('role', 'mentor_id', 'student_id', 'group_id')
+
+
+class Role(namedtuple('Role', 'name mentor_id student_id group_id')):
+    __slots__ = ()
+
+    @property
+    def is_mentor(self):
+        return self.mentor_id is not None
+
+    @property
+    def is_student(self):
+        return self.student_id is not None
+
+    @classmethod
+    def from_ids(cls, mentor_id, student_id, group_id):
+        name = MENTOR if mentor_id is not None else STUDENT if student_id is not None else UNKNOWN
+        return cls(name, mentor_id, student_id, group_id)
+
+    def as_claims(self):
+        return dict(zip(CLAIMS, self))
+
+
+NO_ROLE = Role(UNKNOWN, None, None, None)
+
+
+def role_for_user(user):
+    """Bazadan, bitta so'rov bilan."""
+    if not user or not user.is_authenticated:
+        return NO_ROLE
+    from django.contrib.auth.models import User
+
+    row = User.objects.filter(pk=user.pk).values_list('mentor__id', 'student__id', 'student__group_id').first()
+    return Role.from_ids(*row) if row else NO_ROLE
+
+
+def get_role(request):
+    """
+    So'rov foydalanuvchisining roli: avval token claim'laridan, bo'lmasa
+    bazadan. Natija so'rov obyektida saqlanadi (permission, view va
+    serializer bir xil qiymatni oladi).
+    """
+    from .authentication import revoked_tokens
+
+    role = getattr(request, '_role', None)
+    if role is None:
+        token = request.auth
+        if (request.user.is_authenticated and hasattr(token, 'get') and token.get('role') is not None
+                and not revoked_tokens.claims_stale(token)):
+            role = Role(*(token.get(claim) for claim in CLAIMS))
+        else:
+            role = role_for_user(request.user)
+        request._role = role
+    return role
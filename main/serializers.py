@@ -1,5 +1,62 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from .models import *
+from .authentication import revoked_tokens
+from .fieldsets import DynamicFieldsMixin
+from .images import FORMATS as IMAGE_FORMATS
+from .reference import reference_cache
+from .roles import get_role, role_for_user
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Course, PointType, Group va Mentor ni ma'lumotnoma keshidan oladi
+    (har bir POST da bazaga `get(pk=...)` so'rovisiz). Boshqa modellar va
+    filtrlangan querysetlar uchun oddiy PrimaryKeyRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        if self.pk_field is not None or queryset.model not in reference_cache.models or queryset.query.has_filters():
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = reference_cache.get(queryset.model, pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    `image_variants` dagi kichraytirilgan rasmlar URL lari:
+    {'width': ..., 'height': ..., 'webp': {'160': url, ...}, 'jpeg': {...}}.
+    Variantlar hali tayyor bo'lmasa None.
+    """
+
+    def to_representation(self, value):
+        if not value or not value.get('source'):
+            return None
+        request = self.context.get('request')
+
+        def build_url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        representation = {'width': value.get('width'), 'height': value.get('height')}
+        for fmt in IMAGE_FORMATS:
+            representation[fmt] = {width: build_url(name) for width, name in (value.get(fmt) or {}).items()}
+        return representation
 
 
 class GetUserSerializer(serializers.ModelSerializer):
@@ -16,12 +73,82 @@ class GetUserSerializer(serializers.ModelSerializer):
         - Agar foydalanuvchi Mentor bo‘lsa, 'mentor' qaytadi.
         - Agar foydalanuvchi Student bo‘lsa, 'student' qaytadi.
         - Agar ikkalasiga ham aloqador bo‘lmasa, 'unknown' qaytadi.
+        Joriy foydalanuvchi uchun token claim'laridan olinadi.
         """
-        if hasattr(obj, 'mentor'):
-            return 'mentor'
-        elif hasattr(obj, 'student'):
-            return 'student'
-        return 'unknown'
+        request = self.context.get('request')
+        if request is not None and request.user.pk == obj.pk:
+            return get_role(request).name
+        return role_for_user(obj).name
+
+
+def set_user_claims(token, user):
+    """Rol claim'lari (role, mentor_id, student_id, group_id) va is_staff/is_superuser - bazadan."""
+    for claim, value in role_for_user(user).as_claims().items():
+        token[claim] = value
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Tokenlarga rol claim'lari (role, mentor_id, student_id, group_id) va
+    is_staff/is_superuser qo'shiladi - bazasiz autentifikatsiyadagi
+    TokenUser shulardan foydalanadi.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        return set_user_claims(super().get_token(user), user)
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Bekor qilingan refresh token rad etiladi. Yangi access tokenning claim'lari
+    refresh tokendan ko'chirilmaydi, bazadan qaytadan olinadi: rol yoki
+    is_staff o'zgargan bo'lsa yangi tokenda ko'rinadi.
+    """
+
+    def validate(self, attrs):
+        try:
+            refresh = self.token_class(attrs['refresh'])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        if revoked_tokens.is_revoked(refresh):
+            raise InvalidToken("Token has been revoked")
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True).first()
+        if user is None:
+            raise InvalidToken("User not found or inactive")
+
+        access = set_user_claims(refresh.access_token, user)
+        # access_token refresh ning `iat` ini ko'chiradi; yangi claim'lar yangi vaqt bilan
+        access.set_iat()
+        data = {'access': str(access)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            set_user_claims(refresh, user)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    """
+    Joriy access token bekor qilinadi; `refresh` berilsa u ham.
+    `all=true` - foydalanuvchining barcha tokenlari (boshqa qurilmalar ham).
+    """
+    refresh = serializers.CharField(required=False)
+    all = serializers.BooleanField(default=False)
+
+    def validate_refresh(self, value):
+        try:
+            refresh = RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(exc.args[0])
+        if refresh.get('user_id') != self.context['request'].user.pk:
+            raise serializers.ValidationError("Token boshqa foydalanuvchiga tegishli.")
+        return refresh
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -34,32 +161,40 @@ class UserSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = '__all__'
 
 
-class MentorSerializer(serializers.ModelSerializer):
+class MentorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    serializer_related_field = CachedPrimaryKeyRelatedField
 
     class Meta:
         model = Mentor
         fields = '__all__'
+        expandable_fields = {'course': CourseSerializer}
+
 
+class GroupSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
 
-class GroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = '__all__'
+        expandable_fields = {'mentor': MentorSerializer}
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    image_variants = ImageVariantsField()
+    serializer_related_field = CachedPrimaryKeyRelatedField
 
     class Meta:
         model = Student
         fields = '__all__'
+        expandable_fields = {'group': GroupSerializer}
 
 
 class StudentUpdateSerializer(serializers.ModelSerializer):
@@ -68,32 +203,113 @@ class StudentUpdateSerializer(serializers.ModelSerializer):
         fields = ['birth_date', 'image', 'bio','phone_number']  # Student'lar faqat shularni o'zgartira oladi
 
 
-class PointTypeSerializer(serializers.ModelSerializer):
+class PointTypeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PointType
         fields = '__all__'
 
 
-class GivePointSerializer(serializers.ModelSerializer):
+class GivePointSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = GivePoint
         fields = '__all__'
+        expandable_fields = {'student': StudentSerializer, 'mentor': MentorSerializer, 'point_type': PointTypeSerializer}
+
+    def validate(self, attrs):
+        # Yangi yozuv uchun max_point ni oldindan tekshirish (ma'lumotnoma keshidan)
+        if self.instance is None:
+            try:
+                GivePoint(**attrs).clean()
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.messages)
+        return attrs
+
+    def save(self, **kwargs):
+        # Limit tekshiruvi GivePoint.save ichida (UPDATE bilan) bajariladi
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+
+
+
+class BulkGivePointSerializer(serializers.Serializer):
+    """
+    Ballar mentorning point_limit idan yechiladi: mentor o'zi uchun beradi
+    (`mentor` so'rovdan emas, roldan olinadi), `mentor` ni faqat admin tanlaydi.
+    """
+    mentor = CachedPrimaryKeyRelatedField(queryset=Mentor.objects.all(), required=False)
+    point_type = CachedPrimaryKeyRelatedField(queryset=PointType.objects.all())
+    amount = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    description = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    group = CachedPrimaryKeyRelatedField(queryset=Group.objects.all(), required=False)
+    students = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        if ('group' in attrs) == ('students' in attrs):
+            raise serializers.ValidationError("group yoki students dan faqat bittasi kiritilishi kerak.")
+
+        request = self.context['request']
+        if not request.user.is_superuser:
+            attrs['mentor'] = Mentor.objects.get(pk=get_role(request).mentor_id)
+        elif 'mentor' not in attrs:
+            raise serializers.ValidationError({'mentor': "Mentor kiritilishi kerak."})
 
+        if 'group' in attrs:
+            student_ids = list(Student.objects.filter(group=attrs['group']).values_list('id', flat=True))
+        else:
+            student_ids = list(dict.fromkeys(attrs['students']))
+            found = set(Student.objects.filter(id__in=student_ids).values_list('id', flat=True))
+            missing = [student_id for student_id in student_ids if student_id not in found]
+            if missing:
+                raise serializers.ValidationError({'students': f"Studentlar topilmadi: {missing}"})
 
+        if not student_ids:
+            raise serializers.ValidationError("Ball beriladigan studentlar yo'q.")
 
-class GetPointSerializer(serializers.ModelSerializer):
+        point_type = attrs['point_type']
+        if attrs['amount'] > point_type.max_point:
+            raise serializers.ValidationError(
+                {'amount': f"Amount cannot exceed the max point of {point_type.max_point} for {point_type.name}."})
+
+        attrs['student_ids'] = student_ids
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return GivePoint.objects.bulk_award(
+                mentor=validated_data['mentor'],
+                point_type=validated_data['point_type'],
+                amount=validated_data['amount'],
+                date=validated_data['date'],
+                student_ids=validated_data['student_ids'],
+                description=validated_data.get('description'),
+            )
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+
+
+class GetPointSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     student=StudentSerializer()
     class Meta:
         model = GivePoint
         fields = '__all__'
+        expandable_fields = {'mentor': MentorSerializer, 'point_type': PointTypeSerializer}
+
+class NewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
-class NewSerializer(serializers.ModelSerializer):
     class Meta:
         model = New
         fields = '__all__'
 
-class NewsReadStatusSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = NewsReadStatus
-        fields = ['id', 'user', 'news', 'is_read']
 
+class MarkNewsReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class MarkAllNewsReadSerializer(serializers.Serializer):
+    until = serializers.DateTimeField(required=False)
@@ -0,0 +1,146 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.core.signals import request_started
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import images, versions
+from .leaderboard import leaderboard
+from .authentication import revoked_tokens
+from .reference import reference_cache
+from .models import Course, Mentor, Group, Student, PointType, GivePoint, DailyPointStat, New, RevokedToken
+
+
+@receiver([post_save, post_delete], sender=GivePoint)
+def invalidate_given_point_stats(sender, **kwargs):
+    # Har bir ball berishda: versiya qatori ball berish tranzaksiyasida qulflanmasin
+    versions.bump_on_commit(versions.POINT_STATS)
+
+
+@receiver([post_save, post_delete], sender=PointType)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Mentor)
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_point_stats(sender, **kwargs):
+    versions.bump(versions.POINT_STATS)
+
+
+@receiver(pre_delete, sender=Student)
+def detach_student_point_stats(sender, instance, **kwargs):
+    DailyPointStat.detach('student', instance.pk)
+
+
+@receiver(pre_delete, sender=PointType)
+def detach_point_type_point_stats(sender, instance, **kwargs):
+    DailyPointStat.detach('point_type', instance.pk)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_point_stats(sender, instance, created, **kwargs):
+    # Kurs bo'yicha o'rtachalar studentning guruhi (-> mentor -> kurs) bo'yicha
+    if not created and instance.has_changed('group_id'):
+        versions.bump(versions.POINT_STATS)
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_deleted_student_point_stats(sender, **kwargs):
+    versions.bump(versions.POINT_STATS)
+
+
+request_started.connect(reference_cache.start_request, dispatch_uid='reference_cache_start_request')
+
+
+@receiver([post_save, post_delete], sender=PointType)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Mentor)
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_reference(sender, **kwargs):
+    versions.bump(versions.REFERENCE)
+    transaction.on_commit(reference_cache.expire)
+
+
+@receiver(post_save, sender=User)
+def invalidate_mentor_user(sender, instance, created, **kwargs):
+    # Mentor ma'lumotlarida (?expand=mentor) user ismi ham bor
+    if not created and Mentor.objects.filter(user_id=instance.pk).exists():
+        versions.bump(versions.REFERENCE)
+        transaction.on_commit(reference_cache.expire)
+
+
+@receiver(post_save, sender=Student)
+def update_leaderboard_student(sender, instance, **kwargs):
+    transaction.on_commit(lambda: leaderboard.set_student(instance.id, instance.point, instance.group_id))
+
+
+@receiver(post_delete, sender=Student)
+def remove_leaderboard_student(sender, instance, **kwargs):
+    transaction.on_commit(lambda: leaderboard.remove(instance.id))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_leaderboard(sender, **kwargs):
+    transaction.on_commit(leaderboard.invalidate)
+
+
+@receiver([post_save, post_delete], sender=New)
+def invalidate_news(sender, **kwargs):
+    versions.bump(versions.NEWS)
+
+
+@receiver([post_save, post_delete], sender=RevokedToken)
+def invalidate_revoked_tokens(sender, **kwargs):
+    versions.bump(versions.REVOKED_TOKENS)
+    transaction.on_commit(revoked_tokens.expire)
+
+
+@receiver(post_save, sender=User)
+def revoke_inactive_user_tokens(sender, instance, created, **kwargs):
+    # Bazasiz autentifikatsiyada is_active tekshirilmaydi
+    if not created and not instance.is_active:
+        RevokedToken.revoke_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    # Bazasiz autentifikatsiyada user mavjudligi tekshirilmaydi
+    RevokedToken.revoke_deleted_user(instance.pk)
+
+
+def expire_role_claims(*user_ids):
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        RevokedToken.expire_claims(user_id)
+
+
+@receiver(post_save, sender=Mentor)
+@receiver(post_save, sender=Student)
+def role_saved(sender, instance, created, **kwargs):
+    # Tokendagi role/mentor_id/student_id/group_id endi boshqacha
+    fields = ('user_id', 'group_id') if sender is Student else ('user_id',)
+    if created or any(instance.has_changed(field) for field in fields):
+        expire_role_claims(instance.user_id, getattr(instance, '_loaded_values', {}).get('user_id'))
+
+
+@receiver(post_delete, sender=Mentor)
+@receiver(post_delete, sender=Student)
+def role_deleted(sender, instance, **kwargs):
+    expire_role_claims(instance.user_id)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_flags(sender, instance, update_fields=None, **kwargs):
+    instance._flags_changed = False
+    if instance.pk is None or (update_fields is not None and not {'is_staff', 'is_superuser'} & set(update_fields)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list('is_staff', 'is_superuser').first()
+    instance._flags_changed = previous is not None and previous != (instance.is_staff, instance.is_superuser)
+
+
+@receiver(post_save, sender=User)
+def expire_user_flag_claims(sender, instance, created, **kwargs):
+    # TokenUser.is_staff/is_superuser token claim'laridan olinadi
+    if not created and instance._flags_changed:
+        expire_role_claims(instance.pk)
+
+
+post_save.connect(images.image_saved, sender=Student, dispatch_uid='student_image_variants')
+post_save.connect(images.image_saved, sender=New, dispatch_uid='new_image_variants')
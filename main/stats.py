@@ -0,0 +1,142 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from . import versions
+from .models import Course, PointType, DailyPointStat
+
+
+def student_point_stats(student_ids, start_date=None, end_date=None):
+    """
+    Berilgan studentlar uchun ball statistikasi.
+
+    Barcha studentlar uchun DailyPointStat jadvalidan bitta guruhlangan
+    so'rov ishlatiladi (student + point_type bo'yicha), natija Python'da bir
+    marta aylanib chiqiladi. So'rovlar soni studentlar soniga bog'liq emas.
+
+    Natija: {student_id: {'total_points', 'give_point_count', 'point_type'}}
+    """
+    daily_stats = DailyPointStat.objects.filter(student_id__in=list(student_ids))
+    if start_date:
+        daily_stats = daily_stats.filter(date__gte=start_date)
+    if end_date:
+        daily_stats = daily_stats.filter(date__lte=end_date)
+
+    rows = (
+        daily_stats
+        .values('student_id', 'point_type__name')
+        .annotate(sum=Sum('total'), count=Sum('count'))
+        .order_by('student_id', 'point_type__name')
+    )
+
+    grouped = defaultdict(list)
+    for row in rows:
+        if row['count']:
+            grouped[row['student_id']].append(row)
+
+    stats_map = {}
+    for student_id, items in grouped.items():
+        total_points = sum(item['sum'] for item in items)
+        total_sum = total_points or 1
+
+        stats_map[student_id] = {
+            'total_points': total_points,
+            'give_point_count': sum(item['count'] for item in items),
+            'point_type': [
+                {
+                    'point_type__name': item['point_type__name'],
+                    'total': item['sum'],
+                    'avg': item['sum'] / item['count'],
+                    'percentage': round((item['sum'] / total_sum) * 100, 2),
+                    'count': item['count'],
+                }
+                for item in items
+            ],
+        }
+
+    return stats_map
+
+
+def given_point_summary(date_from=None, date_to=None):
+    """
+    Berilgan ballar bo'yicha umumiy o'rtacha va point_type kesimidagi
+    statistika. DailyPointStat dan o'qiladi, shuning uchun narxi
+    GivePoint jadvali hajmiga emas, kunlar va guruhlar soniga bog'liq.
+    """
+    daily_stats = DailyPointStat.objects.all()
+    if date_from and date_to:
+        daily_stats = daily_stats.filter(date__range=[date_from, date_to])
+
+    rows = [
+        row for row in (
+            daily_stats
+            .values('point_type__name')
+            .annotate(sum=Sum('total'), count=Sum('count'))
+            .order_by('point_type__name')
+        )
+        if row['count']
+    ]
+
+    total_amount = float(sum(row['sum'] for row in rows))
+    total_count = sum(row['count'] for row in rows)
+
+    point_type_stats = [
+        {
+            'point_type__name': row['point_type__name'],
+            'amount_avg': row['sum'] / row['count'],
+            'amount_sum': float(row['sum']),
+            'percentage': 100.0 * row['sum'] / total_amount if total_amount else 0,
+        }
+        for row in rows
+    ]
+
+    return {
+        'average_amount': total_amount / total_count if total_count else 0,
+        'point_type_stats': point_type_stats,
+    }
+
+
+def course_point_type_averages():
+    """
+    Har bir kurs uchun point_type bo'yicha o'rtacha ball:
+    [{course_name: {point_type_name: avg}}, ...]
+
+    Butun matritsa bitta guruhlangan so'rov bilan hisoblanadi
+    (DailyPointStat -> Student -> Group -> Mentor -> Course) va keshlanadi.
+    Kesh kaliti `point-stats` versiyasiga bog'langan, versiya GivePoint,
+    PointType, Course, Mentor va Group o'zgarganda, student boshqa guruhga
+    o'tganda yoki o'chirilganda oshiriladi. GivePoint uchun versiya commit'dan
+    keyin oshiriladi (ball berish tranzaksiyasidan tashqarida).
+    """
+    cache_key = f'course-point-type-averages:{versions.get_version(versions.POINT_STATS)}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    rows = (
+        DailyPointStat.objects
+        .filter(student__group__mentor__course__isnull=False, point_type__isnull=False)
+        .values('student__group__mentor__course_id', 'point_type_id')
+        .annotate(sum=Sum('total'), count=Sum('count'))
+        .order_by()
+    )
+    averages = {
+        (row['student__group__mentor__course_id'], row['point_type_id']): row['sum'] / row['count']
+        for row in rows
+        if row['count']
+    }
+
+    point_types = list(PointType.objects.values_list('id', 'name'))
+    result = [
+        {
+            course_name: {
+                point_type_name: averages.get((course_id, point_type_id), 0)
+                for point_type_id, point_type_name in point_types
+            }
+        }
+        for course_id, course_name in Course.objects.values_list('id', 'name')
+    ]
+
+    cache.set(cache_key, result, None)
+    return result
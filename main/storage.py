@@ -0,0 +1,55 @@
+"""
+Media fayllar uchun mazmun-xeshli nomlar.
+
+Yuklangan fayl `students/photo.jpg` emas, `students/photo.3f2a9c1b7d4e.jpg`
+nomi bilan saqlanadi (SHA-256 ning boshi). Fayl mazmuni o'zgarsa nomi ham
+o'zgaradi, shuning uchun URL'ni brauzer va proksi muddatsiz (immutable)
+keshlashi mumkin. Bir xil mazmunli fayl ikkinchi marta yozilmaydi.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(r'\.(?P<hash>[0-9a-f]{%d})(?:\.[^./]+)?$' % HASH_LENGTH)
+
+
+def get_content_hash(name):
+    """Nom xeshli bo'lsa xeshni, aks holda None qaytaradi."""
+    match = HASHED_NAME_RE.search(posixpath.basename(name))
+    return match and match.group('hash')
+
+
+def file_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, content_hash):
+    directory, filename = posixpath.split(name)
+    stem, extension = posixpath.splitext(filename)
+    # Qayta saqlanganda xesh ikki marta qo'shilmasin
+    stem = re.sub(r'\.[0-9a-f]{%d}$' % HASH_LENGTH, '', stem)
+    return posixpath.join(directory, f'{stem}.{content_hash}{extension}')
+
+
+class HashedMediaStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(self.generate_filename(name), file_hash(content))
+        if self.exists(name):
+            # Aynan shu mazmun allaqachon saqlangan
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -1,3 +1,1302 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+import uuid
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import docs, readstate, renderers
+from .management.commands.rebuild_point_rollup import Command as RebuildPointRollup
+from .authentication import revoked_tokens
+from .leaderboard import leaderboard
+from .reference import reference_cache
+from .models import (Course, Mentor, Group, Student, PointType, GivePoint, DailyPointStat, New, NewsReadState,
+                     RevokedToken)
+
+
+class StudentPointsListViewTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        mentor_user = User.objects.create(username='mentor')
+        self.mentor = Mentor.objects.create(user=mentor_user, course=course, point_limit=100000)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.homework = PointType.objects.create(name='Homework', max_point=10)
+        self.exam = PointType.objects.create(name='Exam', max_point=50)
+
+        self.client = APIClient()
+        self.client.force_authenticate(mentor_user)
+
+    def add_students(self, count):
+        for index in range(Student.objects.count(), Student.objects.count() + count):
+            user = User.objects.create(username=f'student{index}')
+            student = Student.objects.create(user=user, group=self.group)
+            GivePoint.objects.create(mentor=self.mentor, student=student, amount=5,
+                                     point_type=self.homework, date=date(2025, 1, 10))
+            GivePoint.objects.create(mentor=self.mentor, student=student, amount=30,
+                                     point_type=self.exam, date=date(2025, 2, 10))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_query_count_does_not_depend_on_student_count(self):
+        url = '/student-points/?limit=100'
+        self.add_students(3)
+        small, data = self.count_queries(url)
+        self.assertEqual(data['total_items'], 3)
+
+        self.add_students(20)
+        large, data = self.count_queries(url)
+        self.assertEqual(data['total_items'], 23)
+        self.assertEqual(small, large)
+
+    def test_stats_respect_date_range(self):
+        self.add_students(2)
+        _, data = self.count_queries('/student-points/?start_date=2025-02-01&end_date=2025-02-28')
+        item = data['results'][0]
+        self.assertEqual(item['total_points'], 30)
+        self.assertEqual(item['give_point_count'], 1)
+        self.assertEqual(item['point_type'], [{
+            'point_type__name': 'Exam', 'total': 30, 'avg': 30.0, 'percentage': 100.0, 'count': 1,
+        }])
+
+        _, data = self.count_queries('/student-points/')
+        item = data['results'][0]
+        self.assertEqual(item['total_points'], 35)
+        self.assertEqual(item['current_point'], 35)
+        self.assertEqual(item['give_point_count'], 2)
+
+    def test_pagination_is_applied(self):
+        self.add_students(7)
+        _, data = self.count_queries('/student-points/?limit=5&offset=5')
+        self.assertEqual(data['total_items'], 7)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNone(data['next'])
+
+
+class DailyPointStatTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=1000)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group)
+        self.homework = PointType.objects.create(name='Homework', max_point=10)
+        self.exam = PointType.objects.create(name='Exam', max_point=50)
+
+    def rollup(self):
+        return sorted(
+            DailyPointStat.objects.filter(count__gt=0).values_list('date', 'student_id', 'point_type_id', 'total', 'count')
+        )
+
+    def ledger(self):
+        return sorted(
+            GivePoint.objects.values('date', 'student_id', 'point_type_id')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .values_list('date', 'student_id', 'point_type_id', 'total', 'count')
+        )
+
+    def test_rollup_follows_save_update_and_delete(self):
+        first = GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=5,
+                                         point_type=self.homework, date=date(2025, 1, 10))
+        GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=7,
+                                 point_type=self.homework, date=date(2025, 1, 10))
+        second = GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=20,
+                                          point_type=self.exam, date=date(2025, 1, 11))
+        self.assertEqual(self.rollup(), self.ledger())
+
+        first.amount = 9
+        first.date = date(2025, 1, 12)
+        first.save()
+        self.assertEqual(self.rollup(), self.ledger())
+
+        second.delete()
+        self.assertEqual(self.rollup(), self.ledger())
+
+    def test_rebuild_command_restores_rollup(self):
+        for day in range(1, 6):
+            GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=day,
+                                     point_type=self.homework, date=date(2025, 1, day))
+        DailyPointStat.objects.all().delete()
+
+        call_command('rebuild_point_rollup', chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.rollup(), self.ledger())
+
+    def test_null_keys_are_unique_and_deleted_keys_are_merged(self):
+        other = Student.objects.create(user=User.objects.create(username='other'), group=self.student.group)
+        for student in (self.student, other):
+            GivePoint.objects.create(mentor=self.mentor, student=student, amount=4,
+                                     point_type=self.homework, date=date(2025, 1, 10))
+            GivePoint.objects.create(mentor=self.mentor, student=student, amount=20,
+                                     point_type=self.exam, date=date(2025, 1, 10))
+
+        self.student.delete()
+        other.delete()
+        self.exam.delete()
+        # SET_NULL bir xil NULL kalitli qatorlarga olib keladi: ular bittaga qo'shilgan
+        rollup = set(DailyPointStat.objects.values_list('date', 'student_id', 'point_type_id', 'total', 'count'))
+        ledger = set(GivePoint.objects.values('date', 'student_id', 'point_type_id')
+                     .annotate(total=Sum('amount'), count=Count('id'))
+                     .values_list('date', 'student_id', 'point_type_id', 'total', 'count'))
+        self.assertEqual(rollup, ledger)
+        self.assertEqual(rollup, {(date(2025, 1, 10), None, None, 40, 2),
+                                  (date(2025, 1, 10), None, self.homework.pk, 8, 2)})
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyPointStat.objects.create(date=date(2025, 1, 10), student=None, point_type=None, total=1, count=1)
+
+    def test_given_points_summary_reads_rollup(self):
+        GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=4,
+                                 point_type=self.homework, date=date(2025, 1, 10))
+        GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=20,
+                                 point_type=self.exam, date=date(2025, 3, 10))
+        client = APIClient()
+        client.force_authenticate(self.mentor.user)
+
+        response = client.get('/given-points/?date_from=2025-01-01&date_to=2025-12-31')
+        self.assertEqual(response.data['average_amount'], 12.0)
+        self.assertEqual(response.data['point_type_stats'], [
+            {'point_type__name': 'Exam', 'amount_avg': 20.0, 'amount_sum': 20.0, 'percentage': 100.0 * 20 / 24},
+            {'point_type__name': 'Homework', 'amount_avg': 4.0, 'amount_sum': 4.0, 'percentage': 100.0 * 4 / 24},
+        ])
+
+
+class CourseAveragePointsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.python = Course.objects.create(name='Python')
+        self.design = Course.objects.create(name='Design')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=self.python, point_limit=1000)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group)
+        self.homework = PointType.objects.create(name='Homework', max_point=10)
+        self.exam = PointType.objects.create(name='Exam', max_point=50)
+        for amount in (4, 8):
+            GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=amount,
+                                     point_type=self.homework, date=date(2025, 1, 10))
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def test_matrix_is_cached_until_ledger_changes(self):
+        response = self.client.get('/average-points/')
+        self.assertEqual(response.data, [
+            {'Python': {'Homework': 6.0, 'Exam': 0}},
+            {'Design': {'Homework': 0, 'Exam': 0}},
+        ])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/average-points/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=30,
+                                     point_type=self.exam, date=date(2025, 1, 11))
+            # Versiya qatori ball berish tranzaksiyasida yozilmaydi, faqat commit'dan keyin
+            self.assertFalse([query for query in ctx.captured_queries if 'main_resourceversion' in query['sql']])
+        self.assertTrue([query for query in ctx.captured_queries if 'main_resourceversion' in query['sql']])
+        response = self.client.get('/average-points/')
+        self.assertEqual(response.data[0], {'Python': {'Homework': 6.0, 'Exam': 30.0}})
+
+    def test_student_group_change_and_delete_invalidate_matrix(self):
+        self.client.get('/average-points/')
+        design_mentor = Mentor.objects.create(user=User.objects.create(username='designer'), course=self.design)
+        student = Student.objects.get(pk=self.student.pk)
+        student.group = Group.objects.create(name='D-1', mentor=design_mentor)
+        student.save()
+        response = self.client.get('/average-points/')
+        self.assertEqual(response.data, [
+            {'Python': {'Homework': 0, 'Exam': 0}},
+            {'Design': {'Homework': 6.0, 'Exam': 0}},
+        ])
+
+        # Ball o'zgarishi (guruh o'zgarmagan) keshni eskirtirmaydi
+        student.bio = 'Dizayner'
+        student.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/average-points/')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        student.delete()
+        response = self.client.get('/average-points/')
+        self.assertEqual(response.data[1], {'Design': {'Homework': 0, 'Exam': 0}})
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=10000)
+        self.group_a = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.group_b = Group.objects.create(name='P-2', mentor=self.mentor)
+        self.point_type = PointType.objects.create(name='Exam', max_point=100)
+        self.students = []
+        for index, (group, point) in enumerate([(self.group_a, 50), (self.group_a, 30),
+                                                 (self.group_b, 40), (self.group_b, 30)]):
+            student = Student.objects.create(user=User.objects.create(username=f'student{index}'),
+                                             group=group, point=point)
+            self.students.append(student)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[1].user)
+
+    def ranking(self, response):
+        return [(entry['rank'], entry['student'], entry['point']) for entry in response.data]
+
+    def test_top_and_ranks(self):
+        first, second, third, fourth = self.students
+        response = self.client.get('/leaderboard/?limit=3')
+        self.assertEqual(self.ranking(response), [(1, first.id, 50), (2, third.id, 40), (3, second.id, 30)])
+        self.assertEqual(response.data[0]['username'], 'student0')
+
+        response = self.client.get(f'/leaderboard/?scope=group&id={self.group_b.id}')
+        self.assertEqual(self.ranking(response), [(1, third.id, 40), (2, fourth.id, 30)])
+
+        response = self.client.get('/leaderboard/me/')
+        self.assertEqual(response.data, {'rank': 3, 'student': second.id, 'point': 30, 'total': 4})
+
+        response = self.client.get('/leaderboard/me/?scope=group')
+        self.assertEqual(response.data['rank'], 2)
+
+        response = self.client.get('/leaderboard/me/neighbours/?radius=1')
+        self.assertEqual(self.ranking(response), [(2, third.id, 40), (3, second.id, 30), (3, fourth.id, 30)])
+
+    def test_incremental_updates(self):
+        first, second, third, _ = self.students
+        leaderboard.top()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GivePoint.objects.create(mentor=self.mentor, student=second, amount=25,
+                                     point_type=self.point_type, date=date(2025, 1, 10))
+        self.assertEqual(leaderboard.rank(second.id)['rank'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/reset-points/')
+        self.assertEqual([entry['point'] for entry in leaderboard.top()], [0, 0, 0, 0])
+        self.assertEqual(leaderboard.rank(third.id)['rank'], 1)
+
+
+class GivePointLedgerTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=100)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group)
+        self.point_type = PointType.objects.create(name='Exam', max_point=100)
+
+    def balances(self):
+        self.mentor.refresh_from_db()
+        self.student.refresh_from_db()
+        return self.mentor.point_limit, self.student.point
+
+    def test_update_and_delete_apply_differences(self):
+        give_point = GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=30,
+                                              point_type=self.point_type, date=date(2025, 1, 10))
+        self.assertEqual(self.balances(), (70, 30))
+
+        give_point.amount = 50
+        give_point.save()
+        self.assertEqual(self.balances(), (50, 50))
+
+        give_point.delete()
+        self.assertEqual(self.balances(), (100, 0))
+
+    def test_point_limit_is_enforced(self):
+        with self.assertRaises(ValidationError):
+            GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=101,
+                                     point_type=self.point_type, date=date(2025, 1, 10))
+        self.assertEqual(self.balances(), (100, 0))
+        self.assertFalse(GivePoint.objects.exists())
+
+    def test_spent_points_cannot_be_taken_back_silently(self):
+        leaderboard.invalidate()
+        self.addCleanup(leaderboard.invalidate)
+        give_point = GivePoint.objects.create(mentor=self.mentor, student=self.student, amount=30,
+                                              point_type=self.point_type, date=date(2025, 1, 10))
+        # Student ballning bir qismini sarflagan (masalan, auksionda)
+        Student.objects.filter(pk=self.student.pk).update(point=10)
+        self.assertEqual(leaderboard.balance(self.student.pk), 10)
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(ValidationError):
+            give_point.delete()
+        give_point.amount = 5
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(ValidationError):
+            give_point.save()
+        # Hech narsa o'zgarmagan: limit, ball, yozuv va reyting bir-biriga mos
+        self.assertEqual(self.balances(), (70, 10))
+        self.assertEqual(GivePoint.objects.get().amount, 30)
+        self.assertEqual(leaderboard.balance(self.student.pk), 10)
+
+        client = APIClient()
+        client.force_authenticate(self.mentor.user)
+        self.assertEqual(client.delete(f'/give-points/{give_point.pk}/').status_code, 400)
+
+        give_point.amount = 25
+        with self.captureOnCommitCallbacks(execute=True):
+            give_point.save()
+        self.assertEqual(self.balances(), (75, 5))
+        self.assertEqual(leaderboard.balance(self.student.pk), 5)
+
+
+class GivePointConcurrencyTests(TransactionTestCase):
+    workers = 8
+    awards = 60
+
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentors = [
+            Mentor.objects.create(user=User.objects.create(username=f'mentor{index}'),
+                                  course=course, point_limit=1000)
+            for index in range(3)
+        ]
+        group = Group.objects.create(name='P-1', mentor=self.mentors[0])
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group)
+        self.point_type = PointType.objects.create(name='Exam', max_point=100)
+
+    def award(self, index):
+        try:
+            GivePoint.objects.create(mentor=self.mentors[index % len(self.mentors)], student=self.student,
+                                     amount=5, point_type=self.point_type, date=date(2025, 1, 10))
+        finally:
+            connections.close_all()
+
+    def test_parallel_awards_do_not_lose_updates(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self.award, range(self.awards)))
+
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.point, self.awards * 5)
+        self.assertEqual(
+            sum(Mentor.objects.values_list('point_limit', flat=True)),
+            3 * 1000 - self.awards * 5,
+        )
+        self.assertEqual(DailyPointStat.objects.get().total, self.awards * 5)
+
+    def test_award_during_rollup_rebuild_is_not_lost(self):
+        self.award(0)
+        collect_totals = RebuildPointRollup.collect_totals
+
+        def collect_then_award(command, chunk_size):
+            totals = collect_totals(command, chunk_size)
+            # Yig'indi o'qilgandan keyin, qayta yozishdan oldin ball beriladi
+            pending.append(executor.submit(self.award, 1))
+            wait(pending, timeout=0.5)
+            return totals
+
+        pending = []
+        with ThreadPoolExecutor(max_workers=1) as executor, \
+                mock.patch.object(RebuildPointRollup, 'collect_totals', collect_then_award):
+            call_command('rebuild_point_rollup', stdout=StringIO())
+            pending[0].result()
+
+        self.assertEqual(DailyPointStat.objects.get().total, 10)
+        self.assertEqual(DailyPointStat.objects.get().count, 2)
+
+
+class BulkGivePointTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=1000)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.students = [
+            Student.objects.create(user=User.objects.create(username=f'student{index}'), group=self.group)
+            for index in range(30)
+        ]
+        self.point_type = PointType.objects.create(name='Homework', max_point=10)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def payload(self, **extra):
+        payload = {'mentor': self.mentor.id, 'point_type': self.point_type.id, 'amount': 10, 'date': '2025-01-10'}
+        payload.update(extra)
+        return payload
+
+    def test_group_award_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/give-points/bulk/', self.payload(group=self.group.id), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 30)
+        self.assertLessEqual(len(ctx.captured_queries), 15)
+
+        self.mentor.refresh_from_db()
+        self.assertEqual(self.mentor.point_limit, 700)
+        self.assertEqual(set(Student.objects.values_list('point', flat=True)), {10})
+        self.assertEqual(DailyPointStat.objects.filter(total=10, count=1).count(), 30)
+
+    def test_batch_is_rejected_when_limit_is_too_small(self):
+        self.mentor.point_limit = 299
+        self.mentor.save()
+
+        response = self.client.post('/give-points/bulk/', self.payload(group=self.group.id), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GivePoint.objects.exists())
+        self.assertEqual(set(Student.objects.values_list('point', flat=True)), {0})
+
+    def test_only_mentors_charge_their_own_limit(self):
+        other = Mentor.objects.create(user=User.objects.create(username='other'),
+                                      course=self.mentor.course, point_limit=1000)
+        self.client.force_authenticate(self.students[0].user)
+        response = self.client.post('/give-points/bulk/', self.payload(group=self.group.id), format='json')
+        self.assertEqual(response.status_code, 403)
+
+        # Payload dagi boshqa mentor e'tiborga olinmaydi - chaqiruvchi mentor limitidan
+        self.client.force_authenticate(self.mentor.user)
+        response = self.client.post('/give-points/bulk/', self.payload(mentor=other.id, students=[self.students[0].id]),
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data[0]['mentor'], self.mentor.id)
+        other.refresh_from_db()
+        self.mentor.refresh_from_db()
+        self.assertEqual((other.point_limit, self.mentor.point_limit), (1000, 990))
+
+        admin = User.objects.create(username='admin', is_superuser=True)
+        self.client.force_authenticate(admin)
+        response = self.client.post('/give-points/bulk/', self.payload(mentor=other.id, students=[self.students[1].id]),
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        other.refresh_from_db()
+        self.assertEqual(other.point_limit, 990)
+
+    def test_student_list_and_max_point(self):
+        ids = [student.id for student in self.students[:3]]
+        response = self.client.post('/give-points/bulk/', self.payload(students=ids + ids[:1], amount=4),
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(GivePoint.objects.count(), 3)
+
+        response = self.client.post('/give-points/bulk/', self.payload(students=ids, amount=11), format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=1000)
+        group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=group)
+        other = Student.objects.create(user=User.objects.create(username='other'), group=group)
+        point_type = PointType.objects.create(name='Homework', max_point=10)
+        GivePoint.objects.bulk_award(self.mentor, point_type, 1, date(2025, 1, 10), [other.id])
+        for _ in range(12):
+            GivePoint.objects.bulk_award(self.mentor, point_type, 1, date(2025, 1, 10), [self.student.id])
+        self.expected = list(
+            GivePoint.objects.filter(student=self.student).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def ids(self, response):
+        return [item['id'] for item in response.data['results']]
+
+    def test_walks_forward_and_back_with_filters(self):
+        url = f'/give-points/?cursor=&limit=5&student={self.student.id}'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(self.ids(response))
+            url = response.data['next']
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        response = self.client.get(f'/give-points/?cursor=&limit=5&student={self.student.id}')
+        response = self.client.get(response.data['next'])
+        self.assertIn(f'student={self.student.id}', response.data['previous'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), self.expected[:5])
+        self.assertIsNone(response.data['previous'])
+
+    def test_rows_inserted_while_walking_are_not_repeated_or_skipped(self):
+        url = f'/give-points/?cursor=&limit=5&student={self.student.id}'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen += self.ids(response)
+            url = response.data['next']
+            # Sahifalar orasida yangi yozuvlar qo'shiladi (ro'yxat boshiga tushadi)
+            GivePoint.objects.bulk_award(self.mentor, PointType.objects.get(), 1, date(2025, 1, 11),
+                                         [self.student.id])
+        self.assertEqual(seen, self.expected)
+
+    def test_summary_view_is_not_paginated(self):
+        response = self.client.get('/given-points/?limit=5&offset=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('average_amount', response.data)
+        self.assertNotIn('results', response.data)
+
+    def test_cursor_mode_is_the_default(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/give-points/?limit=5&student={self.student.id}')
+        self.assertNotIn('count', response.data)
+        self.assertEqual(self.ids(response), self.expected[:5])
+        self.assertIn('cursor=', response.data['next'])
+        self.assertFalse([query for query in ctx.captured_queries if 'COUNT(' in query['sql']])
+        self.assertEqual(self.ids(self.client.get(response.data['next'])), self.expected[5:10])
+
+    def test_count_is_optional_and_offset_mode_still_works(self):
+        response = self.client.get(f'/give-points/?count=true&student={self.student.id}')
+        self.assertEqual(response.data['count'], 12)
+
+        response = self.client.get('/give-points/?limit=5&offset=5')
+        self.assertEqual(response.data['count'], 13)
+
+        response = self.client.get('/give-points/?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get('/give-points/?cursor=&limit=2')
+        url = response.data['next']
+        for _ in range(4):
+            url = self.client.get(url).data['next']
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(url)
+        self.assertEqual(len(first.captured_queries), len(deep.captured_queries))
+
+
+class ExplainHotQueriesTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        # To'liq skaner bo'lsa CommandError ko'tariladi
+        out = StringIO()
+        call_command('explain_hot_queries', students=60, points_per_student=10, stdout=out)
+        self.assertIn("Barcha so'rovlar indeks ishlatadi.", out.getvalue())
+        self.assertFalse(Course.objects.exists())
+
+
+class NewsReadStateTests(TestCase):
+    def setUp(self):
+        readstate.clear_cache()
+        self.user = User.objects.create(username='student')
+        self.news = [New.objects.create(title=f'News {index}', description='-') for index in range(6)]
+        # id lar orasida bo'shliq bo'lishi uchun
+        self.news.pop(3).delete()
+        self.ids = [item.id for item in self.news]
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def state(self):
+        return NewsReadState.objects.get(user=self.user)
+
+    def test_watermark_moves_over_contiguous_reads_and_gaps(self):
+        for news_id in (self.ids[1], self.ids[2]):
+            response = self.client.post(f'/news/{news_id}/mark-as-read/')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state().read_up_to, 0)
+        self.assertEqual(response.data['num_unread_news'], 3)
+
+        self.client.post(f'/news/{self.ids[0]}/mark-as-read/')
+        self.client.post(f'/news/{self.ids[3]}/mark-as-read/')
+        state = self.state()
+        self.assertEqual(state.read_up_to, self.ids[3])
+        self.assertEqual(state.read_after, b'')
+
+    def test_read_status_response_shapes(self):
+        self.client.post(f'/news/{self.ids[0]}/mark-as-read/')
+        self.client.post(f'/news/{self.ids[2]}/mark-as-read/')
+
+        response = self.client.get('/news/get-read-status/')
+        self.assertEqual(response.data['num_unread_news'], 3)
+        self.assertEqual(response.data['unread_news_ids'], [self.ids[1], self.ids[3], self.ids[4]])
+        self.assertEqual([item['news'] for item in response.data['read_news_ids']], [self.ids[0], self.ids[2]])
+
+        response = self.client.get('/news/get-read-status/?compact=true')
+        self.assertEqual(response.data, {
+            'num_unread_news': 3,
+            'unread_news_ids': [self.ids[1], self.ids[3], self.ids[4]],
+            'read_up_to': self.ids[0],
+        })
+
+    def test_mark_as_read_is_one_write_and_unknown_news_is_404(self):
+        self.client.post(f'/news/{self.ids[0]}/mark-as-read/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(f'/news/{self.ids[1]}/mark-as-read/')
+        writes = [query for query in ctx.captured_queries if query['sql'].startswith(('UPDATE', 'INSERT'))]
+        self.assertEqual(len(writes), 1)
+
+        response = self.client.post('/news/999999/mark-as-read/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_mark_as_read_is_idempotent(self):
+        payload = {'ids': [self.ids[0], self.ids[2], self.ids[2], 999999]}
+        response = self.client.post('/news/mark-as-read/', payload, format='json')
+        self.assertEqual(response.data, {'num_unread_news': 3})
+        response = self.client.post('/news/mark-as-read/', payload, format='json')
+        self.assertEqual(response.data, {'num_unread_news': 3})
+
+        state = self.state()
+        self.assertEqual(state.read_up_to, self.ids[0])
+        self.assertTrue(state.is_read(self.ids[2]))
+
+        response = self.client.post('/news/mark-as-read/', {'ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_mark_all_read(self):
+        New.objects.filter(id__in=self.ids[3:]).update(created_at=datetime(2030, 1, 1, tzinfo=dt_timezone.utc))
+        response = self.client.post('/news/mark-all-read/', {'until': '2029-01-01T00:00:00Z'}, format='json')
+        self.assertEqual(response.data, {'num_unread_news': 2})
+        self.assertEqual(self.state().read_up_to, self.ids[2])
+
+        response = self.client.post('/news/mark-all-read/', {}, format='json')
+        self.assertEqual(response.data, {'num_unread_news': 0})
+        self.assertEqual(self.state().read_up_to, self.ids[-1])
+
+    def test_mark_all_read_without_changes_does_not_write(self):
+        self.client.post('/news/mark-all-read/', {}, format='json')
+        for payload in ({}, {'until': '2029-01-01T00:00:00Z'}):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/news/mark-all-read/', payload, format='json')
+            self.assertEqual(response.data, {'num_unread_news': 0})
+            writes = [query for query in ctx.captured_queries if query['sql'].startswith(('UPDATE', 'INSERT'))]
+            self.assertEqual(writes, [])
+
+        # Hech narsa o'qilmagan foydalanuvchi uchun ham bo'sh qator yaratilmaydi
+        NewsReadState.objects.all().delete()
+        response = self.client.post('/news/mark-all-read/', {'until': '2000-01-01T00:00:00Z'}, format='json')
+        self.assertEqual(response.data, {'num_unread_news': 5})
+        self.assertFalse(NewsReadState.objects.exists())
+
+    def test_mark_as_read_keeps_read_status_shape(self):
+        response = self.client.post(f'/news/{self.ids[1]}/mark-as-read/')
+        self.assertEqual(response.data, {'id': self.ids[1], 'user': self.user.id, 'news': self.ids[1],
+                                         'is_read': True, 'num_unread_news': 4})
+        item = self.client.get('/news/get-read-status/').data['read_news_ids'][0]
+        self.assertEqual(item, {'id': self.ids[1], 'user': self.user.id, 'news': self.ids[1], 'is_read': True})
+
+
+class ListQueryCountTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=100000)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.point_type = PointType.objects.create(name='Homework', max_point=10)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def add_rows(self, count):
+        start = Student.objects.count()
+        for index in range(start, start + count):
+            student = Student.objects.create(user=User.objects.create(username=f'student{index}'), group=self.group)
+            Mentor.objects.create(user=User.objects.create(username=f'mentor{index}'), course=self.mentor.course)
+            GivePoint.objects.bulk_award(self.mentor, self.point_type, 1, date(2025, 1, 10), [student.id])
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_counts_are_constant(self):
+        urls = ['/students/', '/mentors/', '/give-points/?limit=100', '/student-points/?limit=100']
+        self.add_rows(2)
+        small = [self.query_count(url) for url in urls]
+        self.add_rows(10)
+        large = [self.query_count(url) for url in urls]
+        self.assertEqual(small, large)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor', first_name='Ali'),
+                                            course=course, point_limit=100000)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.point_type = PointType.objects.create(name='Homework', max_point=10)
+        self.student = Student.objects.create(user=User.objects.create(username='student', first_name='Vali'),
+                                              group=self.group, bio='Uzun bio')
+        GivePoint.objects.bulk_award(self.mentor, self.point_type, 3, date(2025, 1, 10), [self.student.id])
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def test_fields_trim_output_and_selected_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/students/?fields=id,point,user.first_name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'id': self.student.id, 'point': 3, 'user': {'first_name': 'Vali'}}])
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"main_student"."point"', sql)
+        self.assertNotIn('"main_student"."bio"', sql)
+        self.assertNotIn('"auth_user"."username"', sql)
+
+    def test_expand_nests_related_object(self):
+        response = self.client.get('/give-points/?expand=point_type&fields=id,amount,point_type.name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['point_type'], {'name': 'Homework'})
+
+        response = self.client.get('/give-points/')
+        self.assertEqual(response.data['results'][0]['point_type'], self.point_type.id)
+
+    def test_student_points_keeps_stats_with_sparse_fields(self):
+        response = self.client.get('/student-points/?fields=user.first_name')
+        self.assertEqual(response.status_code, 200)
+        item = response.data['results'][0]
+        self.assertEqual(item['user'], {'first_name': 'Vali'})
+        self.assertEqual((item['current_point'], item['total_points']), (3, 3))
+
+    def test_fields_are_ignored_on_write(self):
+        response = self.client.post('/give-points/?fields=id', {
+            'mentor': self.mentor.id, 'student': self.student.id, 'point_type': self.point_type.id,
+            'amount': 2, 'date': '2025-01-11',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('amount', response.data)
+
+
+class FastJSONRendererTests(TestCase):
+    data = {
+        'decimal': Decimal('1.50'), 'lazy': gettext_lazy('Salom'), 'date': date(2025, 1, 2),
+        'datetime': datetime(2025, 1, 2, 3, 4, 5, 600, tzinfo=dt_timezone.utc), 'uuid': uuid.UUID(int=1),
+        'text': 'Yangilik\u2028matn', 'nested': [{'id': 1, 'items': (1, 2)}], 'big': 2 ** 70, 7: 'int key',
+    }
+
+    def test_matches_drf_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), expected)
+
+    def test_indent_uses_drf_renderer(self):
+        content = renderers.FastJSONRenderer().render({'id': 1}, 'application/json; indent=4')
+        self.assertEqual(content, b'{\n    "id": 1\n}')
+
+    def test_parser(self):
+        parser = renderers.FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO('{"name": "Ali", "ids": [1, 2]}'.encode())),
+                         {'name': 'Ali', 'ids': [1, 2]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"amount": NaN}'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Python')
+        New.objects.create(title='Yangilik', description='Matn')
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def test_unchanged_news_is_not_modified_without_list_queries(self):
+        response = self.client.get('/news/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/news/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('main_new', ctx.captured_queries[0]['sql'])
+
+        self.assertEqual(self.client.get('/news/?limit=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        New.objects.create(title='Yana', description='Matn')
+        self.assertEqual(self.client.get('/news/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_reference_data_changes_invalidate_etag(self):
+        response = self.client.get('/courses/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get('/point-types/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get('/courses/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.course.name = 'Django'
+        self.course.save()
+        response = self.client.get('/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'Django')
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        reference_cache.clear()
+        course = Course.objects.create(name='Python')
+        self.mentor = Mentor.objects.create(user=User.objects.create(username='mentor'),
+                                            course=course, point_limit=100)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        self.student = Student.objects.create(user=User.objects.create(username='student'), group=self.group)
+        self.point_type = PointType.objects.create(name='Homework', max_point=10)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def post(self, amount):
+        return self.client.post('/give-points/', {
+            'mentor': self.mentor.id, 'student': self.student.id, 'point_type': self.point_type.id,
+            'amount': amount, 'date': '2025-01-10',
+        }, format='json')
+
+    def test_give_point_validation_uses_cache(self):
+        self.assertEqual(self.post(1).status_code, 201)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.post(2).status_code, 201)
+        selects = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('SELECT')]
+        for table in ('main_mentor', 'main_pointtype', 'main_group', 'main_course'):
+            self.assertFalse(any(f'FROM "{table}"' in sql for sql in selects), table)
+
+        response = self.post(11)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('max point of 10', str(response.data))
+
+    def test_changes_are_seen_on_next_request(self):
+        self.assertEqual(self.post(10).status_code, 201)
+        self.point_type.max_point = 5
+        self.point_type.save()
+        self.assertEqual(self.post(10).status_code, 400)
+
+        self.assertEqual(self.client.post('/give-points/', {
+            'mentor': self.mentor.id, 'student': self.student.id, 'point_type': 999,
+            'amount': 1, 'date': '2025-01-10',
+        }, format='json').status_code, 400)
+
+    def test_refunded_limit_is_usable_immediately(self):
+        # Mentor limiti keshlanadi, lekin undan tekshiruvda foydalanilmaydi
+        self.mentor.point_limit = 10
+        self.mentor.save()
+        self.assertEqual(self.post(10).status_code, 201)
+        # Yangi worker: kesh limit 0 bo'lgandan keyin yuklanadi
+        reference_cache.clear()
+        self.assertEqual(self.post(5).status_code, 400)
+
+        self.assertEqual(self.client.delete(f'/give-points/{GivePoint.objects.get().pk}/').status_code, 204)
+        self.assertEqual(self.post(5).status_code, 201)
+        self.mentor.refresh_from_db()
+        self.assertEqual(self.mentor.point_limit, 5)
+
+    def test_str_uses_cached_related_objects(self):
+        give_point = GivePoint.objects.bulk_award(self.mentor, self.point_type, 1, date(2025, 1, 10),
+                                                  [self.student.id])[0]
+        give_point = GivePoint.objects.select_related('student__user').get(pk=give_point.pk)
+        reference_cache.related(give_point, 'point_type')  # keshni yuklash
+        with self.assertNumQueries(0):
+            self.assertEqual(str(give_point), '  (P-1) 1 Homework')
+
+
+class RoleClaimsTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Python')
+        mentor_user = User.objects.create_user(username='mentor', password='parol-123')
+        self.mentor = Mentor.objects.create(user=mentor_user, course=course)
+        self.group = Group.objects.create(name='P-1', mentor=self.mentor)
+        student_user = User.objects.create_user(username='student', password='parol-123')
+        self.student = Student.objects.create(user=student_user, group=self.group)
+        # Rollar yaratilgan soniyada berilgan tokenlar claim'lari eskirgan hisoblanardi
+        RevokedToken.objects.all().delete()
+        revoked_tokens.clear()
+        self.client = APIClient()
+
+    def login(self, username):
+        response = self.client.post('/token/', {'username': username, 'password': 'parol-123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return AccessToken(response.data['access'])
+
+    def test_token_contains_role_claims(self):
+        token = self.login('student')
+        self.assertEqual((token['role'], token['mentor_id'], token['student_id'], token['group_id']),
+                         ('student', None, self.student.id, self.group.id))
+        token = self.login('mentor')
+        self.assertEqual((token['role'], token['mentor_id'], token['student_id']), ('mentor', self.mentor.id, None))
+
+    def test_role_checks_do_not_query(self):
+        self.login('mentor')
+        self.client.get('/news/')  # bekor qilingan tokenlar ro'yxatini yuklash
+        # JWT foydalanuvchisi + mentor obyekti
+        with self.assertNumQueries(2):
+            response = self.client.get('/mentors/get-me/')
+        self.assertEqual(response.data['id'], self.mentor.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/users/get-me/').data['role'], 'mentor')
+        self.assertEqual(self.client.get('/students/get-me/').status_code, 403)
+
+        self.login('student')
+        # Bazasiz autentifikatsiya + rol claim'idan: student uchun bo'sh queryset
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/student-points/').data['total_items'], 0)
+
+    def test_tokens_without_claims_fall_back_to_database(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student.user)}')
+        response = self.client.get('/users/get-me/')
+        self.assertEqual(response.data['role'], 'student')
+
+    def login_pair(self, username):
+        tokens = self.client.post('/token/', {'username': username, 'password': 'parol-123'}, format='json').data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return tokens
+
+    def refresh(self, tokens):
+        response = self.client.post('/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return AccessToken(response.data['access'])
+
+    def test_promotion_is_seen_without_new_login(self):
+        User.objects.create_user(username='new', password='parol-123')
+        tokens = self.login_pair('new')
+        self.assertEqual(self.client.get('/users/get-me/').data['role'], 'unknown')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student = Student.objects.create(user=User.objects.get(username='new'), group=self.group)
+        # Eski token claim'i (role=unknown) e'tiborga olinmaydi
+        self.assertEqual(self.client.get('/users/get-me/').data['role'], 'student')
+        self.assertEqual(self.client.get('/students/get-me/').status_code, 200)
+
+        token = self.refresh(tokens)
+        self.assertEqual((token['role'], token['student_id']), ('student', student.id))
+        self.assertEqual(self.client.get('/students/get-me/').data['id'], student.id)
+
+    def test_demotion_removes_access(self):
+        tokens = self.login_pair('mentor')
+        self.assertEqual(self.client.get('/mentors/get-me/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.delete()
+        self.assertEqual(self.client.get('/mentors/get-me/').status_code, 403)
+        self.assertEqual(self.client.get('/users/get-me/').data['role'], 'unknown')
+        self.assertEqual(self.refresh(tokens)['role'], 'unknown')
+
+    def test_staff_flag_change_is_seen(self):
+        self.login_pair('mentor')
+        user = User.objects.get(username='mentor')
+        user.is_superuser = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertTrue(RevokedToken.objects.filter(user=user, claims_only=True).exists())
+        # Token bekor qilinmaydi, lekin User (is_superuser) bazadan olinadi
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/news/').status_code, 200)
+        self.assertTrue(any('"auth_user"' in query['sql'] for query in ctx.captured_queries))
+
+
+class StatelessAuthenticationTests(TestCase):
+    def setUp(self):
+        revoked_tokens.clear()
+        course = Course.objects.create(name='Python')
+        self.user = User.objects.create_user(username='mentor', password='parol-123')
+        self.mentor = Mentor.objects.create(user=self.user, course=course)
+        RevokedToken.objects.all().delete()
+        revoked_tokens.clear()
+        New.objects.create(title='Yangilik', description='Matn')
+        self.client = APIClient()
+
+    def login(self, seconds_ago=0):
+        # Bekor qilish chegarasi butun soniya: undan oldingi soniyada berilgan token
+        issued_at = datetime.now(dt_timezone.utc) - timedelta(seconds=seconds_ago)
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=issued_at):
+            tokens = self.client.post('/token/', {'username': 'mentor', 'password': 'parol-123'},
+                                      format='json').data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return tokens
+
+    def test_safe_methods_skip_user_query(self):
+        self.login()
+        self.client.get('/news/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/news/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"auth_user"' in query['sql'] for query in ctx.captured_queries))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/users/get-me/').data['username'], 'mentor')
+        self.assertTrue(any('"auth_user"' in query['sql'] for query in ctx.captured_queries))
+
+    def test_revoke_current_and_refresh_token(self):
+        tokens = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/token/revoke/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/news/').status_code, 401)
+        self.assertEqual(self.client.post('/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+    def test_revoke_all_and_deactivation(self):
+        first = self.login(seconds_ago=5)
+        second = self.login(seconds_ago=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/token/revoke/', {'all': True}, format='json').status_code, 204)
+        for tokens in (first, second):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+            self.assertEqual(self.client.get('/news/').status_code, 401)
+
+        RevokedToken.objects.all().delete()
+        revoked_tokens.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {first['access']}")
+        self.assertEqual(self.client.get('/news/').status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/news/').status_code, 401)
+
+    def test_revocation_cutoff_is_whole_seconds(self):
+        revoked_at = datetime(2026, 1, 1, 12, 0, 0, 750000, tzinfo=dt_timezone.utc)
+        RevokedToken.objects.create(user=self.user, revoked_at=revoked_at,
+                                    expires_at=datetime.now(dt_timezone.utc) + timedelta(days=1))
+        revoked_tokens.clear()
+        token = AccessToken.for_user(self.user)
+        # Bekor qilingan soniyada (iat butun) qayta kirgan - token yaroqli
+        token['iat'] = int(revoked_at.timestamp())
+        self.assertFalse(revoked_tokens.is_revoked(token))
+        token['iat'] -= 1
+        self.assertTrue(revoked_tokens.is_revoked(token))
+
+    def test_deleted_user_tokens_are_revoked(self):
+        tokens = self.login()
+        self.assertEqual(self.client.get('/news/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        # Token bazasiz (TokenUser) tekshiriladi, lekin bekor qilingan
+        self.assertEqual(self.client.get('/news/').status_code, 401)
+        self.assertEqual(self.client.post('/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+
+def make_image(width, height, fmt='JPEG'):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.effect_noise((width, height), 64).convert('RGB').save(buffer, fmt, quality=95)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def test_variants_are_generated_on_upload_and_exposed(self):
+        original = make_image(2000, 1500)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = New.objects.create(title='Yangilik', description='Matn',
+                                     image=SimpleUploadedFile('photo.jpg', original))
+        new.refresh_from_db()
+        self.assertEqual(new.image_variants['source'], new.image.name)
+        self.assertEqual((new.image_variants['width'], new.image_variants['height']), (2000, 1500))
+        self.assertEqual(sorted(new.image_variants['webp'], key=int), ['160', '480', '960'])
+        smallest = new.image_variants['webp']['160']
+        self.assertLess(default_storage.size(smallest) * 10, len(original))
+
+        item = self.client.get('/news/').data[0]
+        self.assertEqual(item['image_variants']['webp']['160'], f'http://testserver/media/{smallest}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new.image = None
+            new.save()
+        self.assertEqual(New.objects.get(pk=new.pk).image_variants, {})
+        self.assertFalse(default_storage.exists(smallest))
+
+    def test_generated_variants_change_etag(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            New.objects.create(title='Yangilik', description='Matn',
+                               image=SimpleUploadedFile('photo.jpg', make_image(600, 400)))
+        response = self.client.get('/news/')
+        self.assertIsNone(response.data[0]['image_variants'])
+        etag = response['ETag']
+
+        for callback in callbacks:
+            callback()
+        response = self.client.get('/news/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('160', response.data[0]['image_variants']['webp'])
+
+    def test_product_variants_refresh_current_auction_snapshot(self):
+        from auction.models import Auction, Product
+        from auction.snapshot import current_auction
+
+        current_auction.clear()
+        self.addCleanup(current_auction.clear)
+        name = default_storage.save('products/p.png', SimpleUploadedFile('p.png', make_image(300, 200, 'PNG')))
+        auction = Auction.objects.create(description='Auction', date=date.today(), time='10:00')
+        product = Product.objects.create(name='Kitob', start_point=10, auction=auction)
+        Product.objects.filter(pk=product.pk).update(image=name)
+        response = self.client.get('/current-auction/products/')
+        etag = response['ETag']
+
+        call_command('generate_image_variants', '--model', 'product', stdout=StringIO())
+        response = self.client.get('/current-auction/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('160', str(response.data))
+
+    def test_backfill_command(self):
+        from auction.models import Auction, Product
+
+        name = default_storage.save('products/small.png', SimpleUploadedFile('small.png', make_image(120, 80, 'PNG')))
+        auction = Auction.objects.create(description='Auction', date=date(2025, 1, 1), time='10:00')
+        product = Product.objects.create(name='Kitob', start_point=10, auction=auction)
+        Product.objects.filter(pk=product.pk).update(image=name)
+
+        out = StringIO()
+        call_command('generate_image_variants', '--model', 'product', stdout=out)
+        self.assertIn('product: 1 ta', out.getvalue())
+        product.refresh_from_db()
+        # Asl rasmdan katta variant yaratilmaydi
+        self.assertEqual(list(product.image_variants['jpeg']), ['120'])
+        self.assertRegex(product.image_variants['jpeg']['120'],
+                         r'^products/variants/small_[0-9a-f]{12}_png_120w\.[0-9a-f]{12}\.jpg$')
+
+        out = StringIO()
+        call_command('generate_image_variants', '--model', 'product', stdout=out)
+        self.assertIn('product: 0 ta', out.getvalue())
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.content = bytes(range(256)) * 4
+        self.name = default_storage.save('news/photo.jpg', SimpleUploadedFile('photo.jpg', self.content))
+
+    def test_hashed_names(self):
+        self.assertRegex(self.name, r'^news/photo\.[0-9a-f]{12}\.jpg$')
+        # Bir xil mazmun - bitta fayl, boshqa mazmun - boshqa nom
+        self.assertEqual(default_storage.save('news/photo.jpg', SimpleUploadedFile('photo.jpg', self.content)),
+                         self.name)
+        self.assertNotEqual(default_storage.save('news/photo.jpg', SimpleUploadedFile('photo.jpg', b'boshqa')),
+                            self.name)
+
+    def test_full_and_conditional_response(self):
+        response = self.client.get(f'/media/{self.name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        response = self.client.get(f'/media/{self.name}', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # Xeshsiz nomlar har safar tekshiriladi
+        with open(f'{self.media_root}/legacy.txt', 'wb') as file:
+            file.write(b'eski fayl')
+        response = self.client.get('/media/legacy.txt')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_requests(self):
+        url = f'/media/{self.name}'
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+        # If-Range boshqa versiyaga tegishli - butun fayl
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"eskisi"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_offload_to_proxy(self):
+        with override_settings(MEDIA_OFFLOAD_HEADER='X-Accel-Redirect'):
+            response = self.client.get(f'/media/{self.name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_missing_and_unsafe_paths(self):
+        self.assertEqual(self.client.get('/media/news/yoq.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/news').status_code, 404)
+        self.assertEqual(self.client.get('/media/../core/settings.py').status_code, 404)
+        self.assertEqual(self.client.post(f'/media/{self.name}').status_code, 405)
+
+
+class SchemaDocsTests(TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.schema_dir, ignore_errors=True)
+        override = override_settings(SWAGGER_SCHEMA_FILE=f'{self.schema_dir}/openapi.json')
+        override.enable()
+        self.addCleanup(override.disable)
+        docs.schema_store.clear()
+        self.addCleanup(docs.schema_store.clear)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def test_schema_is_generated_once_and_served_with_etag(self):
+        with mock.patch.object(docs, 'generate_schema', wraps=docs.generate_schema) as generate:
+            response = self.client.get('/docs/?format=openapi')
+            self.assertEqual(response.status_code, 200)
+            schema = response.json()
+            self.client.get('/docs/?format=openapi')
+        self.assertEqual(generate.call_count, 1)
+
+        # Kechiktirilgan swagger_auto_schema lar qo'llangan
+        parameters = [parameter['name'] for parameter in schema['paths']['/given-points/']['get']['parameters']]
+        self.assertIn('date_from', parameters)
+        self.assertEqual(schema['paths']['/give-points/bulk/']['post']['responses']['201']['schema']['type'], 'array')
+
+        response = self.client.get('/docs/?format=openapi', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertContains(self.client.get('/docs/'), 'swagger-ui')
+        self.assertEqual(APIClient().get('/docs/?format=openapi').status_code, 401)
+
+    def test_command_writes_schema_file(self):
+        out = StringIO()
+        call_command('generate_schema', stdout=out)
+        self.assertIn('Sxema yozildi', out.getvalue())
+        with mock.patch.object(docs, 'generate_schema') as generate:
+            response = self.client.get('/docs/?format=openapi')
+        generate.assert_not_called()
+        with open(f'{self.schema_dir}/openapi.json', 'rb') as file:
+            self.assertEqual(response.content, file.read())
+
+    def test_views_do_not_import_drf_yasg(self):
+        code = ("import django, sys; django.setup(); import core.urls; "
+                "print(sorted(name for name in sys.modules if name.startswith('drf_yasg.')))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'core.settings'})
+        self.assertEqual(result.stdout.strip(), '[]')
@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ResourceVersion
+
+POINT_STATS = 'point-stats'
+NEWS = 'news'
+# Course, PointType, Group, Mentor (ma'lumotnoma jadvallari)
+REFERENCE = 'reference'
+# Auction, Product
+AUCTION = 'auction'
+# Faqat mahsulot qoldig'i (SoldProduct): snapshot qayta qurilmaydi, amount yangilanadi
+AUCTION_STOCK = 'auction-stock'
+REVOKED_TOKENS = 'revoked-tokens'
+
+
+def get_version(name):
+    """`name` resursining joriy versiyasi (hali bo'lmasa 0)."""
+    version = ResourceVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_stamp(*names):
+    """
+    Bir nechta resurs uchun bitta so'rov bilan (versiyalar, oxirgi o'zgarish vaqti).
+    Versiyalar `names` tartibida, hali yaratilmagan resurslar uchun 0.
+    """
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in
+        ResourceVersion.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    }
+    stamps = [rows.get(name, (0, None)) for name in names]
+    modified = [updated_at for _, updated_at in stamps if updated_at is not None]
+    return tuple(version for version, _ in stamps), max(modified, default=None)
+
+
+def bump(*names):
+    """Resurslar versiyasini bittaga oshiradi, ular bilan bog'liq keshlar eskiradi."""
+    now = timezone.now()
+    for name in names:
+        if ResourceVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                ResourceVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            ResourceVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+
+def bump_on_commit(*names):
+    """
+    Versiyalarni tranzaksiya commit bo'lgandan keyin oshiradi (tranzaksiyadan
+    tashqarida darhol). Tez-tez yoziladigan jadvallar uchun: ResourceVersion
+    qatori shu tranzaksiya davomida qulflanib turmaydi.
+    """
+    transaction.on_commit(partial(bump, *names))
@@ -1,25 +1,30 @@
 from datetime import datetime
 from tokenize import group
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework import generics, permissions
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, F
-from django.db.models.functions import Coalesce
-
-from django.db.models import Avg, FloatField
+from django.db import transaction
 
 from .serializers import *
 from .permissions import *
 from .models import *
+from . import readstate
+from .leaderboard import leaderboard, GLOBAL
+from . import versions
+from .conditional import ConditionalGetMixin
+from .docs import openapi, swagger_auto_schema, Many
+from .optimizer import OptimizedQuerysetMixin
+from .roles import get_role
+from .pagination import KeysetPagination
+from .stats import student_point_stats, given_point_summary, course_point_type_averages
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Avg
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.pagination import LimitOffsetPagination
 
@@ -44,14 +49,16 @@ class UserDetailView(generics.RetrieveAPIView):
         return self.request.user
 
 
-class CourseListCreateView(generics.ListCreateAPIView):
+class CourseListCreateView(ConditionalGetMixin, OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    etag_resources = (versions.REFERENCE,)
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
     filterset_fields = ['name']
     ordering_fields = ['id', 'name']
     search_fields = ['name']
+    stateless_authentication = True
 
 
 class CourseRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -60,14 +67,16 @@ class CourseRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
 
-class GroupListCreateView(generics.ListCreateAPIView):
+class GroupListCreateView(ConditionalGetMixin, OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    etag_resources = (versions.REFERENCE,)
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
     filterset_fields = ['name', 'mentor', 'active', 'created_at']
     ordering_fields = ['id', 'name', 'created_at']
     search_fields = ['name']
+    stateless_authentication = True
 
 
 class GroupRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -76,7 +85,7 @@ class GroupRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
 
-class MentorListCreateView(generics.ListCreateAPIView):
+class MentorListCreateView(OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Mentor.objects.all()
     serializer_class = MentorSerializer
     permission_classes = [IsAuthenticated]
@@ -94,10 +103,11 @@ class MentorDetailView(generics.RetrieveAPIView):
     permission_classes = [IsMentor]
 
     def get_object(self):
-        return get_object_or_404(Mentor, user=self.request.user)
+        return get_object_or_404(Mentor.objects.select_related('user'), pk=get_role(self.request).mentor_id,
+                                 user_id=self.request.user.pk)
 
 
-class StudentListCreateView(generics.ListCreateAPIView):
+class StudentListCreateView(OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]
@@ -147,7 +157,8 @@ class StudentDetailView(generics.RetrieveAPIView):
     permission_classes = [IsStudent]
 
     def get_object(self):
-        return get_object_or_404(Student, user=self.request.user)
+        return get_object_or_404(Student.objects.select_related('user'), pk=get_role(self.request).student_id,
+                                 user_id=self.request.user.pk)
 
 
 class StudentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -162,14 +173,16 @@ class StudentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         return StudentSerializer
 
 
-class PointTypeListCreateView(generics.ListCreateAPIView):
+class PointTypeListCreateView(ConditionalGetMixin, OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = PointType.objects.all()
     serializer_class = PointTypeSerializer
+    etag_resources = (versions.REFERENCE,)
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
     filterset_fields = ['name', 'max_point']
     ordering_fields = ['id', 'name', 'max_point']
     search_fields = ['name']
+    stateless_authentication = True
 
 
 class PointTypeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -178,7 +191,7 @@ class PointTypeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
 
-class GivePointListCreateView(generics.ListCreateAPIView):
+class GivePointListCreateView(OptimizedQuerysetMixin, generics.ListCreateAPIView):
     queryset = GivePoint.objects.all()
     serializer_class = GivePointSerializer
     permission_classes = [IsAuthenticated]
@@ -187,13 +200,15 @@ class GivePointListCreateView(generics.ListCreateAPIView):
     ordering_fields = ['id', 'amount','-amount', 'date','-date', 'created_at', 'student__point']
     ordering=['-created_at']
     search_fields = ['description']
-    pagination_class=CustomLimitOffsetPagination
+    pagination_class=KeysetPagination
 
 
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('limit', openapi.IN_QUERY, description="How many results to return", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('offset', openapi.IN_QUERY, description="The initial index to start returning results from", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Kursor: birinchi sahifa uchun berilmaydi, keyingilari uchun 'next'/'previous' havolasidagi qiymat", type=openapi.TYPE_STRING),
+            openapi.Parameter('count', openapi.IN_QUERY, description="Jami sonni ham qaytarish (true/false), standart holatda hisoblanmaydi", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('offset', openapi.IN_QUERY, description="Eski limit/offset sahifalash (OFFSET va COUNT(*) bilan sekinroq); berilsa kursor ishlatilmaydi", type=openapi.TYPE_INTEGER),
             openapi.Parameter(
                 'date_from',
                 openapi.IN_QUERY,
@@ -241,7 +256,18 @@ class GivePointListCreateView(generics.ListCreateAPIView):
         return GivePointSerializer
 
 
-class GivenPointListView(generics.ListAPIView):
+class BulkGivePointCreateView(APIView):
+    permission_classes = [IsMentorOrAdmin]
+
+    @swagger_auto_schema(request_body=BulkGivePointSerializer, responses={201: Many(GivePointSerializer)})
+    def post(self, request, *args, **kwargs):
+        serializer = BulkGivePointSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        give_points = serializer.save()
+        return Response(GivePointSerializer(give_points, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class GivenPointListView(OptimizedQuerysetMixin, generics.ListAPIView):
     queryset = GivePoint.objects.all()
     serializer_class = GetPointSerializer
     permission_classes = [IsAuthenticated]
@@ -249,12 +275,11 @@ class GivenPointListView(generics.ListAPIView):
     filterset_fields = ['mentor', 'student', 'point_type', 'date', 'student__group']
     ordering_fields = ['id', 'amount', 'date', 'created_at']
     search_fields = ['description']
-    pagination_class = CustomLimitOffsetPagination
+    # Javob ro'yxat emas, yig'indi (list() ga qarang) - sahifalanmaydi
+    pagination_class = None
 
     @swagger_auto_schema(
         manual_parameters=[
-            openapi.Parameter('limit', openapi.IN_QUERY, description="How many results to return", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('offset', openapi.IN_QUERY, description="The initial index to start returning results from", type=openapi.TYPE_INTEGER),
             openapi.Parameter(
                 'date_from',
                 openapi.IN_QUERY,
@@ -284,42 +309,16 @@ class GivenPointListView(generics.ListAPIView):
         return queryset
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        # Umumiy o'rtacha ball
-        average_amount = queryset.aggregate(
-            average=Coalesce(Avg('amount'), 0, output_field=FloatField())
-        )['average']
-
-        # Umumiy miqdor (foizlar uchun)
-        total_amount = queryset.aggregate(
-            total=Coalesce(Sum('amount'), 0, output_field=FloatField())
-        )['total']
-
-        # Point type bo'yicha o'rtacha ball va foiz
-        point_type_stats = (
-            queryset.values('point_type__name')
-            .annotate(
-                amount_avg=Coalesce(Avg('amount'), 0, output_field=FloatField()),
-                amount_sum=Coalesce(Sum('amount'), 0, output_field=FloatField())
-            )
-            .annotate(
-                percentage=Coalesce(
-                    (100.0 * Sum('amount') / total_amount if total_amount else 0),
-                    0,
-                    output_field=FloatField()
-                )
-            )
-            .order_by('point_type__name')
-        )
-
         # Vaqt oralig'i
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
 
+        # O'rtacha ball va point type bo'yicha foizlar kunlik yig'indidan olinadi
+        summary = given_point_summary(date_from, date_to)
+
         return Response({
-            'average_amount': average_amount,
-            'point_type_stats': list(point_type_stats),
+            'average_amount': summary['average_amount'],
+            'point_type_stats': summary['point_type_stats'],
             'date_from': date_from,
             'date_to': date_to
         })
@@ -432,7 +431,7 @@ class GivenPointListView(generics.ListAPIView):
 #         return Response(data)
 
 
-class StudentPointsListView(generics.ListAPIView):
+class StudentPointsListView(OptimizedQuerysetMixin, generics.ListAPIView):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]
@@ -440,7 +439,10 @@ class StudentPointsListView(generics.ListAPIView):
     filterset_fields = ['user__username', 'group', 'birth_date', 'group__mentor']
     ordering_fields = ['id', 'user__username', 'birth_date', 'created_at', 'point', 'group', 'group__mentor']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'bio']
+    ordering = ['id']
+    optimizer_required_fields = ('point',)
     pagination_class = CustomLimitOffsetPagination
+    stateless_authentication = True
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -472,19 +474,16 @@ class StudentPointsListView(generics.ListAPIView):
     def get_queryset(self):
 
         queryset = super().get_queryset()
-        user = self.request.user
-        if hasattr(user, 'mentor'):
-            queryset = queryset.filter(group__mentor=user.mentor)
-            return queryset
+        role = get_role(self.request)
+        if role.is_mentor:
+            return queryset.filter(group__mentor_id=role.mentor_id)
         return queryset.none()
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
-        from datetime import datetime
-
         if start_date:
             try:
                 start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
@@ -497,71 +496,33 @@ class StudentPointsListView(generics.ListAPIView):
             except ValueError:
                 end_date = None
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        students = page if page is not None else list(queryset)
+
+        serializer = self.get_serializer(students, many=True)
         data = serializer.data
 
-        stats_map = {}
-        for student in queryset:
-            givepoints = GivePoint.objects.filter(student=student)
-            if start_date:
-                givepoints = givepoints.filter(date__gte=start_date)
-            if end_date:
-                givepoints = givepoints.filter(date__lte=end_date)
-
-            total_points = givepoints.aggregate(
-                total=Coalesce(Sum('amount'), 0)
-            )['total']
-
-            give_point_count = givepoints.aggregate(
-                count=Count('id')
-            )['count']
-
-            point_type_stats = (
-                givepoints
-                .values('point_type__name')
-                .annotate(
-                    avg=Avg('amount'),
-                    count=Count('id'),
-                    sum=Sum('amount')
-                )
-            )
+        # Statistikalar butun sahifa uchun bitta guruhlangan so'rov bilan olinadi
+        stats_map = student_point_stats([student.id for student in students], start_date, end_date)
 
-            total_sum = sum(item['sum'] for item in point_type_stats) or 1
-
-            point_type_combined = []
-            for item in point_type_stats:
-                percentage = round((item['sum'] / total_sum) * 100, 2)
-                point_type_combined.append({
-                    'point_type__name': item['point_type__name'],
-                    'total': item['sum'],
-                    'avg': item['avg'],
-                    'percentage': percentage,
-                    'count': item['count']
-                })
-
-            stats_map[student.id] = {
-                'total_points': total_points,
-                'give_point_count': give_point_count,
-                'point_type': point_type_combined
-            }
-
-        total_items = queryset.count()
-        for item in data:
-            student_id = item['id']
-            stats = stats_map.get(student_id, {})
+        for student, item in zip(students, data):
+            stats = stats_map.get(student.id, {})
             item.update({
-                'current_point': item.get('point', 0),
+                'current_point': student.point,
                 'total_points': stats.get('total_points', 0),
                 'give_point_count': stats.get('give_point_count', 0),
                 'point_type': stats.get('point_type', [])
             })
 
         response_data = {
-            'total_items': total_items,
+            'total_items': self.paginator.count if page is not None else len(students),
             'start_date': start_date,
             'end_date': end_date,
             'results': data
         }
+        if page is not None:
+            response_data['next'] = self.paginator.get_next_link()
+            response_data['previous'] = self.paginator.get_previous_link()
 
         return Response(response_data)
 
@@ -571,116 +532,264 @@ class GivePointRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = GivePointSerializer
     permission_classes = [IsAuthenticated]
 
-class NewsListView(generics.ListAPIView):
+    def perform_destroy(self, instance):
+        # Student qaytariladigan ballni sarflab bo'lgan bo'lsa - 400
+        try:
+            instance.delete()
+        except DjangoValidationError as exc:
+            raise ValidationError(exc.messages)
+
+class NewsListView(ConditionalGetMixin, OptimizedQuerysetMixin, generics.ListAPIView):
     queryset = New.objects.all()
     serializer_class = NewSerializer
+    etag_resources = (versions.NEWS,)
+    stateless_authentication = True
 
-class NewDetailView(generics.RetrieveAPIView):
+class NewDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = New.objects.all()
     serializer_class = NewSerializer
+    etag_resources = (versions.NEWS,)
+    stateless_authentication = True
 
 class ResetAllStudentsPointsView(APIView):
     def post(self, request, *args, **kwargs):
         Student.objects.update(point=0)
+        transaction.on_commit(leaderboard.reset)
         return Response({'message': 'All students\' points have been reset to 0.'}, status=status.HTTP_200_OK)
 
 
 class MarkAsReadAPIView(APIView):
+    """
+    Javob eski NewsReadStatus ko'rinishida. Har bir yangilik uchun alohida
+    qator endi yo'q, shuning uchun `id` - yangilik id si (`news` bilan bir xil).
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk, format=None):
-        news = get_object_or_404(New, id=pk)
-        read_status, created = NewsReadStatus.objects.get_or_create(user=request.user, news=news)
-        if not read_status.is_read:
-            read_status.is_read = True
-            read_status.save()
-
-        serializer = NewsReadStatusSerializer(read_status)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-
-class AllReadStatusAPIView(generics.ListAPIView):
-    serializer_class = NewsReadStatusSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return NewsReadStatus.objects.filter(user=self.request.user)
+        news_ids = readstate.news_ids()
+        if not readstate.exists(news_ids, pk):
+            raise NotFound()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-
-        # Calculate number of unread news items
-        read_news_ids = queryset.values_list('news_id', flat=True)
-        unread_news_ids = New.objects.exclude(id__in=read_news_ids).values_list('id', flat=True)
-        total_news_count = New.objects.count()
-        read_news_count = queryset.count()
-        num_unread_news = total_news_count - read_news_count
+        with transaction.atomic():
+            read_state = NewsReadState.for_user(request.user, lock=True)
+            if not read_state.is_read(pk):
+                read_state.mark_read([pk], news_ids)
+                read_state.save()
 
         return Response({
-            'num_unread_news': num_unread_news,
-            'unread_news_ids': list(unread_news_ids),
-            'read_news_ids': serializer.data
-        })
+            'id': pk,
+            'user': request.user.id,
+            'news': pk,
+            'is_read': True,
+            'num_unread_news': len(read_state.unread_ids(news_ids)),
+        }, status=status.HTTP_200_OK)
 
 
-class CourseAveragePointsAPIView(APIView):
+class MarkManyAsReadAPIView(APIView):
+    """Bir nechta yangilikni bitta so'rovda o'qilgan deb belgilash."""
     permission_classes = [IsAuthenticated]
-    def get(self, request):
-        courses = Course.objects.all()
-        result = []
 
-        for course in courses:
+    @swagger_auto_schema(request_body=MarkNewsReadSerializer)
+    def post(self, request, format=None):
+        serializer = MarkNewsReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-            groups = Group.objects.filter(mentor__course=course)
-            students = []
-            for group in groups:
-                students.extend(group.student_set.all())
+        news_ids = readstate.news_ids()
+        ids = [news_id for news_id in set(serializer.validated_data['ids']) if readstate.exists(news_ids, news_id)]
 
+        with transaction.atomic():
+            read_state = NewsReadState.for_user(request.user, lock=True)
+            if any(not read_state.is_read(news_id) for news_id in ids):
+                read_state.mark_read(ids, news_ids)
+                read_state.save()
 
-            point_types = PointType.objects.all()
+        return Response({'num_unread_news': len(read_state.unread_ids(news_ids))}, status=status.HTTP_200_OK)
 
-            course_avg_data = {}
 
-            for point_type in point_types:
+class MarkAllAsReadAPIView(APIView):
+    """
+    Barcha yangiliklarni (yoki `until` vaqtigacha yaratilganlarini) o'qilgan
+    deb belgilash.
+    """
+    permission_classes = [IsAuthenticated]
 
-                give_points = GivePoint.objects.filter(student__in=students, point_type=point_type)
-                avg_points = give_points.aggregate(Avg('amount'))['amount__avg']
+    @swagger_auto_schema(request_body=MarkAllNewsReadSerializer)
+    def post(self, request, format=None):
+        serializer = MarkAllNewsReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        until = serializer.validated_data.get('until')
+
+        news_ids = readstate.news_ids()
+        with transaction.atomic():
+            read_state = NewsReadState.for_user(request.user, lock=True)
+            # Chegara oxirgi yangilikkacha yetgan bo'lsa o'qiladigan ham, yoziladigan ham narsa yo'q
+            if until is None:
+                if read_state.mark_all_read(news_ids):
+                    read_state.save()
+            elif news_ids and news_ids[-1] > read_state.read_up_to:
+                ids = [news_id for news_id in
+                       New.objects.filter(id__gt=read_state.read_up_to, created_at__lte=until)
+                       .values_list('id', flat=True)
+                       if not read_state.is_read(news_id)]
+                if ids:
+                    read_state.mark_read(ids, news_ids)
+                    read_state.save()
+
+        return Response({'num_unread_news': len(read_state.unread_ids(news_ids))}, status=status.HTTP_200_OK)
+
+
+class AllReadStatusAPIView(APIView):
+    """
+    O'qilmagan yangiliklar soni va id lari. `?compact=true` bo'lsa o'qilgan
+    yangiliklar ro'yxati o'rniga faqat `read_up_to` chegarasi qaytadi.
+    `read_news_ids` elementlari MarkAsReadAPIView javobi bilan bir xil
+    ko'rinishda (`id` - yangilik id si).
+    """
+    permission_classes = [IsAuthenticated]
 
-                course_avg_data[point_type.name] = avg_points if avg_points is not None else 0
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('compact', openapi.IN_QUERY, description="read_news_ids ro'yxatisiz qisqa javob",
+                              type=openapi.TYPE_BOOLEAN),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        read_state = NewsReadState.for_user(request.user)
+        news_ids = readstate.news_ids()
+        unread_news_ids = read_state.unread_ids(news_ids)
+
+        data = {
+            'num_unread_news': len(unread_news_ids),
+            'unread_news_ids': unread_news_ids,
+        }
+        if request.query_params.get('compact') in ('1', 'true', 'True'):
+            data['read_up_to'] = read_state.read_up_to
+        else:
+            data['read_news_ids'] = [
+                {'id': news_id, 'user': request.user.id, 'news': news_id, 'is_read': True}
+                for news_id in read_state.read_ids(news_ids)
+            ]
+        return Response(data)
 
-            result.append({
-                course.name: course_avg_data
-            })
 
-        return Response(result, status=status.HTTP_200_OK)
+class CourseAveragePointsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        return Response(course_point_type_averages(), status=status.HTTP_200_OK)
 
 class CourseAveragePointsListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, *args, **kwargs):
+        return Response(course_point_type_averages())
+
+
+class LeaderboardMixin:
+    """Reyting kesimini (scope) so'rov parametrlaridan aniqlash va natijani to'ldirish."""
+
+    def get_scope(self, student_id=None):
+        scope = self.request.query_params.get('scope', 'global')
+        if scope == 'global':
+            return GLOBAL
+        if scope not in ('course', 'group'):
+            raise ValidationError({'scope': "scope 'global', 'course' yoki 'group' bo'lishi kerak."})
+
+        scope_id = self.request.query_params.get('id')
+        if scope_id is None:
+            if student_id is None:
+                raise ValidationError({'id': f"{scope} uchun id kiritilishi kerak."})
+            return leaderboard.scopes_for(student_id).get(scope)
+        try:
+            return (scope, int(scope_id))
+        except ValueError:
+            raise ValidationError({'id': "id butun son bo'lishi kerak."})
+
+    def get_int_param(self, name, default, maximum):
+        try:
+            return max(0, min(int(self.request.query_params.get(name, default)), maximum))
+        except ValueError:
+            raise ValidationError({name: "Butun son bo'lishi kerak."})
+
+    def with_students(self, entries):
+        students = {
+            student['id']: student
+            for student in Student.objects.filter(id__in=[entry['student'] for entry in entries])
+            .values('id', 'group_id', 'user__username', 'user__first_name', 'user__last_name')
+        }
+        for entry in entries:
+            student = students.get(entry['student'], {})
+            entry.update({
+                'username': student.get('user__username'),
+                'first_name': student.get('user__first_name'),
+                'last_name': student.get('user__last_name'),
+                'group': student.get('group_id'),
+            })
+        return entries
 
-        courses = Course.objects.all()
-        course_avg_points = []
+    def get_student_id(self):
+        student_id = get_role(self.request).student_id
+        if student_id is None:
+            raise NotFound("Foydalanuvchi student emas.")
+        return student_id
 
-        for course in courses:
-            students = Student.objects.filter(group__mentor__course=course)
 
-            point_types = PointType.objects.all()
-            point_type_avg_data = {}
+class LeaderboardView(LeaderboardMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    stateless_authentication = True
 
-            for point_type in point_types:
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('scope', openapi.IN_QUERY, description="global, course yoki group",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('id', openapi.IN_QUERY, description="Kurs yoki guruh id si",
+                              type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Nechta student qaytarilsin (max 100)",
+                              type=openapi.TYPE_INTEGER),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        scope = self.get_scope()
+        limit = self.get_int_param('limit', 10, 100)
+        return Response(self.with_students(leaderboard.top(scope, limit)))
 
-                give_points = GivePoint.objects.filter(student__in=students, point_type=point_type)
-                avg_points = give_points.aggregate(Avg('amount'))['amount__avg']
 
+class LeaderboardMyRankView(LeaderboardMixin, APIView):
+    permission_classes = [IsStudent]
+    stateless_authentication = True
 
-                point_type_avg_data[point_type.name] = avg_points if avg_points is not None else 0
+    def get(self, request, *args, **kwargs):
+        student_id = self.get_student_id()
+        result = leaderboard.rank(student_id, self.get_scope(student_id))
+        if result is None:
+            raise NotFound("Student bu reytingda yo'q.")
+        return Response(result)
 
 
-            course_avg_points.append({
-                course.name: point_type_avg_data
-            })
+class LeaderboardNeighboursView(LeaderboardMixin, APIView):
+    permission_classes = [IsStudent]
+    stateless_authentication = True
+
+    def get(self, request, *args, **kwargs):
+        student_id = self.get_student_id()
+        radius = self.get_int_param('radius', 3, 25)
+        result = leaderboard.neighbours(student_id, self.get_scope(student_id), radius)
+        if result is None:
+            raise NotFound("Student bu reytingda yo'q.")
+        return Response(self.with_students(result))
 
-        return Response(course_avg_points)
 
+class TokenRevokeView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    @swagger_auto_schema(request_body=TokenRevokeSerializer, responses={204: 'Tokenlar bekor qilindi'})
+    def post(self, request, *args, **kwargs):
+        serializer = TokenRevokeSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            if serializer.validated_data['all']:
+                RevokedToken.revoke_user(request.user)
+            else:
+                if request.auth is not None:
+                    RevokedToken.revoke_token(request.auth)
+                if 'refresh' in serializer.validated_data:
+                    RevokedToken.revoke_token(serializer.validated_data['refresh'])
+        return Response(status=status.HTTP_204_NO_CONTENT)